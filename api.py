@@ -2,17 +2,78 @@
 # Repository: https://github.com/Malith-Rukshan/Suno-API
 
 import os
-from typing import List
-from suno import suno
-from suno.models import RequestParams, CreditsInfo, Clip, ModelVersions
+import json
+import logging
+import asyncio
+import contextlib
+from typing import Dict, List, Literal, Optional, Tuple
+import httpx
+from suno import AsyncSuno, AsyncSunoPool, JobManager, JobStore, SunoTimeoutError
+from suno.exceptions import (SunoError, SunoHTTPError, SunoAuthError, SunoNotFoundError, SunoRateLimitError,
+                             SunoUpstreamError, SunoConnectionError, SunoCircuitOpenError, SunoIdempotencyError,
+                             SunoInsufficientCreditsError, SunoNoAccountError)
+from suno.coordinator import CoordinatorClient
+from suno.dedup import GenerationIndex
+from suno.transport import Transport
+from suno.library import LibraryMirror
+from suno.media import MediaCache, MediaEntry, MAX_CACHE_BYTES
+from suno.models import RequestParams, CreditsInfo, Clip, ModelVersions, Job, BatchItem
 import fastapi
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, Response, StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from pydantic import TypeAdapter
+from suno.poller import DONE_STATUSES
+from suno.utils import json_dumps
+from suno.metrics import default_metrics
 from suno import __version__
 
+# The library leaves logging setup to the application
+logging.basicConfig(level=logging.INFO)
+
 COOKIE = os.getenv("SUNO_COOKIE")
+# Optional: several account cookies separated by "|" to balance generations across accounts
+COOKIES = [cookie.strip() for cookie in os.getenv("SUNO_COOKIES", "").split("|") if cookie.strip()]
+
+# Idempotency keys and prompt hashes survive restarts, next to the jobs
+index = GenerationIndex(os.getenv("SUNO_JOBS_DB", "suno_jobs.db"))
+# Searchable copy of the account's songs behind /search
+library = LibraryMirror(os.getenv("SUNO_JOBS_DB", "suno_jobs.db"))
+
+# With several workers (uvicorn --workers N), run `python -m suno.coordinator` and point them all at its socket
+COORDINATOR_SOCKET = os.getenv("SUNO_COORDINATOR_SOCKET")
+coordinator = CoordinatorClient(COORDINATOR_SOCKET) if COORDINATOR_SOCKET else None
+
+# Connection pools of every upstream request: keep connections warm. SUNO_DNS_TTL caches
+# host lookups for that many seconds, process-wide, so it is off unless set
+transport = Transport(pool_size=int(os.getenv("SUNO_POOL_SIZE", "20")),
+                      cdn_pool_size=int(os.getenv("SUNO_CDN_POOL_SIZE", "64")),
+                      keepalive_expiry=float(os.getenv("SUNO_KEEPALIVE", "60")),
+                      http2=os.getenv("SUNO_HTTP2", "").lower() in ("1", "true", "yes"),
+                      dns_ttl=float(os.getenv("SUNO_DNS_TTL", "0")) or None)
 
 # Initilize Suno API Client
-client = suno.Suno(cookie=COOKIE,model_version=ModelVersions.CHIRP_V3_5)
+if COOKIES:
+    client = AsyncSunoPool(cookies=COOKIES, model_version=ModelVersions.CHIRP_V3_5, index=index, library=library,
+                           coordinator=coordinator, transport=transport)
+else:
+    client = AsyncSuno(cookie=COOKIE,model_version=ModelVersions.CHIRP_V3_5, index=index, library=library,
+                       coordinator=coordinator, transport=transport)
+
+# Audio and cover images served by /media, kept on disk and evicted least recently used first
+media_cache = MediaCache(os.getenv("SUNO_MEDIA_DIR", "media_cache"),
+                         int(os.getenv("SUNO_MEDIA_MAX_BYTES", MAX_CACHE_BYTES)))
+media_client = transport.async_client(cdn=True)
+# Cache fills in progress, so concurrent misses of one file download it once
+media_fills: Dict[Tuple[str, str], asyncio.Event] = {}
+# Seconds a miss waits for another request's fill before downloading the file itself
+MEDIA_FILL_TIMEOUT = float(os.getenv("SUNO_MEDIA_FILL_TIMEOUT", "60"))
+
+# Durable generation queue behind the /jobs endpoints
+jobs = JobManager(client, JobStore(os.getenv("SUNO_JOBS_DB", "suno_jobs.db")),
+                  workers=int(os.getenv("SUNO_JOB_WORKERS", "4")))
+
+# How long /generate/stream and /ws/clips follow clips before giving up (seconds)
+STREAM_TIMEOUT = 300
 
 description = """
 ### Suno AI Unofficial API
@@ -45,8 +106,20 @@ This API is not officially associated with Suno AI. It was developed to facilita
 Please note that this API is intended for educational and development purposes. Ensure you respect Suno AI's terms of service when using their services.
 """
 
+@contextlib.asynccontextmanager
+async def lifespan(app: fastapi.FastAPI):
+    # Resume jobs left over from a previous run; with other workers on the store, fail only stale submissions
+    await jobs.start(exclusive=coordinator is None)
+    yield
+    await jobs.stop()
+    await client.aclose()  # Release pooled connections on shutdown
+    if coordinator is not None:
+        await coordinator.aclose()
+    await media_client.aclose()
+
 # FastAPI app
 app = fastapi.FastAPI(
+    lifespan=lifespan,
     title="Suno API",
     summary="An Unofficial Python Library for Suno AI API",
     description=description,
@@ -58,6 +131,50 @@ app = fastapi.FastAPI(
     }
 )
 
+# Serializes clip lists in one pass inside pydantic-core
+clips_adapter = TypeAdapter(List[Clip])
+batch_adapter = TypeAdapter(List[BatchItem])
+
+
+@app.exception_handler(SunoTimeoutError)
+async def timeout_error(request: fastapi.Request, exc: SunoTimeoutError) -> JSONResponse:
+    """Songs that are not ready in time answer 504 with their last known state."""
+    return JSONResponse(status_code=504, content={"detail": str(exc), "clips": [clip.model_dump() for clip in exc.clips]})
+
+
+# Most specific first: status code our clients see for each upstream failure
+ERROR_STATUSES = (
+    (SunoRateLimitError, 429),
+    (SunoCircuitOpenError, 503),
+    (SunoNoAccountError, 503),
+    (SunoConnectionError, 504),
+    (SunoNotFoundError, 404),
+    (SunoIdempotencyError, 422),
+    (SunoInsufficientCreditsError, 402),
+    (SunoAuthError, 502),      # Our cookie was rejected, not the caller's credentials
+    (SunoUpstreamError, 502),
+    (SunoHTTPError, 400),      # Other 4xx: upstream refused the request as sent
+    (SunoError, 400),
+)
+
+
+def error_status(exc: SunoError) -> int:
+    return next(status for error, status in ERROR_STATUSES if isinstance(exc, error))
+
+
+@app.exception_handler(SunoError)
+async def suno_error(request: fastapi.Request, exc: SunoError) -> JSONResponse:
+    status_code = error_status(exc)
+    headers = {}
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after:
+        headers["Retry-After"] = str(int(retry_after + 0.999))
+    return JSONResponse(status_code=status_code, content={"detail": str(exc)}, headers=headers)
+
+
+def clips_response(clips: List[Clip]) -> Response:
+    return Response(content=clips_adapter.dump_json(clips), media_type="application/json")
+
 # Redirect to Docs :)
 
 
@@ -67,27 +184,288 @@ async def redirect_to_docs():
 
 
 @app.post(f"/generate", response_model=List[Clip])
-def generate(params: RequestParams) -> JSONResponse:
-    clips = client.generate(**params.model_dump())
-    return JSONResponse(content=[clip.model_dump() for clip in clips])
+async def generate(params: RequestParams, idempotency_key: Optional[str] = fastapi.Header(None)) -> Response:
+    """Generate songs. An `Idempotency-Key` header works like the `idempotency_key` field."""
+    if idempotency_key and not params.idempotency_key:
+        params.idempotency_key = idempotency_key
+    clips = await client.generate(**params.model_dump())
+    return clips_response(clips)
+
+
+@app.post(f"/generate/batch", response_model=List[BatchItem])
+async def generate_batch(requests: List[RequestParams], concurrency: int = fastapi.Query(4, ge=1, le=16),
+                         stream: bool = False) -> Response:
+    """Generate many songs at once and wait for all of them.
+
+    Returns one item per request, in request order, with its clips or its `error`.
+    With `stream=true`, items are sent as NDJSON lines as soon as each one finishes.
+    Answers `402` without submitting anything if the batch needs more credits than are left.
+    """
+    if not stream:
+        found = await client.generate_batch(requests, concurrency)
+        return Response(content=batch_adapter.dump_json(found), media_type="application/json")
+    items = client.iter_batch(requests, concurrency)
+    first = await anext(items, None)  # Surface credit errors before the response starts
+
+    async def lines():
+        if first is not None:
+            yield first.model_dump_json() + "\n"
+        async for item in items:
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @app.post(f"/songs", response_model=List[Clip])
-def generate(song_ids: str | None = None) -> JSONResponse:
-    clips = client.get_songs(song_ids)
-    return JSONResponse(content=[clip.model_dump() for clip in clips])
+async def get_songs(song_ids: str | None = None, page: int | None = None, account: int = 0,
+                    stream: bool = False) -> Response:
+    """Songs by ID, one library page (`page`, of pool account `account`), or the whole library as NDJSON (`stream=true`)."""
+    if song_ids:
+        clips = await client.get_songs(song_ids)
+        return clips_response(clips)
+    if stream:
+        async def lines():
+            async for view in client.iter_library(lazy=True):
+                yield json_dumps(view.raw) + b"\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    # Pass the feed JSON straight through without building models
+    if page is None:
+        views = await client.get_feed()
+    elif isinstance(client, AsyncSunoPool):
+        if not 0 <= account < len(client.accounts):
+            raise fastapi.HTTPException(status_code=400, detail=f"Unknown account {account}")
+        views = await client.get_feed_page(page, account=account)
+    elif account:
+        raise fastapi.HTTPException(status_code=400, detail="`account` needs several SUNO_COOKIES")
+    else:
+        views = await client.get_feed_page(page)
+    return Response(content=json_dumps([view.raw for view in views]), media_type="application/json")
 
 
 @app.post(f"/get_song", response_model=Clip)
-def generate(song_id: str) -> JSONResponse:
-    clip = client.get_song(song_id)
-    return JSONResponse(content=clip.model_dump())
+async def get_song(song_id: str) -> Response:
+    clip = await client.get_song(song_id)
+    return Response(content=clip.model_dump_json(), media_type="application/json")
+
+@app.get(f"/search", response_model=List[Clip])
+async def search(q: str | None = None, tags: str | None = None, status: str | None = None,
+                 model_name: str | None = None, limit: int = fastapi.Query(50, ge=1, le=500),
+                 offset: int = fastapi.Query(0, ge=0)) -> Response:
+    """Search the account's songs in the local library mirror, newest first.
+
+    `q` words must all appear in the title, tags or lyrics; `tags` and `status` take
+    comma separated values. The mirror is synced incrementally when older than a minute.
+    """
+    return clips_response(await client.search(q, tags, status, model_name, limit, offset))
 
 @app.post(f"/set_visibility")
-def set_visibility(song_id: str, is_public: bool) -> JSONResponse:
-    return JSONResponse(content=dict(is_public=client.set_visibility(song_id, is_public)))
+async def set_visibility(song_id: str, is_public: bool) -> JSONResponse:
+    return JSONResponse(content=dict(is_public=await client.set_visibility(song_id, is_public)))
 
 @app.get(f"/credits", response_model=CreditsInfo)
-def credits() -> JSONResponse:
-    credits = client.get_credits()
+async def credits() -> JSONResponse:
+    credits = await client.get_credits()
     return JSONResponse(content=credits.model_dump())
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post(f"/generate/stream")
+async def generate_stream(params: RequestParams) -> StreamingResponse:
+    """Generate songs and stream their status changes as Server-Sent Events.
+
+    Emits `clips` with the submitted clips right away, `status` for every status
+    change, then `done` once all clips are finished or `timeout` if they are not.
+    """
+    options = params.model_dump()
+    options["wait_audio"] = False
+    clips = await client.generate(**options)
+
+    async def events():
+        yield sse_event("clips", [clip.model_dump() for clip in clips])
+        statuses = {clip.id: clip.status for clip in clips}
+        async for clip in client.watch(list(statuses), timeout=STREAM_TIMEOUT, initial=clips):
+            statuses[clip.id] = clip.status
+            yield sse_event("status", clip.model_dump())
+        finished = all(status in DONE_STATUSES for status in statuses.values())
+        yield sse_event("done" if finished else "timeout", statuses)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/ws/clips")
+async def watch_clips(websocket: fastapi.WebSocket, ids: str) -> None:
+    """Push the current state of `ids` (comma separated), then every status change until they finish.
+
+    Failures are sent as an `error` event with the HTTP status the other routes would answer,
+    then the socket is closed with 1008 (request error) or 1011 (upstream or server error).
+    """
+    await websocket.accept()
+    song_ids = [song_id for song_id in ids.split(",") if song_id]
+    try:
+        if not song_ids:
+            raise SunoError("No clip IDs given")
+        clips = await client.get_songs(song_ids)
+        await websocket.send_json({"event": "clips", "data": [clip.model_dump() for clip in clips]})
+        statuses = {clip.id: clip.status for clip in clips}
+        async for clip in client.watch(song_ids, timeout=STREAM_TIMEOUT, initial=clips):
+            statuses[clip.id] = clip.status
+            await websocket.send_json({"event": "status", "data": clip.model_dump()})
+        finished = all(status in DONE_STATUSES for status in statuses.values())
+        await websocket.send_json({"event": "done" if finished else "timeout", "data": statuses})
+        await websocket.close()
+    except fastapi.WebSocketDisconnect:
+        pass
+    except SunoError as e:
+        status_code = error_status(e)
+        await websocket.send_json({"event": "error", "data": {"status": status_code, "detail": str(e)}})
+        await websocket.close(code=1008 if status_code < 500 else 1011)
+
+
+@app.post(f"/jobs", response_model=Job, status_code=202)
+async def create_job(params: RequestParams) -> JSONResponse:
+    """Queue a generation and return immediately; poll `/jobs/{job_id}` for the result."""
+    job = jobs.submit(params)
+    return JSONResponse(content=job.model_dump(), status_code=202)
+
+
+@app.get(f"/jobs", response_model=List[Job])
+async def get_jobs(ids: str) -> JSONResponse:
+    """Status of several jobs at once, `ids` separated by ","."""
+    found = jobs.get_many([job_id for job_id in ids.split(",") if job_id])
+    return JSONResponse(content=[job.model_dump() for job in found])
+
+
+@app.get(f"/jobs/{{job_id}}", response_model=Job)
+async def get_job(job_id: str) -> JSONResponse:
+    job = jobs.get(job_id)
+    if job is None:
+        raise fastapi.HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=job.model_dump())
+
+
+class MediaFileResponse(FileResponse):
+    """Serves a cached file, which eviction leaves in place until it was sent."""
+
+    def __init__(self, entry: MediaEntry, **kwargs):
+        super().__init__(entry.path, media_type=entry.content_type, **kwargs)
+        self.digest = entry.digest
+        media_cache.pin(entry.digest)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            media_cache.unpin(self.digest)
+
+
+def media_response(entry: MediaEntry, request: fastapi.Request) -> Response:
+    """Serve a cached file; the content hash is its ETag, so it never changes under one."""
+    etag = f'"{entry.digest}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status_code=304, headers=headers)
+    return MediaFileResponse(entry, headers=headers)
+
+
+async def open_media(url: str, headers: Optional[dict] = None) -> httpx.Response:
+    with default_metrics.track_request("GET", url) as info:
+        response = await media_client.send(media_client.build_request("GET", url, headers=headers), stream=True)
+        info["status"] = response.status_code
+    if response.status_code >= 400:
+        await response.aclose()
+        raise fastapi.HTTPException(status_code=502, detail=f"Media download failed: {response.status_code}")
+    return response
+
+
+def passthrough_headers(response: httpx.Response, names: Tuple[str, ...]) -> dict:
+    if "Content-Encoding" in response.headers:
+        return {}  # The body is decoded on the way, so upstream lengths and ranges no longer apply
+    return {name: response.headers[name] for name in names if name in response.headers}
+
+
+async def release_media(key: Tuple[str, str], event: asyncio.Event, response: httpx.Response, body=None):
+    """End a cache fill: close its body and upstream response and wake requests waiting for it. Safe to call twice."""
+    try:
+        if body is not None:
+            await body.aclose()  # Discards a partial file
+        await response.aclose()
+    finally:
+        if media_fills.get(key) is event:
+            del media_fills[key]
+        event.set()
+
+
+class MediaFillResponse(StreamingResponse):
+    """Streams a cache fill and always releases it, also if the client leaves before the body starts."""
+
+    def __init__(self, key: Tuple[str, str], event: asyncio.Event, response: httpx.Response, **kwargs):
+        super().__init__(media_cache.afill(key[0], key[1], response), **kwargs)
+        self.key, self.event, self.upstream = key, event, response
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await release_media(self.key, self.event, self.upstream, self.body_iterator)
+
+
+@app.get("/media/{clip_id}")
+async def media(clip_id: str, request: fastapi.Request, kind: Literal["audio", "image"] = "audio") -> Response:
+    """Audio or cover image of a clip, served from the local media cache with Range and ETag support.
+
+    A miss streams the file from Suno's CDN while it is stored. Clips that are still
+    generating are passed through without caching, since their audio is not final yet.
+    """
+    key = (clip_id, kind)
+    entry = media_cache.get(clip_id, kind)
+    if entry is None:
+        clip = await client.get_song(clip_id)
+        url = clip.audio_url if kind == "audio" else clip.image_url
+        if not url:
+            raise fastapi.HTTPException(status_code=404, detail=f"Clip has no {kind} yet")
+        if clip.status != "complete":
+            range_header = {"Range": request.headers["Range"]} if "Range" in request.headers else None
+            response = await open_media(url, range_header)
+            headers = passthrough_headers(response, ("Content-Length", "Content-Range", "Accept-Ranges"))
+            return StreamingResponse(response.aiter_bytes(), status_code=response.status_code, headers=headers,
+                                     media_type=response.headers.get("Content-Type"),
+                                     background=BackgroundTask(response.aclose))
+        if key in media_fills:  # Another request is downloading it already
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(media_fills[key].wait(), MEDIA_FILL_TIMEOUT)
+            entry = media_cache.get(clip_id, kind)
+    if entry is not None:
+        return media_response(entry, request)
+
+    event = media_fills[key] = asyncio.Event()
+    try:
+        response = await open_media(url)
+    except BaseException:
+        if media_fills.get(key) is event:
+            del media_fills[key]
+        event.set()
+        raise
+    if "Range" in request.headers:
+        # Ranges are served from the cached file once it is complete
+        body = media_cache.afill(clip_id, kind, response)
+        try:
+            async for _ in body:
+                pass
+        finally:
+            await release_media(key, event, response, body)
+        entry = media_cache.get(clip_id, kind)
+        if entry is None:
+            raise fastapi.HTTPException(status_code=502, detail="Media download failed")
+        return media_response(entry, request)
+    return MediaFillResponse(key, event, response, headers=passthrough_headers(response, ("Content-Length",)),
+                             media_type=response.headers.get("Content-Type", "application/octet-stream"))
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Upstream latency, status, retry, cache and generation metrics in Prometheus text format."""
+    return Response(default_metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,75 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+"""Parse + serialize cost of a feed response, per 1,000 clips.
+
+Compares the validated path (`response_to_clips` + `model_dump` + `json.dumps`, what
+`/songs` used to do) with the raw path (`response_to_views` + `json_dumps`).
+
+    python benchmarks/bench_clips.py [--clips 1000] [--rounds 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from suno.models import Clip  # noqa: E402
+from suno.utils import json_dumps, json_loads, response_to_clips, response_to_views  # noqa: E402
+
+
+def make_feed(count: int) -> bytes:
+    example = Clip.model_config["json_schema_extra"]["example"]
+    clips = []
+    for index in range(count):
+        clip = json.loads(json.dumps(example))
+        clip["id"] = f"{index:08d}-7fb0-42b9-8b35-761aed65a7f6"
+        clips.append(clip)
+    return json.dumps(clips).encode()
+
+
+def validated(body: bytes) -> bytes:
+    clips = response_to_clips(json.loads(body))
+    return json.dumps([clip.model_dump() for clip in clips]).encode()
+
+
+def raw(body: bytes) -> bytes:
+    views = response_to_views(json_loads(body))
+    return json_dumps([view.raw for view in views])
+
+
+def measure(func, body: bytes, rounds: int) -> tuple:
+    func(body)  # Warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(body)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    body = make_feed(args.clips)
+    per_1k = 1000 / args.clips
+    print(f"{args.clips} clips, {len(body) / 1024:.0f} KiB feed, {args.rounds} rounds")
+    print(f"{'path':<12}{'ms / 1k clips':>16}{'peak MiB / 1k':>16}")
+    for name, func in (("validated", validated), ("raw", raw)):
+        elapsed, peak = measure(func, body, args.rounds)
+        print(f"{name:<12}{elapsed * 1000 * per_1k:>16.2f}{peak / 2 ** 20 * per_1k:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+"""Offline load benchmark of `AsyncSuno` and the FastAPI app against the local mock server.
+
+Reports p50/p99 latency, requests per second and upstream calls per operation for:
+
+- lib-generate: `AsyncSuno.generate(..., wait_audio=True)`
+- lib-get_song: `AsyncSuno.get_song` on library clips
+- api-generate: `POST /generate` with `wait_audio=true`
+- api-get_song: `POST /get_song`
+
+    python benchmarks/bench_load.py --requests 200 --concurrency 50 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mock_server import MockConfig, create_app  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    """Run an ASGI app on 127.0.0.1:`port` in a daemon thread."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_load(name: str, call: Callable[[int], Awaitable[object]], requests: int, concurrency: int,
+                   mock: httpx.AsyncClient) -> Dict[str, float]:
+    await mock.post("/_reset")
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(index)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - start
+    upstream = sum((await mock.get("/_stats")).json().values())
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "name": name,
+        "p50": quantiles[49] * 1000 if latencies else 0.0,
+        "p99": quantiles[98] * 1000 if latencies else 0.0,
+        "rps": len(latencies) / elapsed,
+        "upstream": upstream / requests,
+        "errors": errors,
+    }
+
+
+def print_results(results: List[Dict[str, float]]) -> None:
+    print(f"{'benchmark':<16}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'upstream/op':>13}{'errors':>8}")
+    for row in results:
+        print(f"{row['name']:<16}{row['p50']:>10.1f}{row['p99']:>10.1f}{row['rps']:>10.1f}"
+              f"{row['upstream']:>13.2f}{row['errors']:>8}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    for name in ("SunoAI", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    config = MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        queued_after=args.complete_after / 4, streaming_after=args.complete_after / 2,
+                        complete_after=args.complete_after, library_size=args.library_size)
+    mock_port = free_port()
+    mock_app = create_app(config)
+    mock_url = mock_app.state.base_url = f"http://127.0.0.1:{mock_port}"
+    serve(mock_app, mock_port)
+
+    # The API module builds its client at import time from these variables
+    os.environ.update(SUNO_COOKIE="mock", SUNO_BASE_URL=mock_url, SUNO_CLERK_BASE_URL=mock_url,
+                      SUNO_JOBS_DB=os.path.join(tempfile.mkdtemp(), "jobs.db"))
+    import api
+    from suno import AsyncSuno, PollStrategy, Transport
+
+    strategy = PollStrategy(interval=(args.poll_interval, args.poll_interval))
+    api.client.poller.strategy = strategy
+    # Client-side rate limits are off by default so the benchmark measures the library, not the limiter
+    api.client.transport = Transport(rate=args.rate, host_rate=args.rate)
+    api_port = free_port()
+    serve(api.app, api_port)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=mock_url) as mock, \
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", limits=limits, timeout=300) as http, \
+            AsyncSuno(cookie="mock", base_url=mock_url, clerk_base_url=mock_url, limits=limits,
+                      poll_strategy=strategy, transport=Transport(rate=args.rate, host_rate=args.rate)) as client:
+        library = [view.id for view in await client.get_feed_page(0)]
+        body = {"prompt": "benchmark", "is_custom": False, "wait_audio": True}
+
+        async def api_call(method: str, url: str, **kwargs) -> None:
+            response = await http.request(method, url, **kwargs)
+            response.raise_for_status()
+
+        benchmarks = {
+            "lib-generate": lambda i: client.generate("benchmark", False, wait_audio=True),
+            "lib-get_song": lambda i: client.get_song(random.choice(library)),
+            "api-generate": lambda i: api_call("POST", "/generate", json=body),
+            "api-get_song": lambda i: api_call("POST", "/get_song", params={"song_id": random.choice(library)}),
+        }
+        results = []
+        for name, call in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            results.append(await run_load(name, call, args.requests, args.concurrency, mock))
+    print_results(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="operations per benchmark")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="mock upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--complete-after", type=float, default=2.0, help="seconds until mock clips complete")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--library-size", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=None, help="client-side requests/s limit (default: off)")
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,240 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+"""Local stand-in for the Suno studio API, Clerk and the audio CDN.
+
+Point a client at it with `Suno(base_url=URL, clerk_base_url=URL)` (or the
+SUNO_BASE_URL / SUNO_CLERK_BASE_URL environment variables) and any cookie.
+
+    python benchmarks/mock_server.py --port 8765 --latency 0.05 --error-rate 0.01
+
+Every route counts its calls; read them with `GET /_stats` and reset with `POST /_reset`.
+"""
+
+import argparse
+import asyncio
+import base64
+import collections
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import fastapi
+from fastapi.responses import JSONResponse, Response
+
+PAGE_SIZE = 20
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.0            # Base seconds added to every response
+    jitter: float = 0.0             # Extra random seconds, uniform in [0, jitter]
+    error_rate: float = 0.0         # Fraction of API calls answered with 500
+    throttle_rate: float = 0.0      # Fraction of API calls answered with 429 + Retry-After
+    token_ttl: int = 60             # Lifetime of issued JWTs in seconds
+    queued_after: float = 1.0       # Seconds after submission at which clips become `queued`
+    streaming_after: float = 3.0    # ... `streaming`
+    complete_after: float = 8.0     # ... `complete`
+    clip_error_rate: float = 0.0    # Fraction of clips that end in `error` instead of `complete`
+    library_size: int = 100         # Complete clips present before any generation
+    audio_size: int = 1024 * 1024   # Bytes served per audio file
+    credits: int = 10000
+
+
+@dataclass
+class MockClip:
+    id: str
+    created: float
+    title: str
+    tags: str
+    prompt: str
+    fails: bool = False
+    is_public: bool = False
+
+
+def _jwt(exp: float) -> str:
+    def encode(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    return f"{encode({'alg': 'none'})}.{encode({'exp': int(exp), 'sid': 'sess_mock'})}.mock"
+
+
+def create_app(config: Optional[MockConfig] = None) -> fastapi.FastAPI:
+    config = config or MockConfig()
+    app = fastapi.FastAPI(title="Suno mock")
+    app.state.config = config
+    stats: Dict[str, int] = collections.Counter()
+    clips: Dict[str, MockClip] = {}
+    audio = bytes(random.getrandbits(8) for _ in range(min(config.audio_size, 4096)))
+    credits = {"left": config.credits}
+
+    for index in range(config.library_size):
+        clip_id = str(uuid.uuid4())
+        clips[clip_id] = MockClip(clip_id, time.time() - 86400 - index * 60, f"Library song {index}", "mock", "")
+
+    def status_of(clip: MockClip) -> str:
+        age = time.time() - clip.created
+        if age >= config.complete_after:
+            return "error" if clip.fails else "complete"
+        if age >= config.streaming_after:
+            return "streaming"
+        if age >= config.queued_after:
+            return "queued"
+        return "submitted"
+
+    def to_json(clip: MockClip) -> dict:
+        status = status_of(clip)
+        ready = status in ("streaming", "complete")
+        created = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(clip.created)) + f".{int(clip.created % 1 * 1000):03d}Z"
+        return {
+            "id": clip.id,
+            "video_url": "",
+            "audio_url": f"{app.state.base_url}/audio/{clip.id}.mp3" if ready else "",
+            "image_url": f"{app.state.base_url}/image/{clip.id}.png" if ready else None,
+            "image_large_url": f"{app.state.base_url}/image/{clip.id}.png" if ready else None,
+            "is_video_pending": False,
+            "major_model_version": "v3",
+            "model_name": "chirp-v3",
+            "metadata": {
+                "tags": clip.tags, "prompt": clip.prompt, "gpt_description_prompt": None,
+                "audio_prompt_id": None, "history": None, "concat_history": None, "type": "gen",
+                "duration": 120.0 if status == "complete" else None, "refund_credits": None,
+                "stream": True, "error_type": "mock" if status == "error" else None,
+                "error_message": "Mock generation failure" if status == "error" else None,
+            },
+            "is_liked": False,
+            "user_id": "mock-user",
+            "display_name": "Mock",
+            "handle": "mock",
+            "is_handle_updated": False,
+            "is_trashed": False,
+            "reaction": None,
+            "created_at": created,
+            "status": status,
+            "title": clip.title,
+            "play_count": 0,
+            "upvote_count": 0,
+            "is_public": clip.is_public,
+        }
+
+    @app.middleware("http")
+    async def simulate(request: fastapi.Request, call_next):
+        route = request.url.path
+        if not route.startswith("/_"):
+            for prefix in ("/audio/", "/image/", "/v1/client/sessions/"):
+                if route.startswith(prefix):
+                    route = prefix + "*"
+            stats[f"{request.method} {route}"] += 1
+            delay = config.latency + random.uniform(0, config.jitter)
+            if delay:
+                await asyncio.sleep(delay)
+            if route.startswith("/api/"):
+                roll = random.random()
+                if roll < config.throttle_rate:
+                    return JSONResponse({"detail": "Too many requests"}, status_code=429, headers={"Retry-After": "1"})
+                if roll < config.throttle_rate + config.error_rate:
+                    return JSONResponse({"detail": "Mock upstream error"}, status_code=500)
+        return await call_next(request)
+
+    @app.get("/v1/client")
+    async def client_info():
+        return {"response": {"last_active_session_id": "sess_mock"}}
+
+    @app.post("/v1/client/sessions/{sid}/tokens")
+    async def session_token(sid: str):
+        return {"jwt": _jwt(time.time() + config.token_ttl)}
+
+    @app.post("/api/generate/v2/")
+    async def generate(request: fastapi.Request):
+        payload = await request.json()
+        credits["left"] -= 10
+        created = time.time()
+        new = []
+        for _ in range(2):
+            clip = MockClip(str(uuid.uuid4()), created, payload.get("title") or "Mock song", payload.get("tags", ""),
+                            payload.get("prompt") or payload.get("gpt_description_prompt", ""),
+                            fails=random.random() < config.clip_error_rate)
+            clips[clip.id] = clip
+            new.append(to_json(clip))
+        return {"clips": new}
+
+    @app.get("/api/feed/")
+    async def feed(ids: Optional[str] = None, page: int = 0):
+        if ids:
+            return [to_json(clips[clip_id]) for clip_id in ids.split(",") if clip_id in clips]
+        newest = sorted(clips.values(), key=lambda clip: clip.created, reverse=True)
+        return [to_json(clip) for clip in newest[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]]
+
+    @app.get("/api/billing/info/")
+    async def billing():
+        return {"total_credits_left": credits["left"], "period": None,
+                "monthly_limit": config.credits, "monthly_usage": config.credits - credits["left"]}
+
+    @app.post("/api/gen/{clip_id}/set_visibility/")
+    async def set_visibility(clip_id: str, request: fastapi.Request):
+        if clip_id not in clips:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        clips[clip_id].is_public = (await request.json())["is_public"]
+        return {"is_public": clips[clip_id].is_public}
+
+    @app.api_route("/audio/{name}", methods=["GET", "HEAD"])
+    async def audio_file(name: str, request: fastapi.Request):
+        size = config.audio_size
+        start, end = 0, size - 1
+        status = 200
+        header = request.headers.get("range", "")
+        if header.startswith("bytes="):
+            first, _, last = header[6:].partition("-")
+            start = int(first or 0)
+            end = min(int(last), size - 1) if last else size - 1
+            if start >= size:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+            status = 206
+        length = end - start + 1
+        headers = {"Accept-Ranges": "bytes", "Content-Length": str(length), "ETag": f'"{name}-{size}"'}
+        if status == 206:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        if request.method == "HEAD":
+            return Response(status_code=status, headers=headers, media_type="audio/mpeg")
+        body = (audio * (size // len(audio) + 1))[start:end + 1]
+        return Response(body, status_code=status, headers=headers, media_type="audio/mpeg")
+
+    @app.get("/image/{name}")
+    async def image_file(name: str):
+        return Response(b"\x89PNG\r\n\x1a\n" + b"\0" * 1024, media_type="image/png")
+
+    @app.get("/_stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/_reset")
+    async def reset_stats():
+        stats.clear()
+        return {}
+
+    app.state.base_url = "http://127.0.0.1:8765"
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, value in vars(MockConfig()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    return parser.parse_args(argv)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(**{name: getattr(args, name) for name in vars(MockConfig())})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    app = create_app(config_from_args(args))
+    app.state.base_url = f"http://{args.host}:{args.port}"
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -1,12 +1,53 @@
-from .suno import Suno
-from .models import Clip, CreditsInfo, RequestParams, ModelVersions
-
-__all__ = (
-    "Suno",
-    "Clip",
-    "RequestParams",
-    "CreditsInfo",
-    "ModelVersions"
-)
-
-__version__ = "1.0.7"
\ No newline at end of file
+import importlib
+
+# Public names and the submodule defining each. They are imported on first access, so
+# `import suno` stays cheap and only the HTTP library of the client in use is loaded.
+_EXPORTS = {
+    "Suno": ".suno",
+    "AsyncSuno": ".async_suno",
+    "SunoPool": ".pool",
+    "AsyncSunoPool": ".pool",
+    "ClipCache": ".cache",
+    "MemoryCacheBackend": ".cache",
+    "SQLiteCacheBackend": ".cache",
+    "Clip": ".models",
+    "RequestParams": ".models",
+    "BatchItem": ".models",
+    "CreditsInfo": ".models",
+    "ModelVersions": ".models",
+    "Job": ".models",
+    "JobStates": ".models",
+    "JobManager": ".jobs",
+    "JobStore": ".jobs",
+    "Metrics": ".metrics",
+    "PollStrategy": ".poller",
+    "AdaptivePollStrategy": ".poller",
+    "SunoError": ".exceptions",
+    "SunoTimeoutError": ".exceptions",
+    "Transport": ".transport",
+    "GenerationIndex": ".dedup",
+    "MediaCache": ".media",
+    "LibraryMirror": ".library",
+    "SessionStore": ".session",
+    "Coordinator": ".coordinator",
+    "CoordinatorClient": ".coordinator",
+    "AudioPipeline": ".pipeline",
+    "Preview": ".pipeline",
+    "Transcode": ".pipeline",
+}
+
+__all__ = tuple(_EXPORTS)
+
+__version__ = "1.0.7"
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value  # Later lookups skip this function
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
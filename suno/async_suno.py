@@ -0,0 +1,620 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import asyncio
+import datetime
+import logging
+import os
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import httpx
+
+from .models import ModelVersions, Clip, ClipView, CreditsInfo, RequestParams, BatchItem
+from .cache import ClipCache
+from .metrics import Metrics, default_metrics
+from .exceptions import SunoError, SunoAuthError, SunoNotFoundError
+from .transport import Transport, raise_for_status
+from .downloader import ProgressCallback, adownload_file, adownload_tagged, copy_tagged
+from .poller import AsyncFeedPoller, PollStrategy, DONE_STATUSES, chunk_ids
+from .dedup import GenerationIndex, generation_hash
+from .media import MediaCache
+from .pipeline import AudioPipeline, Cover
+from . import batch, library
+from .library import LibraryMirror
+from .coordinator import CoordinatorClient, RemotePoller
+from .singleflight import AsyncSingleFlight
+from .session import BASE_URL, CLERK_BASE_URL, COOKIE, TOKEN_REFRESH_MARGIN, SessionStore
+from .utils import (response_to_clips, generate_fake_useragent, decode_jwt_exp,
+                    build_generate_payload, credits_from_billing, get_download_path, split_song_ids,
+                    json_loads, response_to_views, parse_created_at)
+
+logger = logging.getLogger("SunoAI")
+
+
+class AsyncSuno():
+    """Asyncio version of `Suno`, backed by a pooled `httpx.AsyncClient`.
+
+    The session is bootstrapped lazily on the first call, so the client can be
+    created outside of a running event loop (e.g. at module import time).
+    """
+
+    def __init__(self, cookie: Optional[str] = None, model_version: str = ModelVersions.CHIRP_V3_5,
+                 limits: Optional[httpx.Limits] = None, timeout: float = 30.0,
+                 cache: ClipCache | bool = True, base_url: Optional[str] = None,
+                 clerk_base_url: Optional[str] = None, metrics: Optional[Metrics] = None,
+                 poll_strategy: Optional[PollStrategy] = None, transport: Optional[Transport] = None,
+                 index: Optional[GenerationIndex] = None, media_cache: Optional[MediaCache] = None,
+                 session_file: Optional[str] = None, library: Optional[LibraryMirror] = None,
+                 pipeline: Optional[AudioPipeline] = None,
+                 coordinator: Optional[CoordinatorClient] = None) -> None:
+        """
+        Initialize the asynchronous Suno client.
+
+        Parameters:
+        - cookie (Optional[str]): Optional. The authentication cookie for the Suno API. If not provided, it will use the cookie from the environment variable SUNO_COOKIE.
+        - model_version (str): Optional. The model version to use for generating audio. Default is `chirp-v3-5`.
+        - limits (Optional[httpx.Limits]): Optional. Connection pool limits of the underlying HTTP clients, instead of the pool sizes of `transport`.
+        - timeout (float): Optional. Read timeout in seconds for each HTTP request when no `transport` is given. Default is 30.
+        - cache (ClipCache | bool): Optional. Cache for song lookups. True uses an in-memory cache, False disables caching. Default is True.
+        - base_url (Optional[str]): Optional. Suno API base URL. Defaults to SUNO_BASE_URL or `Suno.BASE_URL`.
+        - clerk_base_url (Optional[str]): Optional. Clerk auth base URL. Defaults to SUNO_CLERK_BASE_URL or `Suno.CLERK_BASE_URL`.
+        - metrics (Optional[Metrics]): Optional. Where upstream request metrics are recorded. Defaults to the shared `suno.metrics.default_metrics`.
+        - poll_strategy (Optional[PollStrategy]): Optional. How often to poll while waiting for songs. Defaults to an `AdaptivePollStrategy` that learns how long each model takes.
+        - transport (Optional[Transport]): Optional. Rate limits, timeouts, retries, circuit breaker and connection pools (sizes, keep-alive, HTTP/2, DNS cache, compression) of all upstream requests, downloads included. Use one per client.
+        - index (Optional[GenerationIndex]): Optional. Where generated song IDs are remembered for idempotency keys and `reuse_within`. Defaults to an in-memory index.
+        - media_cache (Optional[MediaCache]): Optional. On-disk cache that `download` fills and serves repeated downloads from. Default is no cache.
+        - session_file (Optional[str]): Optional. JSON file where the session ID and token are saved for reuse after a restart. Defaults to the SUNO_SESSION_FILE environment variable.
+        - library (Optional[LibraryMirror]): Optional. Local copy of the account's songs used by `search`. Defaults to an in-memory mirror.
+        - pipeline (Optional[AudioPipeline]): Optional. ID3 tags, cover art and post-processing steps applied by `download`. Default is none, which saves the file as served.
+        - coordinator (Optional[CoordinatorClient]): Optional. Take session tokens, rate limits and song polling from a `suno.coordinator` process shared by several workers.
+        """
+        if cookie is None:
+            cookie = COOKIE
+        if cookie == "":
+            raise Exception("Environment variable SUNO_COOKIE is not found !")
+
+        if model_version not in ModelVersions.AVAILABLE_MODELS:
+            raise ValueError(f"Invalid model version. Available models are: {ModelVersions.AVAILABLE_MODELS}")
+
+        headers = {
+            'User-Agent': generate_fake_useragent(),
+            'Cookie': cookie
+        }
+        self.transport = transport or Transport(read_timeout=timeout)
+        self.client = self.transport.async_client(headers, limits=limits)
+        # Audio CDN requests get their own pool and never carry the cookie or JWT
+        self.cdn_client = self.transport.async_client({'User-Agent': headers['User-Agent']}, cdn=True, limits=limits)
+        self.current_token = None
+        self.token_expires_at = 0.0
+        self.sid = None
+        self.model_version = model_version
+        self.base_url = (base_url or os.getenv("SUNO_BASE_URL") or BASE_URL).rstrip("/")
+        self.clerk_base_url = (clerk_base_url or os.getenv("SUNO_CLERK_BASE_URL") or CLERK_BASE_URL).rstrip("/")
+        self.cache: Optional[ClipCache] = ClipCache() if cache is True else (cache or None)
+        self.metrics = metrics or default_metrics
+        if self.cache is not None:
+            self.metrics.register_cache(self.cache)
+        # One poller per client batches the feed calls of all concurrent waits
+        self.poller = AsyncFeedPoller(self._fetch_songs, poll_strategy, metrics=self.metrics)
+        # Concurrent lookups of the same songs or credits share one upstream request
+        self._song_flights = AsyncSingleFlight()
+        self._flights = AsyncSingleFlight()
+        self.index = index or GenerationIndex()
+        self.media_cache = media_cache
+        session_file = session_file or os.getenv("SUNO_SESSION_FILE")
+        self.session_store = SessionStore(session_file) if session_file else None
+        self._session_key = SessionStore.key(cookie)
+        self._sid_restored = False
+        self.library = library or LibraryMirror()
+        self.pipeline = pipeline
+        self.coordinator = coordinator
+        if coordinator is not None:
+            self.poller = RemotePoller(coordinator, self._session_key, poll_strategy)
+            self.transport.limiter = lambda host: coordinator.call("admit", self._session_key, host=host)
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def session_key(self) -> str:
+        """Identifies this client's account without revealing its cookie, as used by `SessionStore` and the coordinator."""
+        return self._session_key
+
+    async def __aenter__(self) -> "AsyncSuno":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Cancel background token renewal and close the connection pool."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        await self.client.aclose()
+        await self.cdn_client.aclose()
+
+    async def _get_session_id(self) -> None:
+        """Retrieve a session ID from the Suno service."""
+        url = f"{self.clerk_base_url}/v1/client?_clerk_js_version=4.72.1"
+        response = await self._send("GET", url)
+        raise_for_status(response)
+        data = response.json()
+        if not data['response']:
+            raise Exception(
+                "Failed to get session id, you may need to update the SUNO_COOKIE")
+        if 'last_active_session_id' in data['response']:
+            self.sid = data['response']['last_active_session_id']
+        else:
+            raise Exception(
+                f"Failed to get Session ID: {response.status_code}")
+
+    async def _keep_alive(self, force: bool = False) -> None:
+        """Renew the authentication token if it is missing or about to expire."""
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+
+        async with self._token_lock:
+            if not force and self.current_token and time.time() < self.token_expires_at - TOKEN_REFRESH_MARGIN:
+                return  # Cached token is still valid
+            if self.coordinator is not None:
+                await self._fetch_session(force)
+                return
+            if not self.sid and self._restore_session() and not force:
+                return  # Token saved by an earlier process is still valid
+            try:
+                await self._renew_token()
+            except (SunoAuthError, SunoNotFoundError):
+                if not self._sid_restored:
+                    raise
+                logger.info("Saved session is no longer valid, starting a new one...")
+                self.sid = None
+                await self._renew_token()
+            self._sid_restored = False
+
+    async def _renew_token(self) -> None:
+        if not self.sid:
+            await self._get_session_id()
+        renew_url = f"{self.clerk_base_url}/v1/client/sessions/{self.sid}/tokens?_clerk_js_version=4.72.0-snapshot.vc141245"
+        renew_response = await self._send("POST", renew_url, idempotent=True)
+        raise_for_status(renew_response)
+        logger.info("Renew Token ♻️")
+        self._set_token(renew_response.json()['jwt'])
+        if self.session_store is not None:
+            self.session_store.save(self._session_key, self.sid, self.current_token, self.token_expires_at)
+
+    async def _fetch_session(self, force: bool) -> None:
+        """Take the token from the coordinator, which renews it for all workers."""
+        session = await self.coordinator.call("session", self._session_key, stale=self.current_token if force else None)
+        self.sid = session["sid"]
+        self._set_token(session["jwt"])
+
+    def _set_token(self, token: str) -> None:
+        self.current_token = token
+        self.token_expires_at = decode_jwt_exp(token) or 0.0
+        self._schedule_refresh()
+
+    def _restore_session(self) -> bool:
+        """Take the session ID saved by an earlier process, and its token if still valid."""
+        saved = self.session_store.load(self._session_key) if self.session_store is not None else None
+        if saved is None:
+            return False
+        self.sid = saved["sid"]
+        self._sid_restored = True
+        if not saved.get("jwt") or time.time() >= (saved.get("expires_at") or 0) - TOKEN_REFRESH_MARGIN:
+            return False
+        logger.info("Reusing saved session token ♻️")
+        self._set_token(saved["jwt"])
+        return True
+
+    def _schedule_refresh(self) -> None:
+        """Schedule a background renewal shortly before the current token expires."""
+        if self._refresh_task is not None and self._refresh_task is not asyncio.current_task():
+            self._refresh_task.cancel()
+        self._refresh_task = None
+        delay = self.token_expires_at - TOKEN_REFRESH_MARGIN - time.time()
+        if delay > 0:
+            self._refresh_task = asyncio.create_task(self._background_refresh(delay))
+
+    async def _background_refresh(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self._keep_alive(force=True)
+        except Exception as e:
+            # The next request will renew the token on demand instead
+            logger.warning(f"Background token renewal failed: {e}")
+
+    async def _request(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """Send an authenticated request, renewing the token once if it is rejected with 401.
+
+        Raises a `SunoError` subclass if the request ultimately fails.
+        """
+        await self._keep_alive()
+        response = await self._send(method, url, idempotent, headers=self._auth_headers(), **kwargs)
+        if response.status_code == 401:
+            logger.info("Token rejected, retrying with a fresh one...")
+            self.metrics.inc("suno_upstream_retries_total", reason="401")
+            await self._keep_alive(force=True)
+            response = await self._send(method, url, idempotent, headers=self._auth_headers(), **kwargs)
+        raise_for_status(response)
+        return response
+
+    async def _send(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """Send one HTTP request through the transport, which rate limits, retries and records metrics."""
+        return await self.transport.asend(self.client, method, url, idempotent, self.metrics, **kwargs)
+
+    def _auth_headers(self) -> dict:
+        return {'Authorization': f"Bearer {self.current_token}"}
+
+    def _cehck_error(self, response: httpx.Response) -> None:
+        try:
+            resp = response.json()
+        except ValueError:
+            return
+        if isinstance(resp, dict) and resp.get('detail'):
+            raise SunoError(resp['detail'])
+
+    async def generate(self, prompt, is_custom, tags="", title="", make_instrumental=False, wait_audio=False, model_version: Optional[str] = None,
+                       idempotency_key: Optional[str] = None, reuse_within: Optional[float] = None) -> List[Clip]:
+        """Generate songs. Same parameters and return value as `Suno.generate`."""
+        logger.info("Generating Audio...")
+
+        if model_version is None:
+            model_version = self.model_version
+
+        digest = generation_hash(prompt, is_custom, tags, title, make_instrumental, model_version)
+        clips = await self._find_generation(digest, idempotency_key, reuse_within)
+        if clips is None:
+            payload = build_generate_payload(
+                prompt, is_custom, tags, title, make_instrumental, model_version)
+            if idempotency_key:
+                # Concurrent retries with the same key share the first submission
+                clips = await self._flights.do(("generate", idempotency_key),
+                                                lambda: self._submit_once(payload, digest, idempotency_key))
+            else:
+                clips = await self._submit(payload, digest, None)
+
+        if wait_audio and any(clip.status not in DONE_STATUSES for clip in clips):
+            return await self._wait_for_audio([clip.id for clip in clips], model_version)
+        logger.info("Generated Audio Successfully ✅")
+        return clips
+
+    async def generate_batch(self, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                             timeout: Optional[float] = None) -> List[BatchItem]:
+        """Generate songs for many requests at once. Same parameters and return value as `Suno.generate_batch`."""
+        items = [item async for item in self.iter_batch(requests, concurrency, wait_audio, timeout)]
+        return sorted(items, key=lambda item: item.index)
+
+    def iter_batch(self, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                   timeout: Optional[float] = None) -> AsyncIterator[BatchItem]:
+        """Like `generate_batch`, but yields each item as soon as it finishes."""
+        return batch.aiter_batch(self, requests, concurrency, wait_audio, timeout)
+
+    async def _submit_once(self, payload: dict, digest: str, idempotency_key: str) -> List[Clip]:
+        """Submit under the flight of `idempotency_key`, unless a call that just left it already recorded songs."""
+        song_ids = self.index.by_key(idempotency_key, digest)
+        if song_ids:
+            logger.info("Attaching to the songs of an earlier request with the same key ♻️")
+            return await self.get_songs(song_ids)
+        return await self._submit(payload, digest, idempotency_key)
+
+    async def _submit(self, payload: dict, digest: str, idempotency_key: Optional[str]) -> List[Clip]:
+        """Post a generation request and remember its songs in the generation index."""
+        response = await self._request(
+            "POST", f"{self.base_url}/api/generate/v2/", json=payload)
+        logger.debug(response.text)
+
+        self._cehck_error(response)
+
+        if response.status_code != 200:
+            logger.error("Audio Generate Failed ⁉️")
+            raise Exception(f"Error response: {response.text}")
+
+        clips = response_to_clips(response.json()['clips'])
+        self.index.record(digest, idempotency_key, [clip.id for clip in clips])
+        return clips
+
+    def lookup_generation(self, prompt, is_custom, tags="", title="", make_instrumental=False, wait_audio=False,
+                          model_version: Optional[str] = None, idempotency_key: Optional[str] = None,
+                          reuse_within: Optional[float] = None) -> Optional[List[str]]:
+        """Return the song IDs of an earlier generation that the same `generate` call may attach to, if any."""
+        digest = generation_hash(prompt, is_custom, tags, title, make_instrumental, model_version or self.model_version)
+        song_ids = self.index.by_key(idempotency_key, digest) if idempotency_key else None
+        if song_ids is None and reuse_within:
+            song_ids = self.index.by_hash(digest, reuse_within)
+        return song_ids
+
+    async def _find_generation(self, digest: str, idempotency_key: Optional[str],
+                               reuse_within: Optional[float]) -> Optional[List[Clip]]:
+        """Return the songs of an earlier generation to attach to instead of generating new ones."""
+        if idempotency_key:
+            song_ids = self.index.by_key(idempotency_key, digest)
+            if song_ids:
+                logger.info("Attaching to the songs of an earlier request with the same key ♻️")
+                return await self.get_songs(song_ids)
+        if reuse_within:
+            song_ids = self.index.by_hash(digest, reuse_within)
+            if song_ids:
+                clips = await self.get_songs(song_ids)
+                if len(clips) == len(song_ids) and all(clip.status == "complete" for clip in clips):
+                    logger.info("Reusing the songs of an identical request ♻️")
+                    return clips
+        return None
+
+    async def _wait_for_audio(self, song_ids, model_version=None):
+        """Helper coroutine to wait for audio processing to complete."""
+        clips = await self.poller.wait(song_ids, model=model_version)  # Timeout chosen by the poll strategy
+        logger.info("Generated Audio Successfully ✅")
+        return clips
+
+    def watch(self, song_ids: List[str], timeout: float = 100, initial: Optional[List[Clip]] = None) -> AsyncIterator[Clip]:
+        """
+        Follow the processing of songs without blocking on the final result.
+
+        Parameters:
+        - song_ids (List[str]): IDs of the songs to follow, e.g. from `generate(..., wait_audio=False)`.
+        - timeout (float): Stop following after this many seconds. Default is 100.
+        - initial (Optional[List[Clip]]): Clips already known to the caller; their current status is not reported again.
+
+        Returns:
+        AsyncIterator[Clip]: Yields a Clip each time its status changes (`submitted` → `queued` → `streaming` → `complete`/`error`).
+        """
+        return self.poller.watch(song_ids, timeout=timeout, initial=initial)
+
+    async def wait(self, song_ids: List[str], timeout: Optional[float] = None, deadline: Optional[float] = None) -> List[Clip]:
+        """
+        Wait until songs are streaming or complete, e.g. after `generate(..., wait_audio=False)`.
+
+        Parameters:
+        - song_ids (List[str]): IDs of the songs to wait for.
+        - timeout (Optional[float]): Maximum number of seconds to wait. Defaults to the poll strategy's timeout (at least 100).
+        - deadline (Optional[float]): Absolute `time.time()` after which to stop waiting, e.g. shared by several calls.
+
+        Returns:
+        List[Clip]: The songs, all streaming, complete or failed.
+
+        Raises:
+        SunoTimeoutError: The songs were not ready in time; its `clips` holds their last known state.
+        """
+        return await self.poller.wait(song_ids, timeout=timeout, deadline=deadline)
+
+    async def get_songs(self, song_ids: List[str] | str = None) -> List[Clip]:
+        """Retrieve songs from the library. Same parameters and return value as `Suno.get_songs`."""
+        if not song_ids:
+            return await self._fetch_songs()
+        song_ids = split_song_ids(song_ids)
+        found = {}
+        if self.cache is not None:
+            for song_id in song_ids:
+                clip = self.cache.get(song_id)
+                if clip is not None:
+                    found[song_id] = clip
+        missing = [song_id for song_id in song_ids if song_id not in found]
+        if missing:
+            found.update(await self._fetch_shared(missing))
+        return [found[song_id] for song_id in song_ids if song_id in found]
+
+    async def _fetch_shared(self, song_ids: List[str]) -> Dict[str, Clip]:
+        """Fetch songs by ID, joining the requests already in flight for any of them."""
+        found = await self._song_flights.do_many(song_ids, self._fetch_by_id)
+        return {song_id: clip for song_id, clip in found.items() if clip is not None}
+
+    async def _fetch_by_id(self, song_ids: List[str]) -> Dict[str, Clip]:
+        found = {}
+        for chunk in chunk_ids(song_ids):
+            for clip in await self._fetch_songs(chunk):
+                found[clip.id] = clip
+        return found
+
+    async def _fetch_songs(self, song_ids: Optional[List[str]] = None) -> List[Clip]:
+        """Fetch songs from the feed, bypassing and refreshing the cache."""
+        url = f"{self.base_url}/api/feed/"
+        if song_ids:
+            url += f"?ids={','.join(song_ids)}"
+        logger.info("Getting Songs Info...")
+        response = await self._request("GET", url)  # Call API
+        logger.debug(response.text)
+        self._cehck_error(response)
+        clips = response_to_clips(response.json())
+        if self.cache is not None:
+            for clip in clips:
+                self.cache.put(clip)
+        return clips
+
+    async def get_feed(self, song_ids: List[str] | str = None) -> List[ClipView]:
+        """
+        Fast variant of `get_songs` for large feeds: skips the cache and model validation.
+
+        Parameters:
+        - song_ids (str or List[str]): Same as `get_songs`.
+
+        Returns:
+        List[ClipView]: Views over the raw feed entries; use `.raw` for the JSON dict or `.clip` for a validated Clip.
+        """
+        url = f"{self.base_url}/api/feed/"
+        if song_ids:
+            url += f"?ids={','.join(split_song_ids(song_ids))}"
+        logger.info("Getting Songs Info...")
+        return response_to_views(await self._get_feed_json(url))
+
+    async def get_feed_page(self, page: int = 0) -> List[ClipView]:
+        """Retrieve one page of the library feed (newest first) as `ClipView` objects."""
+        logger.info(f"Getting Library Page {page}...")
+        return response_to_views(await self._get_feed_json(f"{self.base_url}/api/feed/?page={page}"))
+
+    async def _get_feed_json(self, url: str) -> list:
+        response = await self._request("GET", url)  # Call API
+        data = json_loads(response.content)
+        if isinstance(data, dict) and data.get('detail'):
+            raise SunoError(data['detail'])
+        return data
+
+    async def iter_library(self, since: Optional[str | datetime.datetime] = None, filter: Optional[Callable] = None,
+                           lazy: bool = False, max_pages: Optional[int] = None) -> AsyncIterator[Clip | ClipView]:
+        """
+        Iterate over the whole library page by page, newest songs first, with flat memory use.
+
+        The next page is fetched while the current one is being consumed.
+
+        Parameters:
+        - since (Optional[str | datetime]): Stop at the first song created at or before this time, for incremental syncs.
+        - filter (Optional[Callable]): Only yield songs for which `filter(song)` is true.
+        - lazy (bool): Yield `ClipView` objects instead of validated `Clip` objects. Default is False.
+        - max_pages (Optional[int]): Stop after this many pages.
+
+        Returns:
+        AsyncIterator[Clip | ClipView]: Songs one at a time.
+        """
+        since = parse_created_at(since) if since else None
+        page = 0
+        next_page = asyncio.create_task(self.get_feed_page(page))
+        try:
+            while next_page is not None:
+                views = await next_page
+                page += 1
+                next_page = None
+                if views and (max_pages is None or page < max_pages):
+                    next_page = asyncio.create_task(self.get_feed_page(page))
+                for view in views:
+                    if since and parse_created_at(view.created_at) <= since:
+                        return
+                    song = view if lazy else view.clip
+                    if filter is None or filter(song):
+                        yield song
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def sync_library(self) -> List[str]:
+        """Fetch new and changed songs into the local library mirror. Same as `Suno.sync_library`."""
+        return await self._flights.do("sync", lambda: library.async_sync(self, self.library))
+
+    async def search(self, query: Optional[str] = None, tags: Optional[str] = None, status: Optional[str] = None,
+                     model_name: Optional[str] = None, limit: int = 50, offset: int = 0,
+                     max_age: float = library.SYNC_INTERVAL) -> List[Clip]:
+        """Search the songs of the account in the local library mirror. Same parameters as `Suno.search`."""
+        if time.time() - self.library.synced_at() > max_age:
+            await self.sync_library()
+        return self.library.search(query, tags, status, model_name, limit, offset)
+
+    async def get_song(self, id: str) -> Clip:
+        """Retrieve a single song by its ID."""
+        if self.cache is not None:
+            clip = self.cache.get(id)
+            if clip is not None:
+                return clip
+        logger.info("Getting Song Info...")
+        clip = (await self._fetch_shared([id])).get(id)
+        if clip is None:
+            raise SunoNotFoundError(404, f"Song not found: {id}")
+        return clip
+
+    async def set_visibility(self, song_id: str, is_public: bool) -> bool:
+        """Set the visibility of a song to public (True) or private (False)."""
+        payload = {
+            "is_public": is_public
+        }
+        response = await self._request(
+            "POST", f"{self.base_url}/api/gen/{song_id}/set_visibility/", idempotent=True, json=payload)
+        logger.debug(response.text)
+        if response.status_code == 200:
+            is_public = response.json()["is_public"]
+            if self.cache is not None:
+                self.cache.set_visibility(song_id, is_public)
+            return is_public
+        raise Exception(f"Error setting visibility: {response.text}")
+
+    async def get_credits(self) -> CreditsInfo:
+        """Retrieve current billing and credits information."""
+        return await self._flights.do("credits", self._fetch_credits)
+
+    async def _fetch_credits(self) -> CreditsInfo:
+        logger.info("Credits Info...")
+        response = await self._request(
+            "GET", f"{self.base_url}/api/billing/info/")
+        logger.debug(response.text)
+        self._cehck_error(response)
+        if response.status_code == 200:
+            return credits_from_billing(response.json())
+        raise Exception(f"Error retrieving credits: {response.text}")
+
+    async def download(self, song: str | Clip, path: str = "./downloads", progress: Optional[ProgressCallback] = None) -> str:
+        """Download a Suno song to `path`. Same parameters and return value as `Suno.download`."""
+        if isinstance(song, str):
+            song = await self.get_song(song)
+        elif not isinstance(song, Clip):
+            raise TypeError
+        target = get_download_path(song, path)
+        if self.pipeline is not None:
+            return await self._download_processed(song, target, progress)
+        cached = self.media_cache.get(song.id) if self.media_cache is not None else None
+        if cached is not None:
+            logger.info(f"Copied from media cache: {target}")
+            return await asyncio.to_thread(self.media_cache.copy_to, cached, target)
+        url = song.audio_url
+        logger.info(f"Audio URL : {url}")
+        with self.metrics.track_request("GET", url) as info:
+            filename = await adownload_file(self.cdn_client, url, target, progress)
+            info["status"] = 200
+        if self.media_cache is not None:
+            await asyncio.to_thread(self.media_cache.put_file, song.id, "audio", filename, "audio/mpeg")
+        logger.info(f"Download complete: {filename}")
+        return filename
+
+    async def _download_processed(self, song: Clip, target: str, progress: Optional[ProgressCallback]) -> str:
+        """Asyncio version of `Suno._download_processed`; the cover is fetched while the audio request is made."""
+        header = asyncio.ensure_future(self._pipeline_header(song))
+        try:
+            cached = self.media_cache.get(song.id) if self.media_cache is not None else None
+            if cached is not None:
+                filename = await asyncio.to_thread(copy_tagged, cached.path, target, await header)
+            else:
+                fill = self.media_cache.filler(song.id, "audio", "audio/mpeg") if self.media_cache is not None else None
+                with self.metrics.track_request("GET", song.audio_url) as info:
+                    filename = await adownload_tagged(self.cdn_client, song.audio_url, target, header, fill, progress)
+                    info["status"] = 200
+        finally:
+            header.cancel()  # Only still running if the audio request failed
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in self.pipeline.submit(filename, song)))
+        logger.info(f"Download complete: {filename}")
+        return filename
+
+    async def _pipeline_header(self, song: Clip) -> bytes:
+        return self.pipeline.header(song, await self._fetch_cover(song) if self.pipeline.cover else None)
+
+    async def _fetch_cover(self, song: Clip) -> Optional[Cover]:
+        """Cover image of a song, or None if it has none or it cannot be fetched; the song is saved without it then."""
+        cached = self.media_cache.get(song.id, "image") if self.media_cache is not None else None
+        if cached is not None:
+            return Cover(await asyncio.to_thread(cached.path.read_bytes), cached.content_type)
+        url = song.image_large_url or song.image_url
+        if not url:
+            return None
+        try:
+            with self.metrics.track_request("GET", url) as info:
+                response = await self.cdn_client.get(url)
+                info["status"] = response.status_code
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not fetch the cover of {song.id}: {e}")
+            return None
+        cover = Cover(response.content, response.headers.get("Content-Type", "image/jpeg"))
+        if self.media_cache is not None:
+            await asyncio.to_thread(self.media_cache.put_bytes, song.id, "image", cover.data, cover.content_type)
+        return cover
+
+    async def download_many(self, songs: List[str | Clip], path: str = "./downloads", concurrency: int = 8,
+                            progress: Optional[ProgressCallback] = None) -> List[str]:
+        """Download several songs in parallel. Same parameters and return value as `Suno.download_many`."""
+        ids = [song for song in songs if isinstance(song, str)]
+        fetched = {clip.id: clip for clip in await self.get_songs(ids)} if ids else {}
+        missing = [song_id for song_id in ids if song_id not in fetched]
+        if missing:
+            raise Exception(f"Songs not found: {', '.join(missing)}")
+        clips = [fetched[song] if isinstance(song, str) else song for song in songs]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def download(clip: Clip) -> str:
+            async with semaphore:
+                return await self.download(clip, path, progress)
+
+        return await asyncio.gather(*(download(clip) for clip in clips))
@@ -0,0 +1,142 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import asyncio
+import logging
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from .exceptions import SunoIdempotencyError, SunoInsufficientCreditsError, SunoTimeoutError
+from .models import CREDITS_PER_GENERATION, BatchItem, Clip, RequestParams
+from .poller import DONE_STATUSES
+
+logger = logging.getLogger("SunoAI")
+
+# Most threads a synchronous batch blocks in `wait` at once; all waits share one poller
+MAX_WAITERS = 32
+
+
+def _options(params: RequestParams) -> dict:
+    options = params.model_dump()
+    options["wait_audio"] = False  # Waits are done by the batch, so submissions are not held up
+    return options
+
+
+def _credits_needed(client, requests: List[RequestParams]) -> Tuple[int, Dict[int, Exception]]:
+    """Credits of the requests that will actually generate, i.e. not attach to earlier songs.
+
+    Also returns the errors of requests that cannot be made at all, by index; they are
+    reported as failed items and not counted.
+    """
+    new, rejected = 0, {}
+    for index, params in enumerate(requests):
+        try:
+            if not client.lookup_generation(**_options(params)):
+                new += 1
+        except SunoIdempotencyError as e:
+            rejected[index] = e
+    return new * CREDITS_PER_GENERATION, rejected
+
+
+def _item(index: int, clips: List[Clip], wait_audio: bool) -> Optional[BatchItem]:
+    """The finished item, or None while its clips still need to be waited for."""
+    if wait_audio and any(clip.status not in DONE_STATUSES for clip in clips):
+        return None
+    failed = [clip.id for clip in clips if clip.status == "error"]
+    return BatchItem(index=index, clips=clips, error=f"Songs failed: {', '.join(failed)}" if failed else None)
+
+
+def _failed(index: int, error: Exception) -> BatchItem:
+    clips = error.clips if isinstance(error, SunoTimeoutError) else []
+    return BatchItem(index=index, clips=clips, error=str(error))
+
+
+def iter_batch(client, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+               timeout: Optional[float] = None) -> Iterator[BatchItem]:
+    """Generate `requests` with `client` (`Suno` or `SunoPool`), yielding each item as it finishes.
+
+    Up to `concurrency` generations are submitted at once and all waits share the
+    client's poller. Raises `SunoInsufficientCreditsError` before submitting anything
+    if the batch needs more credits than are left.
+    """
+    needed, rejected = _credits_needed(client, requests)
+    if needed:
+        available = client.get_credits().credits_left
+        if needed > available:
+            raise SunoInsufficientCreditsError(needed, available)
+    logger.info(f"Generating a batch of {len(requests)} requests...")
+    deadline = time.time() + timeout if timeout is not None else None
+    finished: "queue.SimpleQueue[BatchItem]" = queue.SimpleQueue()
+    submitters = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="SunoBatch")
+    waiters = ThreadPoolExecutor(max_workers=min(len(requests), MAX_WAITERS) or 1, thread_name_prefix="SunoBatchWait")
+
+    def wait(index: int, clips: List[Clip]) -> None:
+        try:
+            finished.put(_item(index, client.wait([clip.id for clip in clips], deadline=deadline), False))
+        except Exception as e:
+            finished.put(_failed(index, e))
+
+    def submitted(index: int, future: Future) -> None:
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            finished.put(_failed(index, future.exception()))
+            return
+        clips = future.result()
+        item = _item(index, clips, wait_audio)
+        if item is None:
+            try:
+                waiters.submit(wait, index, clips)
+            except RuntimeError:
+                pass  # The caller stopped iterating and the batch was shut down
+        else:
+            finished.put(item)
+
+    try:
+        for index, params in enumerate(requests):
+            if index in rejected:
+                finished.put(_failed(index, rejected[index]))
+                continue
+            future = submitters.submit(client.generate, **_options(params))
+            future.add_done_callback(lambda future, index=index: submitted(index, future))
+        for _ in requests:
+            yield finished.get()
+    finally:
+        submitters.shutdown(cancel_futures=True)
+        waiters.shutdown(cancel_futures=True)
+
+
+async def aiter_batch(client, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                      timeout: Optional[float] = None) -> AsyncIterator[BatchItem]:
+    """Asyncio version of `iter_batch` for `AsyncSuno` or `AsyncSunoPool`."""
+    needed, rejected = _credits_needed(client, requests)
+    if needed:
+        available = (await client.get_credits()).credits_left
+        if needed > available:
+            raise SunoInsufficientCreditsError(needed, available)
+    logger.info(f"Generating a batch of {len(requests)} requests...")
+    deadline = time.time() + timeout if timeout is not None else None
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, params: RequestParams) -> BatchItem:
+        if index in rejected:
+            return _failed(index, rejected[index])
+        try:
+            async with semaphore:  # Only submissions are limited; waits run side by side
+                clips = await client.generate(**_options(params))
+            item = _item(index, clips, wait_audio)
+            if item is None:
+                item = _item(index, await client.wait([clip.id for clip in clips], deadline=deadline), False)
+            return item
+        except Exception as e:
+            return _failed(index, e)
+
+    tasks = [asyncio.ensure_future(run(index, params)) for index, params in enumerate(requests)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,158 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .models import Clip
+
+# Clips in these states no longer change, so they are cached until evicted
+TERMINAL_STATUSES = ("complete", "error")
+
+
+class CacheBackend():
+    """Storage interface for `ClipCache`. Values are JSON strings keyed by clip ID."""
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Store `value`; it expires after `ttl` seconds, or never if `ttl` is None."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache holding at most `maxsize` entries."""
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """LRU cache in a local SQLite file, so several worker processes can share it."""
+
+    def __init__(self, path: str = "suno_cache.db", maxsize: int = 10000) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS clips ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS clips_accessed_at ON clips (accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data, expires_at FROM clips WHERE id = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] <= now:
+                self._db.execute("DELETE FROM clips WHERE id = ?", (key,))
+                return None
+            self._db.execute("UPDATE clips SET accessed_at = ? WHERE id = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO clips (id, data, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now))
+            self._db.execute(
+                "DELETE FROM clips WHERE id IN (SELECT id FROM clips ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM clips WHERE id = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM clips")
+
+
+class ClipCache():
+    """Clip cache with status-aware expiry.
+
+    Finished clips (`complete`/`error`) stay until the backend evicts them, while
+    clips still being generated expire after `pending_ttl` seconds.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, pending_ttl: float = 2.0) -> None:
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.pending_ttl = pending_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clip_id: str) -> Optional[Clip]:
+        value = self.backend.get(clip_id)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Clip.model_validate_json(value)
+
+    def put(self, clip: Clip) -> None:
+        ttl = None if clip.status in TERMINAL_STATUSES else self.pending_ttl
+        self.backend.set(clip.id, clip.model_dump_json(), ttl)
+
+    def set_visibility(self, clip_id: str, is_public: bool) -> None:
+        """Update the cached `is_public` flag of a clip, if it is cached."""
+        value = self.backend.get(clip_id)
+        if value is not None:
+            clip = Clip.model_validate_json(value)
+            clip.is_public = is_public
+            self.put(clip)
+
+    def invalidate(self, clip_id: str) -> None:
+        self.backend.delete(clip_id)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,357 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import signal
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from . import exceptions
+from .exceptions import SunoConnectionError, SunoError, SunoHTTPError, SunoTimeoutError
+from .models import Clip
+from .poller import AdaptivePollStrategy, PollStrategy
+from .utils import json_dumps, json_loads
+
+logger = logging.getLogger("SunoAI")
+
+# Where the coordinator listens unless told otherwise
+DEFAULT_SOCKET = "/tmp/suno-coordinator.sock"
+
+# Largest message in bytes, e.g. the clips of a big wait
+MAX_MESSAGE = 2 ** 24
+
+# Fields each op needs besides "id" and "op"
+OP_FIELDS = {"cancel": ("ref",), "session": (), "admit": ("host",), "wait": ("ids",), "watch": ("ids", "timeout")}
+
+
+def _encode_error(error: Exception) -> dict:
+    data = {"type": type(error).__name__, "message": str(error)}
+    if isinstance(error, SunoTimeoutError):
+        data.update(song_ids=error.song_ids, clips=[clip.model_dump() for clip in error.clips])
+    elif isinstance(error, SunoHTTPError):
+        data.update(status_code=error.status_code, detail=error.detail)
+    for name in ("host", "retry_after", "idempotency_key", "needed", "available"):
+        if hasattr(error, name):
+            data[name] = getattr(error, name)
+    return data
+
+
+def _decode_error(data: dict) -> Exception:
+    """Rebuild an error raised in the coordinator as the same `SunoError` subclass."""
+    cls = getattr(exceptions, data.get("type", ""), None)
+    if not isinstance(cls, type) or not issubclass(cls, SunoError):
+        return SunoError(data.get("message", "Coordinator error"))
+    if cls is SunoTimeoutError:
+        return cls(data["song_ids"], [Clip.model_validate(clip) for clip in data["clips"]])
+    if cls is exceptions.SunoRateLimitError:
+        return cls(data["status_code"], data["detail"], data.get("retry_after"))
+    if issubclass(cls, SunoHTTPError):
+        return cls(data["status_code"], data["detail"])
+    if cls is exceptions.SunoCircuitOpenError:
+        return cls(data["host"], data["retry_after"])
+    if cls is exceptions.SunoIdempotencyError:
+        return cls(data["idempotency_key"])
+    if cls is exceptions.SunoInsufficientCreditsError:
+        return cls(data["needed"], data["available"])
+    return cls(data.get("message", ""))
+
+
+def _malformed(message) -> Optional[str]:
+    """Why the coordinator can't handle `message`, or None if it can."""
+    if not isinstance(message, dict) or not isinstance(message.get("id"), int):
+        return "Message is not an object with an integer id"
+    if message.get("op") not in OP_FIELDS:
+        return f"Unknown op {message.get('op')!r}"
+    missing = [name for name in OP_FIELDS[message["op"]] if name not in message]
+    if missing:
+        return f"Message for op {message['op']!r} is missing {', '.join(missing)}"
+    return None
+
+
+def _result(message: dict):
+    if "error" in message:
+        raise _decode_error(message["error"])
+    return message.get("result")
+
+
+class Coordinator():
+    """Serves one client's session tokens, rate limits and feed polling to API worker processes.
+
+    Run it once per host (`python -m suno.coordinator`) and give every worker an
+    `AsyncSuno` or `AsyncSunoPool` with `coordinator=CoordinatorClient(path)`. Workers then
+    renew no tokens of their own, take every request from the same rate limits and
+    wait for clips through the coordinator's single poller, so N workers cost the
+    upstream no more than one. Messages are JSON lines over a Unix socket only the
+    owner may open.
+    """
+
+    def __init__(self, client, path: str = DEFAULT_SOCKET) -> None:
+        accounts = [account.client for account in client.accounts] if hasattr(client, "accounts") else [client]
+        self.clients = {account.session_key: account for account in accounts}
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._ops: Dict[str, Callable[..., Awaitable]] = {
+            "session": self._session, "admit": self._admit, "wait": self._wait}
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left behind by an earlier run
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path, limit=MAX_MESSAGE)
+        os.chmod(self.path, 0o600)
+        logger.info(f"Coordinator listening on {self.path} for {len(self.clients)} account(s) 🧭")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in self._connections.values():
+                writer.close()  # Their handlers see EOF and finish
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        tasks: Dict[int, asyncio.Task] = {}
+        self._connections[asyncio.current_task()] = writer
+
+        async def send(message: dict) -> None:
+            try:
+                writer.write(json_dumps(message) + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                pass  # The worker went away; its tasks are cancelled below
+
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json_loads(line)
+                except ValueError:
+                    message = None
+                problem = _malformed(message)
+                if problem is not None:
+                    # Answer instead of dropping the connection, which would fail the worker's other calls
+                    logger.warning(f"Coordinator got a malformed message: {problem}")
+                    id = message.get("id") if isinstance(message, dict) else None
+                    await send({"id": id, "error": _encode_error(SunoError(problem))})
+                    continue
+                if message["op"] == "cancel":
+                    task = tasks.get(message["ref"])
+                    if task is not None:
+                        task.cancel()
+                    continue
+                task = asyncio.create_task(self._handle(message, send))
+                tasks[message["id"]] = task
+                task.add_done_callback(lambda _, id=message["id"]: tasks.pop(id, None))
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Coordinator connection failed: {e}")
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            writer.close()
+            self._connections.pop(asyncio.current_task(), None)
+
+    async def _handle(self, message: dict, send: Callable[[dict], Awaitable[None]]) -> None:
+        try:
+            client = self.clients.get(message.get("key"))
+            if client is None:
+                raise SunoError("Unknown account; start the coordinator with the same cookies as the workers")
+            if message["op"] == "watch":
+                initial = [Clip.model_validate(clip) for clip in message.get("initial") or []]
+                async for clip in client.poller.watch(message["ids"], timeout=message["timeout"], initial=initial):
+                    await send({"id": message["id"], "event": clip.model_dump()})
+                result = None
+            else:
+                result = await self._ops[message["op"]](client, message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await send({"id": message["id"], "error": _encode_error(e)})
+            return
+        await send({"id": message["id"], "result": result})
+
+    async def _session(self, client, message: dict) -> dict:
+        lock = self._session_locks.setdefault(client.session_key, asyncio.Lock())
+        async with lock:
+            # Only renew a token the worker saw rejected; a newer one is handed out as is
+            stale = message.get("stale")
+            await client._keep_alive(force=stale is not None and stale == client.current_token)
+        return {"sid": client.sid, "jwt": client.current_token, "expires_at": client.token_expires_at}
+
+    async def _admit(self, client, message: dict) -> float:
+        return client.transport.reserve(message["host"])
+
+    async def _wait(self, client, message: dict) -> List[dict]:
+        clips = await client.poller.wait(message["ids"], timeout=message.get("timeout"),
+                                         deadline=message.get("deadline"), model=message.get("model"))
+        return [clip.model_dump() for clip in clips]
+
+
+class CoordinatorClient():
+    """Connection of one worker process to the `Coordinator`, shared by all its clients.
+
+    Connects on first use and again after the coordinator restarts; calls in flight
+    when the connection drops raise `SunoConnectionError`.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET) -> None:
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._pending: Dict[int, asyncio.Future | asyncio.Queue] = {}
+        self._ids = itertools.count()
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                try:
+                    reader, self._writer = await asyncio.open_unix_connection(self.path, limit=MAX_MESSAGE)
+                except OSError as e:
+                    raise SunoConnectionError(f"Coordinator is not reachable at {self.path}: {e}") from e
+                self._reader_task = asyncio.create_task(self._read(reader))
+            return self._writer
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                message = json_loads(line)
+                target = self._pending.get(message["id"])
+                if isinstance(target, asyncio.Queue):
+                    target.put_nowait(message)
+                elif target is not None and not target.done():
+                    target.set_result(message)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Coordinator connection failed: {e}")
+        finally:
+            self._writer = None
+            lost = {"error": {"type": "SunoConnectionError", "message": "Lost the connection to the coordinator"}}
+            for id, target in list(self._pending.items()):
+                if isinstance(target, asyncio.Queue):
+                    target.put_nowait({"id": id, **lost})
+                elif not target.done():
+                    target.set_result({"id": id, **lost})
+
+    async def _send(self, message: dict) -> None:
+        writer = await self._connect()
+        writer.write(json_dumps(message) + b"\n")
+        await writer.drain()
+
+    def _cancel(self, id: int) -> None:
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(json_dumps({"id": next(self._ids), "op": "cancel", "ref": id}) + b"\n")
+
+    async def call(self, op: str, key: Optional[str] = None, **params):
+        """Run `op` for the account of `key` in the coordinator and return its result, raising its errors here."""
+        id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[id] = future
+        try:
+            await self._send({"id": id, "op": op, "key": key, **params})
+            message = await future
+        except asyncio.CancelledError:
+            self._cancel(id)
+            raise
+        finally:
+            self._pending.pop(id, None)
+        return _result(message)
+
+    async def stream(self, op: str, key: Optional[str] = None, **params) -> AsyncIterator:
+        """Like `call`, for ops that send events before their result; yields each event."""
+        id = next(self._ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._pending[id] = queue
+        finished = False
+        try:
+            await self._send({"id": id, "op": op, "key": key, **params})
+            while True:
+                message = await queue.get()
+                if "event" not in message:
+                    finished = True
+                    _result(message)
+                    return
+                yield message["event"]
+        finally:
+            self._pending.pop(id, None)
+            if not finished:
+                self._cancel(id)
+
+    async def aclose(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+
+
+class RemotePoller():
+    """Takes the place of a client's `AsyncFeedPoller` in a worker: waits are served by the coordinator's poller.
+
+    Timeouts left to the poll strategy use the coordinator's strategy, which sees every worker's waits.
+    """
+
+    def __init__(self, coordinator: CoordinatorClient, key: str, strategy: Optional[PollStrategy] = None) -> None:
+        self.coordinator = coordinator
+        self.key = key
+        self.strategy = strategy or AdaptivePollStrategy()
+
+    async def wait(self, ids: List[str], timeout: Optional[float] = None, deadline: Optional[float] = None,
+                   model: Optional[str] = None) -> List[Clip]:
+        clips = await self.coordinator.call("wait", self.key, ids=ids, timeout=timeout, deadline=deadline, model=model)
+        return [Clip.model_validate(clip) for clip in clips]
+
+    async def watch(self, ids: List[str], timeout: float = 100, initial: Optional[List[Clip]] = None) -> AsyncIterator[Clip]:
+        async for clip in self.coordinator.stream("watch", self.key, ids=ids, timeout=timeout,
+                                                  initial=[clip.model_dump() for clip in initial or []]):
+            yield Clip.model_validate(clip)
+
+
+async def serve(path: str = DEFAULT_SOCKET) -> None:
+    """Run a coordinator for the accounts in SUNO_COOKIE / SUNO_COOKIES until SIGINT or SIGTERM.
+
+    It also resumes the jobs left in SUNO_JOBS_DB by a previous run, like each worker
+    does when it starts.
+    """
+    from .async_suno import AsyncSuno
+    from .dedup import GenerationIndex
+    from .jobs import JobManager, JobStore
+    from .pool import AsyncSunoPool
+
+    database = os.getenv("SUNO_JOBS_DB", "suno_jobs.db")
+    cookies = [cookie.strip() for cookie in os.getenv("SUNO_COOKIES", "").split("|") if cookie.strip()]
+    index = GenerationIndex(database)
+    client = AsyncSunoPool(cookies=cookies, index=index) if cookies else AsyncSuno(index=index)
+    coordinator = Coordinator(client, path)
+    jobs = JobManager(client, JobStore(database), workers=int(os.getenv("SUNO_JOB_WORKERS", "4")))
+    stopped = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(signum, stopped.set)
+    await coordinator.start()
+    await jobs.start(exclusive=False)  # Workers may be submitting jobs right now
+    try:
+        await stopped.wait()
+    finally:
+        await jobs.stop()
+        await coordinator.stop()
+        await client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Share Suno sessions, rate limits and feed polling between API workers.")
+    parser.add_argument("--socket", default=os.getenv("SUNO_COORDINATOR_SOCKET", DEFAULT_SOCKET),
+                        help="Unix socket path the workers connect to")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
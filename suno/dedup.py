@@ -0,0 +1,74 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from .exceptions import SunoIdempotencyError
+
+# Seconds for which idempotency keys and prompt hashes are remembered
+INDEX_TTL = 86400
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def generation_hash(prompt: str, is_custom: bool, tags: str, title: str, make_instrumental: bool,
+                    model_version: str) -> str:
+    """Hash of the generation parameters, ignoring differences in whitespace and tag case."""
+    key = [_normalize(prompt), bool(is_custom), _normalize(tags).lower(), _normalize(title),
+           bool(make_instrumental), model_version]
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+class GenerationIndex():
+    """Remembers which clip IDs each generation produced, by idempotency key and by prompt hash.
+
+    Kept in memory by default; give a file `path` to keep it across restarts. Share one
+    index between the clients of a pool so retries find the account that made the clips.
+    """
+
+    def __init__(self, path: str = ":memory:", ttl: float = INDEX_TTL) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "hash TEXT NOT NULL, key TEXT UNIQUE, clip_ids TEXT NOT NULL, created_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS generations_hash ON generations (hash, created_at)")
+
+    def record(self, digest: str, idempotency_key: Optional[str], clip_ids: List[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM generations WHERE created_at < ?", (now - self.ttl,))
+            self._db.execute("INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?)",
+                             (digest, idempotency_key, json.dumps(clip_ids), now))
+
+    def by_key(self, idempotency_key: str, digest: str) -> Optional[List[str]]:
+        """Return the clip IDs made under `idempotency_key`, or None if it is new.
+
+        Raises `SunoIdempotencyError` if the key was used with different parameters.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT hash, clip_ids FROM generations WHERE key = ? AND created_at >= ?",
+                                   (idempotency_key, time.time() - self.ttl)).fetchone()
+        if row is None:
+            return None
+        if row[0] != digest:
+            raise SunoIdempotencyError(idempotency_key)
+        return json.loads(row[1])
+
+    def by_hash(self, digest: str, within: float) -> Optional[List[str]]:
+        """Return the clip IDs of the latest generation with the same parameters in the last `within` seconds."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT clip_ids FROM generations WHERE hash = ? AND created_at >= ? ORDER BY created_at DESC LIMIT 1",
+                (digest, time.time() - min(within, self.ttl))).fetchone()
+        return json.loads(row[0]) if row else None
@@ -0,0 +1,223 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import inspect
+import logging
+import os
+import pathlib
+from typing import Awaitable, Callable, Optional
+
+from .pipeline import ID3Stripper
+
+logger = logging.getLogger("SunoAI")
+
+# Bytes read from the network and written to disk per iteration
+CHUNK_SIZE = 1024 * 1024
+
+# Called as progress(filename, bytes_done, total_bytes_or_None) while downloading
+ProgressCallback = Callable[[pathlib.Path, int, Optional[int]], None]
+
+
+def _part_path(filename: pathlib.Path) -> pathlib.Path:
+    return filename.with_name(filename.name + ".part")
+
+
+def _resume_headers(part: pathlib.Path) -> dict:
+    offset = part.stat().st_size if part.exists() else 0
+    return {"Range": f"bytes={offset}-"} if offset else {}
+
+
+def _total_size(status_code: int, headers, offset: int) -> Optional[int]:
+    if status_code == 206 and "/" in headers.get("Content-Range", ""):
+        total = headers["Content-Range"].rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = headers.get("Content-Length")
+    return int(length) + offset if length and length.isdigit() else None
+
+
+def _is_complete(filename: pathlib.Path, size: Optional[str]) -> bool:
+    return filename.exists() and size is not None and size.isdigit() and filename.stat().st_size == int(size)
+
+
+def download_file(session, url: str, filename: pathlib.Path, progress: Optional[ProgressCallback] = None,
+                  timeout: Optional[tuple] = None) -> pathlib.Path:
+    """Download `url` to `filename` with a `requests.Session`, resuming a leftover `.part` file.
+
+    Data goes to `<filename>.part` and is renamed into place once complete. An existing
+    `filename` whose size matches the remote Content-Length is left untouched.
+    `timeout` is passed to `requests` as the (connect, read) timeout.
+    """
+    filename = pathlib.Path(filename)
+    if filename.exists():
+        head = session.head(url, allow_redirects=True, timeout=timeout)
+        if head.ok and _is_complete(filename, head.headers.get("Content-Length")):
+            logger.info(f"Already downloaded: {filename}")
+            return filename
+
+    part = _part_path(filename)
+    headers = _resume_headers(part)
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416 and headers:
+            os.replace(part, filename)  # The part file already holds the whole file
+            return filename
+        if not response.ok:
+            raise Exception(
+                f"failed to download from audio url: {response.status_code}"
+            )
+        resumed = response.status_code == 206
+        done = part.stat().st_size if resumed else 0
+        total = _total_size(response.status_code, response.headers, done)
+        with open(part, "ab" if resumed else "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(filename, done, total)
+    os.replace(part, filename)
+    return filename
+
+
+async def adownload_file(client, url: str, filename: pathlib.Path, progress: Optional[ProgressCallback] = None) -> pathlib.Path:
+    """Asyncio version of `download_file` for an `httpx.AsyncClient`."""
+    filename = pathlib.Path(filename)
+    if filename.exists():
+        head = await client.head(url)
+        if head.is_success and _is_complete(filename, head.headers.get("Content-Length")):
+            logger.info(f"Already downloaded: {filename}")
+            return filename
+
+    part = _part_path(filename)
+    headers = _resume_headers(part)
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 416 and headers:
+            os.replace(part, filename)  # The part file already holds the whole file
+            return filename
+        if response.is_error:
+            raise Exception(
+                f"failed to download from audio url: {response.status_code}"
+            )
+        resumed = response.status_code == 206
+        done = part.stat().st_size if resumed else 0
+        total = _total_size(response.status_code, response.headers, done)
+        with open(part, "ab" if resumed else "wb") as f:
+            async for chunk in response.aiter_bytes(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(filename, done, total)
+    os.replace(part, filename)
+    return filename
+
+
+class _TaggedWriter():
+    """Writes `header` and then the audio chunks to the `.part` file of `filename`, dropping the upstream ID3 tag.
+
+    The upstream file, its own tag included, also goes to `fill` (a `MediaCache` filler), if
+    given, so the cache holds the same bytes as the CDN whether or not a download was tagged.
+    """
+
+    def __init__(self, filename: pathlib.Path, header: bytes, fill=None) -> None:
+        self.filename = filename
+        self.part = _part_path(filename)
+        self.fill = fill
+        self.stripper = ID3Stripper()
+        self.file = open(self.part, "wb")
+        self.file.write(header)
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(self.stripper.feed(chunk))
+        if self.fill is not None:
+            self.fill.write(chunk)
+
+    def commit(self) -> pathlib.Path:
+        self.file.write(self.stripper.flush())
+        self.file.close()
+        if self.fill is not None:
+            self.fill.commit()
+        os.replace(self.part, self.filename)
+        return self.filename
+
+    def discard(self) -> None:
+        self.file.close()
+        self.part.unlink(missing_ok=True)
+        if self.fill is not None:
+            self.fill.discard()
+
+
+def download_tagged(session, url: str, filename: pathlib.Path, header: bytes, fill=None,
+                    progress: Optional[ProgressCallback] = None, timeout: Optional[tuple] = None) -> pathlib.Path:
+    """Download `url` to `filename` with `header` (an ID3 tag) in front of the audio, in one pass.
+
+    The upstream file is also written unchanged to `fill`, a `MediaCache` filler, if given. Tagged
+    files differ from the remote file, so they are neither resumed nor skipped when present.
+    """
+    filename = pathlib.Path(filename)
+    writer = None
+    try:
+        with session.get(url, stream=True, timeout=timeout) as response:
+            if not response.ok:
+                raise Exception(
+                    f"failed to download from audio url: {response.status_code}"
+                )
+            writer = _TaggedWriter(filename, header, fill)
+            total = _total_size(response.status_code, response.headers, len(header))
+            done = len(header)
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                writer.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(filename, done, total)
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        elif fill is not None:
+            fill.discard()
+        raise
+    return writer.commit()
+
+
+async def adownload_tagged(client, url: str, filename: pathlib.Path, header: bytes | Awaitable[bytes], fill=None,
+                           progress: Optional[ProgressCallback] = None) -> pathlib.Path:
+    """Asyncio version of `download_tagged` for an `httpx.AsyncClient`.
+
+    `header` may be awaitable, e.g. a task still fetching the cover, and is only awaited
+    once the audio response has arrived.
+    """
+    filename = pathlib.Path(filename)
+    writer = None
+    try:
+        async with client.stream("GET", url) as response:
+            if response.is_error:
+                raise Exception(
+                    f"failed to download from audio url: {response.status_code}"
+                )
+            if inspect.isawaitable(header):
+                header = await header
+            writer = _TaggedWriter(filename, header, fill)
+            total = _total_size(response.status_code, response.headers, len(header))
+            done = len(header)
+            async for chunk in response.aiter_bytes(chunk_size=CHUNK_SIZE):
+                writer.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(filename, done, total)
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        elif fill is not None:
+            fill.discard()
+        raise
+    return writer.commit()
+
+
+def copy_tagged(source: pathlib.Path, filename: pathlib.Path, header: bytes) -> pathlib.Path:
+    """Write the cached audio `source` to `filename` with `header` in front of it."""
+    writer = _TaggedWriter(pathlib.Path(filename), header)
+    try:
+        with open(source, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                writer.write(chunk)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.commit()
@@ -0,0 +1,89 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+from typing import List, Optional
+
+from .models import Clip
+
+
+class SunoError(Exception):
+    """Base class of the errors raised by this library."""
+
+
+class SunoTimeoutError(SunoError, TimeoutError):
+    """Songs were not streaming or complete when a wait ran out of time.
+
+    `clips` holds the last state seen for each song, so callers can still report progress.
+    """
+
+    def __init__(self, song_ids: List[str], clips: List[Clip]) -> None:
+        super().__init__(f"Timed out waiting for {len(song_ids)} song(s)")
+        self.song_ids = song_ids
+        self.clips = clips
+
+
+class SunoIdempotencyError(SunoError):
+    """An idempotency key was reused for a generation with different parameters."""
+
+    def __init__(self, idempotency_key: str) -> None:
+        super().__init__(f"Idempotency key {idempotency_key!r} was already used with different parameters")
+        self.idempotency_key = idempotency_key
+
+
+class SunoInsufficientCreditsError(SunoError):
+    """A batch needs more credits than the account has left; nothing was submitted."""
+
+    def __init__(self, needed: int, available: int) -> None:
+        super().__init__(f"Batch needs {needed} credits but only {available} are left")
+        self.needed = needed
+        self.available = available
+
+
+class SunoHTTPError(SunoError):
+    """Upstream answered with an error status. `detail` is its error message."""
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(f"Suno API error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class SunoAuthError(SunoHTTPError):
+    """The cookie or session token was rejected (401/403); the cookie may need updating."""
+
+
+class SunoNotFoundError(SunoHTTPError):
+    """The requested song or resource does not exist (404)."""
+
+
+class SunoRateLimitError(SunoHTTPError):
+    """Upstream is throttling this account (429). `retry_after` is the wait it asked for, if any."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(status_code, detail)
+        self.retry_after = retry_after
+
+
+class SunoUpstreamError(SunoHTTPError):
+    """Upstream failed with a 5xx status."""
+
+
+class SunoConnectionError(SunoError):
+    """The request could not be sent or timed out before a response arrived."""
+
+
+class SunoCircuitOpenError(SunoError):
+    """Requests to a host are refused for now because it kept failing. Retry after `retry_after` seconds."""
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        super().__init__(f"Circuit open for {host}, retry in {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class SunoNoAccountError(SunoError):
+    """Every account of a pool is out of credits or backing off. `retry_after` is when the first one is back, if any."""
+
+    def __init__(self, retry_after: Optional[float] = None) -> None:
+        super().__init__("No Suno account is available: all are out of credits or backing off")
+        self.retry_after = retry_after
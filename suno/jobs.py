@@ -0,0 +1,225 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from .exceptions import SunoError, SunoTimeoutError
+from .models import Clip, Job, JobStates, RequestParams
+from .poller import DONE_STATUSES
+
+logger = logging.getLogger("SunoAI")
+
+# Give up on a submitted job whose clips are not done after this many seconds
+JOB_TIMEOUT = 1800
+# Longest pause between attempts when polling a job fails, e.g. while the coordinator restarts
+POLL_RETRY_MAX = 60
+# A job still submitting after this many seconds was left by a process that stopped mid-submission
+STALE_SUBMISSION = 600
+
+
+class JobStore():
+    """Durable storage of generation jobs in a local SQLite file."""
+
+    def __init__(self, path: str = "suno_jobs.db") -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, state TEXT NOT NULL, params TEXT NOT NULL, clip_ids TEXT NOT NULL, "
+            "clips TEXT NOT NULL, account INTEGER, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "submitted_at REAL)")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+        if "submitted_at" not in columns:  # Store written by an older version
+            self._db.execute("ALTER TABLE jobs ADD COLUMN submitted_at REAL")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+
+    @staticmethod
+    def _to_job(row) -> Job:
+        return Job(
+            id=row[0], state=row[1], params=RequestParams.model_validate_json(row[2]),
+            clip_ids=json.loads(row[3]), clips=[Clip.model_validate(clip) for clip in json.loads(row[4])],
+            account=row[5], error=row[6], created_at=row[7], updated_at=row[8], submitted_at=row[9])
+
+    def create(self, params: RequestParams) -> Job:
+        now = time.time()
+        job = Job(id=str(uuid.uuid4()), state=JobStates.PENDING, params=params, created_at=now, updated_at=now)
+        self.save(job)
+        return job
+
+    def save(self, job: Job) -> None:
+        job.updated_at = time.time()
+        clips = json.dumps([clip.model_dump() for clip in job.clips])
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.state, job.params.model_dump_json(), json.dumps(job.clip_ids), clips,
+                 job.account, job.error, job.created_at, job.updated_at, job.submitted_at))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        jobs = self.get_many([job_id])
+        return jobs[0] if jobs else None
+
+    def get_many(self, job_ids: List[str]) -> List[Job]:
+        if not job_ids:
+            return []
+        placeholders = ",".join("?" * len(job_ids))
+        with self._lock:
+            rows = self._db.execute(f"SELECT * FROM jobs WHERE id IN ({placeholders})", job_ids).fetchall()
+        found = {row[0]: self._to_job(row) for row in rows}
+        return [found[job_id] for job_id in job_ids if job_id in found]
+
+    def claim(self, job_id: str) -> Optional[Job]:
+        """Move a pending job to submitting and return it, or None if another worker got to it first."""
+        with self._lock:
+            claimed = self._db.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE id = ? AND state = ?",
+                                       (JobStates.SUBMITTING, time.time(), job_id, JobStates.PENDING)).rowcount
+        return self.get(job_id) if claimed else None
+
+    def by_state(self, *states: str) -> List[Job]:
+        placeholders = ",".join("?" * len(states))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM jobs WHERE state IN ({placeholders}) ORDER BY created_at", states).fetchall()
+        return [self._to_job(row) for row in rows]
+
+
+class JobManager():
+    """Runs stored generation jobs on an `AsyncSuno` client or `AsyncSunoPool`.
+
+    `workers` bounds how many generations are submitted at once; waiting for clips
+    happens outside the workers through the client's shared feed poller. After a
+    restart pending jobs are queued again and submitted jobs resume polling, while
+    jobs interrupted mid-submission are failed instead of being billed twice.
+    """
+
+    def __init__(self, client, store: JobStore, workers: int = 4) -> None:
+        self.client = client
+        self.store = store
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._polls: Dict[str, asyncio.Task] = {}
+
+    async def start(self, exclusive: bool = True) -> None:
+        """Start the workers and pick up the jobs left over by stopped or crashed runs.
+
+        Several processes may share the store: claiming a pending job is atomic, so each
+        is submitted once. Pass `exclusive=False` in that case, so only jobs that have been
+        submitting for `STALE_SUBMISSION` seconds are failed, not the ones another process
+        is submitting right now.
+        """
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        cutoff = time.time() - (0 if exclusive else STALE_SUBMISSION)
+        for job in self.store.by_state(JobStates.SUBMITTING):
+            if job.updated_at > cutoff:
+                continue
+            job.state = JobStates.FAILED
+            job.error = "Interrupted while submitting; not retried to avoid spending credits twice"
+            self.store.save(job)
+        for job in self.store.by_state(JobStates.PENDING):
+            self._queue.put_nowait(job.id)
+        for job in self.store.by_state(JobStates.SUBMITTED):
+            if job.id in self._polls:
+                continue
+            if job.account is not None and hasattr(self.client, "assign"):
+                self.client.assign(job.clip_ids, job.account)
+            self._poll(job)
+
+    async def stop(self) -> None:
+        """Stop the workers. Unfinished jobs stay in the store and resume on the next start."""
+        for task in self._tasks + list(self._polls.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._polls.values(), return_exceptions=True)
+        self._tasks, self._polls = [], {}
+
+    def submit(self, params: RequestParams) -> Job:
+        """Store a new job and queue it for submission."""
+        if self._queue is None:
+            raise Exception("JobManager.start() must be called before submitting jobs")
+        job = self.store.create(params)
+        self._queue.put_nowait(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def get_many(self, job_ids: List[str]) -> List[Job]:
+        return self.store.get_many(job_ids)
+
+    async def _worker(self) -> None:
+        while True:
+            job = self.store.claim(await self._queue.get())
+            if job is not None:
+                await self._submit(job)
+
+    async def _submit(self, job: Job) -> None:
+        options = job.params.model_dump()
+        options["wait_audio"] = False
+        try:
+            clips = await self.client.generate(**options)
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.state = JobStates.FAILED
+            job.error = str(e)
+            self.store.save(job)
+            return
+        job.state = JobStates.SUBMITTED
+        job.submitted_at = time.time()
+        job.clip_ids = [clip.id for clip in clips]
+        job.clips = clips
+        if hasattr(self.client, "owner_index"):
+            job.account = self.client.owner_index(job.clip_ids[0])
+        self.store.save(job)
+        self._poll(job)
+
+    def _poll(self, job: Job) -> None:
+        task = asyncio.create_task(self._wait(job))
+        self._polls[job.id] = task
+        task.add_done_callback(lambda _: self._polls.pop(job.id, None))
+
+    async def _wait(self, job: Job) -> None:
+        # Time spent pending in the queue does not count; jobs stored by older versions have no submitted_at
+        deadline = (job.submitted_at or job.created_at) + JOB_TIMEOUT
+        failures = 0
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                job.state = JobStates.FAILED
+                job.error = "Timed out waiting for the clips"
+                break
+            try:
+                clips = await self.client.wait(job.clip_ids, timeout=min(remaining, 100))
+            except SunoTimeoutError as e:
+                clips = e.clips  # Keep the progress and wait again
+            except SunoError as e:
+                # E.g. the feed failed or the coordinator is restarting: the clips are still being made
+                failures += 1
+                delay = min(2 ** failures, POLL_RETRY_MAX, remaining)
+                logger.warning(f"Polling job {job.id} failed ({e}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                continue
+            except Exception as e:
+                logger.error(f"Polling job {job.id} failed: {e}")
+                job.state = JobStates.FAILED
+                job.error = str(e)
+                break
+            failures = 0
+            if clips:
+                job.clips = clips
+                self.store.save(job)
+            if len(clips) == len(job.clip_ids) and all(clip.status in DONE_STATUSES for clip in clips):
+                errors = [clip for clip in clips if clip.status == "error"]
+                job.state = JobStates.FAILED if errors else JobStates.COMPLETE
+                if errors:
+                    job.error = errors[0].metadata.error_message or "Clip generation failed"
+                break
+        self.store.save(job)
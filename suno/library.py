@@ -0,0 +1,254 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Set
+
+from .models import Clip, ClipView
+from .poller import chunk_ids
+from .utils import json_dumps, parse_created_at
+
+logger = logging.getLogger("SunoAI")
+
+# Statuses after which a clip no longer changes and is not fetched again
+FINAL_STATUSES = ("complete", "error")
+
+# Seconds after which `search` brings the mirror up to date first
+SYNC_INTERVAL = 60
+
+# Clips stored per transaction while a sync streams the library
+SYNC_BATCH = 100
+
+
+def _match_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must appear, the last one as a prefix."""
+    words = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if words:
+        words[-1] += "*"
+    return " ".join(words)
+
+
+class LibraryMirror():
+    """Local SQLite copy of an account's clips with a full-text index over title, tags and lyrics.
+
+    `sync` fetches only the clips created since the last sync and the ones that were
+    still generating, so it is cheap to run often. Give a file `path` to keep the
+    mirror across restarts; `scope` separates the accounts of a pool in one mirror.
+
+    Clips that show up trashed, and unfinished clips the feed no longer returns, are
+    removed. Other clips deleted upstream are not noticed by an incremental sync and
+    stay in the mirror.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS library (id TEXT PRIMARY KEY, scope TEXT NOT NULL, created REAL NOT NULL, "
+            "status TEXT NOT NULL, model_name TEXT, title TEXT, tags TEXT, prompt TEXT, data BLOB NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS library_scope ON library (scope, created)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS library_sync (scope TEXT PRIMARY KEY, synced_at REAL NOT NULL, "
+                         "latest REAL)")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(library_sync)")]
+        if "latest" not in columns:  # Mirror written by an older version, which stored each sync at once
+            self._db.execute("ALTER TABLE library_sync ADD COLUMN latest REAL")
+            self._db.execute("UPDATE library_sync SET latest = "
+                             "(SELECT MAX(created) FROM library WHERE library.scope = library_sync.scope)")
+        try:
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS library_fts USING fts5("
+                             "title, tags, prompt, content='library', content_rowid='rowid')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite has no FTS5 support, library search falls back to substring matching")
+            self.fts = False
+
+    def upsert(self, clips: Iterable[dict], scope: str = "") -> int:
+        """Store raw feed entries, replacing earlier versions of the same clips and dropping trashed ones.
+
+        Returns how many were stored.
+        """
+        rows, trashed = [], []
+        for clip in clips:
+            if clip.get("is_trashed"):
+                trashed.append(clip["id"])
+                continue
+            metadata = clip.get("metadata") or {}
+            rows.append((clip["id"], scope, parse_created_at(clip["created_at"]).timestamp(), clip.get("status") or "",
+                         clip.get("model_name"), clip.get("title") or "", metadata.get("tags") or "",
+                         metadata.get("prompt") or "", json_dumps(clip)))
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for clip_id in trashed:
+                    self._unindex(clip_id)
+                    self._db.execute("DELETE FROM library WHERE id = ?", (clip_id,))
+                for row in rows:
+                    self._unindex(row[0])
+                    cursor = self._db.execute("INSERT OR REPLACE INTO library VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                    if self.fts:
+                        self._db.execute("INSERT INTO library_fts (rowid, title, tags, prompt) VALUES (?, ?, ?, ?)",
+                                         (cursor.lastrowid, row[5], row[6], row[7]))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def _unindex(self, clip_id: str) -> None:
+        if not self.fts:
+            return
+        old = self._db.execute("SELECT rowid, title, tags, prompt FROM library WHERE id = ?", (clip_id,)).fetchone()
+        if old is not None:
+            self._db.execute("INSERT INTO library_fts (library_fts, rowid, title, tags, prompt) VALUES ('delete', ?, ?, ?, ?)", old)
+
+    def remove(self, clip_ids: Iterable[str]) -> None:
+        """Forget clips, e.g. ones deleted upstream."""
+        with self._lock:
+            for clip_id in clip_ids:
+                self._unindex(clip_id)
+                self._db.execute("DELETE FROM library WHERE id = ?", (clip_id,))
+
+    def latest(self, scope: str = "") -> Optional[datetime.datetime]:
+        """Creation time of the newest clip of the last complete sync, where the next sync can stop."""
+        with self._lock:
+            row = self._db.execute("SELECT latest FROM library_sync WHERE scope = ?", (scope,)).fetchone()
+        return datetime.datetime.fromtimestamp(row[0], datetime.timezone.utc) if row and row[0] is not None else None
+
+    def unfinished(self, scope: str = "") -> List[str]:
+        """IDs of stored clips that were still generating at the last sync."""
+        with self._lock:
+            rows = self._db.execute(f"SELECT id FROM library WHERE scope = ? AND status NOT IN ({', '.join('?' * len(FINAL_STATUSES))})",
+                                    (scope, *FINAL_STATUSES)).fetchall()
+        return [row[0] for row in rows]
+
+    def synced_at(self, scope: str = "") -> float:
+        with self._lock:
+            row = self._db.execute("SELECT synced_at FROM library_sync WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else 0.0
+
+    def mark_synced(self, scope: str = "", latest: Optional[datetime.datetime] = None) -> None:
+        """Record a complete sync; `latest` is the creation time of the newest clip it saw."""
+        previous = self.latest(scope)
+        if previous is not None and (latest is None or previous > latest):
+            latest = previous
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO library_sync VALUES (?, ?, ?)",
+                             (scope, time.time(), latest.timestamp() if latest else None))
+
+    def search(self, query: Optional[str] = None, tags: Optional[str] = None, status: Optional[str] = None,
+               model_name: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Clip]:
+        """
+        Find stored clips, newest first.
+
+        Parameters:
+        - query (Optional[str]): Words that must all appear in the title, tags or lyrics/prompt; the last word may be a prefix.
+        - tags (Optional[str]): Comma separated tags that must all appear in the clip's tags, ignoring case.
+        - status (Optional[str]): Comma separated statuses to include, e.g. "complete".
+        - model_name (Optional[str]): Only clips of this model, e.g. "chirp-v3".
+        - limit (int): Maximum number of clips returned. Default is 50.
+        - offset (int): Number of matching clips to skip, for paging.
+
+        Returns:
+        List[Clip]: The matching clips.
+        """
+        where, params = [], []
+        if query and query.strip():
+            if self.fts:
+                where.append("library.rowid IN (SELECT rowid FROM library_fts WHERE library_fts MATCH ?)")
+                params.append(_match_query(query))
+            else:
+                for word in query.split():
+                    where.append("(title LIKE ? OR tags LIKE ? OR prompt LIKE ?)")
+                    params += [f"%{word}%"] * 3
+        for tag in (tags or "").split(","):
+            if tag.strip():
+                where.append("tags LIKE ?")  # LIKE ignores ASCII case
+                params.append(f"%{tag.strip()}%")
+        statuses = [value.strip() for value in (status or "").split(",") if value.strip()]
+        if statuses:
+            where.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params += statuses
+        if model_name:
+            where.append("model_name = ?")
+            params.append(model_name)
+        sql = "SELECT data FROM library"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._db.execute(sql, (*params, limit, offset)).fetchall()
+        return [Clip.model_validate_json(row[0]) for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM library").fetchone()[0]
+
+
+def sync(client, mirror: LibraryMirror, scope: str = "") -> List[str]:
+    """Bring `mirror` up to date with the library of a `Suno` client. Returns the IDs of the clips stored."""
+    since = mirror.latest(scope)
+    unfinished = mirror.unfinished(scope)
+    state = _SyncState(mirror, scope)
+    for view in client.iter_library(since=since, lazy=True):
+        state.add(view)
+    for ids in chunk_ids([clip_id for clip_id in unfinished if clip_id not in state.fetched]):
+        state.refetched(ids, client.get_feed(ids))
+    return state.finish()
+
+
+async def async_sync(client, mirror: LibraryMirror, scope: str = "") -> List[str]:
+    """Asyncio version of `sync` for an `AsyncSuno` client."""
+    since = mirror.latest(scope)
+    unfinished = mirror.unfinished(scope)
+    state = _SyncState(mirror, scope)
+    async for view in client.iter_library(since=since, lazy=True):
+        state.add(view)
+    for ids in chunk_ids([clip_id for clip_id in unfinished if clip_id not in state.fetched]):
+        state.refetched(ids, await client.get_feed(ids))
+    return state.finish()
+
+
+class _SyncState():
+    """Stores the clips of one sync in batches as they arrive, so memory stays flat for large libraries.
+
+    The point where the next sync stops only moves once this one finished, so an
+    interrupted sync is picked up again from where the last complete one ended.
+    """
+
+    def __init__(self, mirror: LibraryMirror, scope: str) -> None:
+        self.mirror = mirror
+        self.scope = scope
+        self.fetched: Set[str] = set()
+        self.newest: Optional[datetime.datetime] = None
+        self._pending: List[ClipView] = []
+
+    def add(self, view: ClipView) -> None:
+        self.fetched.add(view.id)
+        created = parse_created_at(view.created_at)
+        if self.newest is None or created > self.newest:
+            self.newest = created
+        self._pending.append(view)
+        if len(self._pending) >= SYNC_BATCH:
+            self._flush()
+
+    def refetched(self, ids: List[str], views: List[ClipView]) -> None:
+        """Store re-fetched unfinished clips; the ones the feed no longer returns were deleted."""
+        for view in views:
+            self.add(view)
+        self.mirror.remove(set(ids) - {view.id for view in views})
+
+    def _flush(self) -> None:
+        self.mirror.upsert((view.raw for view in self._pending), self.scope)
+        self._pending = []
+
+    def finish(self) -> List[str]:
+        self._flush()
+        self.mirror.mark_synced(self.scope, self.newest)
+        logger.info(f"Library synced: {len(self.fetched)} new or changed clips")
+        return list(self.fetched)
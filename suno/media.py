@@ -0,0 +1,193 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import hashlib
+import logging
+import os
+import pathlib
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import AsyncIterator, Dict, NamedTuple, Optional
+
+logger = logging.getLogger("SunoAI")
+
+# Default size bound of the media cache in bytes
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+# Bytes hashed / copied per iteration
+CHUNK_SIZE = 1024 * 1024
+
+
+class MediaEntry(NamedTuple):
+    clip_id: str
+    kind: str
+    digest: str
+    size: int
+    content_type: str
+    path: pathlib.Path
+
+
+class _Filler():
+    """Writes one download into a temporary file, hashing it on the way, and adds it to the cache on commit."""
+
+    def __init__(self, cache: "MediaCache", clip_id: str, kind: str, content_type: str) -> None:
+        self.cache = cache
+        self.clip_id = clip_id
+        self.kind = kind
+        self.content_type = content_type
+        self.hash = hashlib.sha256()
+        fd, name = tempfile.mkstemp(dir=cache.root / "tmp")
+        self.file = os.fdopen(fd, "wb")
+        self.path = pathlib.Path(name)
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+        self.hash.update(chunk)
+
+    def commit(self) -> MediaEntry:
+        self.file.close()
+        return self.cache._add(self.clip_id, self.kind, self.path, self.hash.hexdigest(), self.content_type)
+
+    def discard(self) -> None:
+        self.file.close()
+        self.path.unlink(missing_ok=True)
+
+
+class MediaCache():
+    """Content-addressed on-disk cache of clip audio and images with size-bounded LRU eviction.
+
+    Files live under `root/objects/<sha256>`, so identical media is stored once; an
+    SQLite index maps (clip_id, kind) to the object and records when it was last used.
+    """
+
+    def __init__(self, root: str = "media_cache", max_bytes: int = MAX_CACHE_BYTES) -> None:
+        self.root = pathlib.Path(root)
+        self.max_bytes = max_bytes
+        for name in ("objects", "tmp"):
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pinned: Dict[str, int] = {}  # Objects being read, by digest, which eviction leaves alone
+        self._db = sqlite3.connect(self.root / "index.db", check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS media (clip_id TEXT NOT NULL, kind TEXT NOT NULL, digest TEXT NOT NULL, "
+            "size INTEGER NOT NULL, content_type TEXT NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (clip_id, kind))")
+        self._db.execute("CREATE INDEX IF NOT EXISTS media_accessed ON media (accessed)")
+
+    def _object(self, digest: str) -> pathlib.Path:
+        return self.root / "objects" / digest
+
+    def get(self, clip_id: str, kind: str = "audio") -> Optional[MediaEntry]:
+        """Return the cached media of a clip and mark it as recently used, or None on a miss."""
+        with self._lock:
+            row = self._db.execute("SELECT digest, size, content_type FROM media WHERE clip_id = ? AND kind = ?",
+                                   (clip_id, kind)).fetchone()
+            if row is None:
+                return None
+            path = self._object(row[0])
+            if not path.exists():
+                self._db.execute("DELETE FROM media WHERE clip_id = ? AND kind = ?", (clip_id, kind))
+                return None
+            self._db.execute("UPDATE media SET accessed = ? WHERE clip_id = ? AND kind = ?",
+                             (time.time(), clip_id, kind))
+        return MediaEntry(clip_id, kind, row[0], row[1], row[2], path)
+
+    def put_file(self, clip_id: str, kind: str, source: str | pathlib.Path, content_type: str) -> MediaEntry:
+        """Copy a downloaded file into the cache."""
+        filler = self.filler(clip_id, kind, content_type)
+        try:
+            with open(source, "rb") as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    filler.write(chunk)
+        except BaseException:
+            filler.discard()
+            raise
+        return filler.commit()
+
+    def put_bytes(self, clip_id: str, kind: str, data: bytes, content_type: str) -> MediaEntry:
+        """Add media already held in memory, e.g. a cover image."""
+        filler = self.filler(clip_id, kind, content_type)
+        filler.write(data)
+        return filler.commit()
+
+    def filler(self, clip_id: str, kind: str, content_type: str) -> _Filler:
+        """Start writing new media; call `write` for each chunk, then `commit` (or `discard`)."""
+        return _Filler(self, clip_id, kind, content_type)
+
+    async def afill(self, clip_id: str, kind: str, response) -> AsyncIterator[bytes]:
+        """Yield the body of a streamed `httpx` response while adding it to the cache.
+
+        The entry is only stored if the whole body arrived.
+        """
+        filler = self.filler(clip_id, kind, response.headers.get("Content-Type", "application/octet-stream"))
+        try:
+            async for chunk in response.aiter_bytes(chunk_size=CHUNK_SIZE):
+                filler.write(chunk)
+                yield chunk
+        except BaseException:
+            filler.discard()
+            raise
+        filler.commit()
+
+    def _add(self, clip_id: str, kind: str, temp: pathlib.Path, digest: str, content_type: str) -> MediaEntry:
+        path = self._object(digest)
+        size = temp.stat().st_size
+        if path.exists():
+            temp.unlink()  # Same content is already stored
+        else:
+            os.replace(temp, path)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)",
+                             (clip_id, kind, digest, size, content_type, time.time()))
+            self._evict()
+        return MediaEntry(clip_id, kind, digest, size, content_type, path)
+
+    def size(self) -> int:
+        """Total bytes of all stored objects."""
+        with self._lock:
+            return self._size()
+
+    def _size(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM media)").fetchone()[0]
+
+    def pin(self, digest: str) -> None:
+        """Keep an object from being evicted while it is read, e.g. served; undo with `unpin`."""
+        with self._lock:
+            self._pinned[digest] = self._pinned.get(digest, 0) + 1
+
+    def unpin(self, digest: str) -> None:
+        with self._lock:
+            if self._pinned.get(digest, 0) <= 1:
+                self._pinned.pop(digest, None)
+            else:
+                self._pinned[digest] -= 1
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in `max_bytes`, skipping pinned objects."""
+        total = self._size()
+        pinned = list(self._pinned)
+        query = (f"SELECT clip_id, kind, digest, size FROM media WHERE digest NOT IN ({','.join('?' * len(pinned))}) "
+                 "ORDER BY accessed LIMIT 1")
+        while total > self.max_bytes:
+            row = self._db.execute(query, pinned).fetchone()
+            if row is None:
+                return
+            self._db.execute("DELETE FROM media WHERE clip_id = ? AND kind = ?", row[:2])
+            if self._db.execute("SELECT 1 FROM media WHERE digest = ?", (row[2],)).fetchone() is None:
+                self._object(row[2]).unlink(missing_ok=True)
+                total -= row[3]  # Other entries may still use the object
+            logger.info(f"Evicted {row[1]} of {row[0]} from the media cache")
+
+    def copy_to(self, entry: MediaEntry, target: str | pathlib.Path) -> pathlib.Path:
+        """Copy cached media to `target`, e.g. to serve `download` without going to the CDN."""
+        target = pathlib.Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        self.pin(entry.digest)
+        try:
+            shutil.copyfile(entry.path, target)
+        finally:
+            self.unpin(entry.digest)
+        return target
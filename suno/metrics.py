@@ -0,0 +1,151 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import contextlib
+import re
+import threading
+import time
+import weakref
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Upper bounds of the generation histograms: poll iterations and seconds until streaming/complete
+POLL_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+GENERATION_BUCKETS = (5, 10, 20, 30, 45, 60, 90, 120, 180, 300)
+
+# Path segments holding an ID, also inside a file name like `image_large_<uuid>.png`, are collapsed
+# so every endpoint is a single label value
+_ID_SEGMENT = re.compile(r"/(?:[^/]*[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}[^/]*|(?:[0-9a-fA-F-]{16,}|sess_\w+)(?:\.\w+)?)(?=/|$)")
+
+# Called as hook(span_name, attributes) for every upstream request; returns a context manager
+# wrapping the request, e.g. `lambda name, attrs: tracer.start_as_current_span(name, attributes=attrs)`
+TraceHook = Callable[[str, Dict[str, str]], ContextManager]
+
+
+def endpoint_label(url: str) -> str:
+    """Return a low-cardinality label for `url`, e.g. `studio-api.suno.ai/api/gen/{id}/set_visibility/`."""
+    parts = urlsplit(url)
+    return parts.netloc + _ID_SEGMENT.sub("/{id}", parts.path)
+
+
+class Histogram():
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+class Metrics():
+    """Counters and histograms of the upstream traffic of Suno clients, rendered in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._caches = weakref.WeakSet()
+        self.hooks: List[TraceHook] = []
+
+    def add_hook(self, hook: TraceHook) -> None:
+        """Wrap every upstream request in `hook(span_name, attributes)`, e.g. an OpenTelemetry span."""
+        self.hooks.append(hook)
+
+    def register_cache(self, cache) -> None:
+        """Report the hit/miss counters of a `ClipCache`."""
+        self._caches.add(cache)
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...], **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextlib.contextmanager
+    def track_request(self, method: str, url: str):
+        """Time one upstream request and run the trace hooks around it.
+
+        The body should set `info["status"]` to the response status code.
+        """
+        endpoint = endpoint_label(url)
+        info = {"status": "error"}
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            spans = [stack.enter_context(hook(f"{method} {endpoint}", {"http.method": method, "http.url": url}))
+                     for hook in self.hooks]
+            try:
+                yield info
+            finally:
+                status = str(info["status"])
+                for span in spans:
+                    if hasattr(span, "set_attribute"):
+                        span.set_attribute("http.status_code", status)
+                self.observe("suno_upstream_request_duration_seconds", time.perf_counter() - start,
+                             LATENCY_BUCKETS, method=method, endpoint=endpoint)
+                self.inc("suno_upstream_responses_total", method=method, endpoint=endpoint, status=status)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {key: (h.buckets, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        for cache in list(self._caches):
+            for name, value in (("suno_cache_hits_total", cache.hits), ("suno_cache_misses_total", cache.misses)):
+                key = (name, ())
+                counters[key] = counters.get(key, 0) + value
+
+        lines = []
+        for name in sorted({key[0] for key in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                labels = dict(labels)
+                for bound, bucket_count in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': str(bound)})} {bucket_count}")
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        for name in sorted({key[0] for key in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(dict(labels))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every client that is not given its own `Metrics`
+default_metrics = Metrics()
+
+
+def track_generation(metrics: Optional[Metrics], started: float, polls: int, first_streaming: Optional[float],
+                     completed: Optional[float]) -> None:
+    """Record the poll count and timings of one finished wait on generated clips."""
+    if metrics is None:
+        return
+    metrics.observe("suno_poll_iterations", polls, POLL_BUCKETS)
+    if first_streaming is not None:
+        metrics.observe("suno_time_to_first_streaming_seconds", first_streaming - started, GENERATION_BUCKETS)
+    if completed is not None:
+        metrics.observe("suno_time_to_complete_seconds", completed - started, GENERATION_BUCKETS)
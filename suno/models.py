@@ -2,6 +2,8 @@
 # Repository: https://github.com/Malith-Rukshan/Suno-API
 
 
+from typing import Any, List
+
 from pydantic import BaseModel, ConfigDict
 
 class ModelVersions:
@@ -101,6 +103,35 @@ class Clip(BaseModel):
         }
 
 
+class ClipView():
+    """Lightweight read-only view over a raw feed entry.
+
+    Attributes are read straight from the JSON dict, so building a view costs almost
+    nothing; the full `Clip` model is only validated when `clip` is accessed.
+    """
+    __slots__ = ("raw", "_clip")
+
+    def __init__(self, raw: dict) -> None:
+        self.raw = raw
+        self._clip = None
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.raw[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def clip(self) -> Clip:
+        """The validated `Clip` model of this entry."""
+        if self._clip is None:
+            self._clip = Clip.model_validate(self.raw)
+        return self._clip
+
+    def __repr__(self) -> str:
+        return f"ClipView(id={self.raw.get('id')!r}, status={self.raw.get('status')!r})"
+
+
 class RequestParams(BaseModel):
     model_version: str = ModelVersions.CHIRP_V3_5
     prompt: str
@@ -109,6 +140,10 @@ class RequestParams(BaseModel):
     title: str = ""
     make_instrumental: bool = False
     wait_audio: bool = False
+    # Retries with the same key attach to the songs of the first request instead of generating new ones
+    idempotency_key: str | None = None
+    # Return the complete songs of an identical request made within this many seconds
+    reuse_within: float | None = None
 
     class Config:
         protected_namespaces = ()
@@ -123,6 +158,10 @@ class RequestParams(BaseModel):
         }]}
 
 
+# Credits spent by one generate call (two clips of 5 credits each)
+CREDITS_PER_GENERATION = 10
+
+
 class CreditsInfo(BaseModel):
     credits_left: int
     period: int | None = None
@@ -139,3 +178,42 @@ class CreditsInfo(BaseModel):
                 "monthly_usage": 0
             }
         }
+
+
+class BatchItem(BaseModel):
+    """Result of one request of a batch generation, in the order of the batch by `index`."""
+    index: int
+    clips: List[Clip] = []
+    error: str | None = None
+
+
+class JobStates:
+    """States of a generation job in the job queue.
+
+    - PENDING: Stored, waiting for a worker to submit it.
+    - SUBMITTING: Being sent to Suno. Jobs interrupted in this state are failed rather than sent twice.
+    - SUBMITTED: Accepted by Suno, waiting for the clips to finish.
+    - COMPLETE: All clips are streaming or complete.
+    - FAILED: Submission failed, a clip errored or the job timed out.
+    """
+    PENDING = "pending"
+    SUBMITTING = "submitting"
+    SUBMITTED = "submitted"
+    COMPLETE = "complete"
+    FAILED = "failed"
+    FINISHED = [COMPLETE, FAILED]
+
+
+class Job(BaseModel):
+    id: str
+    state: str
+    params: RequestParams
+    clip_ids: List[str] = []
+    clips: List[Clip] = []
+    account: int | None = None
+    error: str | None = None
+    created_at: float
+    updated_at: float
+    submitted_at: float | None = None
+
+    model_config = ConfigDict(protected_namespaces=())
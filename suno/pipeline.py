@@ -0,0 +1,164 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import multiprocessing
+import pathlib
+import shutil
+import struct
+import subprocess
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from .models import Clip
+
+# Called as step(path, clip) in a worker process after a download; may return the path of a file it wrote
+Step = Callable[[str, Clip], Optional[str]]
+
+
+class Cover(NamedTuple):
+    data: bytes
+    content_type: str
+
+
+def _syncsafe(size: int) -> bytes:
+    return bytes(((size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F))
+
+
+def _frame(frame_id: str, body: bytes) -> bytes:
+    return frame_id.encode("ascii") + struct.pack(">I", len(body)) + b"\0\0" + body
+
+
+def _text(*values: str) -> bytes:
+    # UTF-16 with a BOM per string, readable by every ID3v2.3 reader
+    return b"\x01" + b"\0\0".join(value.encode("utf-16") for value in values)
+
+
+def build_id3(clip: Clip, cover: Optional[Cover] = None) -> bytes:
+    """Return an ID3v2.3 tag with the title, artist, genre (tags), year, model, lyrics and cover of `clip`."""
+    frames = [_frame("TIT2", _text(clip.title or clip.id)), _frame("TPE1", _text(clip.display_name))]
+    if clip.metadata.tags:
+        frames.append(_frame("TCON", _text(clip.metadata.tags)))
+    if clip.created_at[:4].isdigit():
+        frames.append(_frame("TYER", _text(clip.created_at[:4])))
+    frames.append(_frame("TXXX", _text("Model", clip.model_name)))
+    frames.append(_frame("TXXX", _text("Suno ID", clip.id)))
+    if clip.metadata.prompt:
+        frames.append(_frame("USLT", b"\x01eng" + _text("", clip.metadata.prompt)[1:]))
+    if cover is not None:
+        frames.append(_frame("APIC", b"\0" + cover.content_type.encode("ascii") + b"\0\x03\0" + cover.data))
+    body = b"".join(frames)
+    return b"ID3\x03\0\0" + _syncsafe(len(body)) + body
+
+
+class ID3Stripper():
+    """Drops the ID3v2 tag at the start of an MP3 stream fed chunk by chunk, so the file gets only ours."""
+
+    def __init__(self) -> None:
+        self._head = b""
+        self._skip: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._skip is None:
+            self._head += chunk
+            if len(self._head) < 10:
+                return b""
+            chunk, self._head = self._head, b""
+            self._skip = 0
+            if chunk.startswith(b"ID3"):
+                size = (chunk[6] << 21) | (chunk[7] << 14) | (chunk[8] << 7) | chunk[9]
+                self._skip = 10 + size + (10 if chunk[5] & 0x10 else 0)  # Footer flag
+        if self._skip:
+            skipped = min(self._skip, len(chunk))
+            self._skip -= skipped
+            chunk = chunk[skipped:]
+        return chunk
+
+    def flush(self) -> bytes:
+        """Bytes held back from a stream shorter than a tag header."""
+        head, self._head = self._head, b""
+        return head
+
+
+class AudioPipeline():
+    """Post-processing done by `download` while and after it writes each song.
+
+    ID3 tags from the `Clip` and the cover image are written in front of the audio in
+    the same pass that streams it to disk, so the file is written once. Each of `steps`
+    (e.g. `Preview`, `Transcode`) then runs on a process pool with the finished file,
+    using every core while other downloads keep the network busy.
+    """
+
+    def __init__(self, tags: bool = True, cover: bool = True, steps: Sequence[Step] = (),
+                 processes: Optional[int] = None) -> None:
+        """
+        Parameters:
+        - tags (bool): Write ID3 tags (title, artist, genre, year, model, lyrics). Default is True.
+        - cover (bool): Fetch `image_large_url` and embed it as the front cover. Default is True.
+        - steps (Sequence[Step]): Picklable callables run as step(path, clip) in a worker process after each download.
+        - processes (Optional[int]): Size of the process pool for `steps`. Defaults to the number of CPUs.
+        """
+        self.tags = tags
+        self.cover = cover and tags
+        self.steps = list(steps)
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def header(self, clip: Clip, cover: Optional[Cover] = None) -> bytes:
+        """Bytes to write before the audio of `clip`."""
+        return build_id3(clip, cover) if self.tags else b""
+
+    def submit(self, path: str | pathlib.Path, clip: Clip) -> List[Future]:
+        """Start the steps on the finished file `path`; each future resolves to what its step returned."""
+        if not self.steps:
+            return []
+        if self._executor is None:
+            # Worker processes must not inherit the client's threads and sockets
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._executor = ProcessPoolExecutor(self.processes, mp_context=context)
+        return [self._executor.submit(step, str(path), clip) for step in self.steps]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _ffmpeg(*args: str) -> None:
+    if shutil.which("ffmpeg") is None:
+        raise Exception("ffmpeg is needed for this pipeline step but was not found on PATH")
+    result = subprocess.run(["ffmpeg", "-nostdin", "-loglevel", "error", "-y", *args], capture_output=True)
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+
+
+class Preview():
+    """Pipeline step writing `<name>.preview.mp3`: the first `seconds`, loudness-normalized to `loudness` LUFS, with a fade out."""
+
+    def __init__(self, seconds: float = 30, loudness: float = -14, bitrate: str = "128k") -> None:
+        self.seconds = seconds
+        self.loudness = loudness
+        self.bitrate = bitrate
+
+    def __call__(self, path: str, clip: Clip) -> str:
+        source = pathlib.Path(path)
+        target = source.with_name(f"{source.stem}.preview.mp3")
+        fade = max(self.seconds - 3, 0)
+        _ffmpeg("-i", str(source), "-t", str(self.seconds), "-map_metadata", "0",
+                "-af", f"loudnorm=I={self.loudness}:TP=-1.5:LRA=11,afade=t=out:st={fade}:d=3",
+                "-b:a", self.bitrate, str(target))
+        return str(target)
+
+
+class Transcode():
+    """Pipeline step writing the song next to the MP3 in another format, e.g. `Transcode("opus", ["-c:a", "libopus", "-b:a", "96k"])`."""
+
+    def __init__(self, extension: str = "ogg", args: Sequence[str] = ("-c:a", "libvorbis", "-q:a", "5")) -> None:
+        self.extension = extension
+        self.args = list(args)
+
+    def __call__(self, path: str, clip: Clip) -> str:
+        source = pathlib.Path(path)
+        target = source.with_suffix(f".{self.extension}")
+        _ffmpeg("-i", str(source), "-map_metadata", "0", "-vn", *self.args, str(target))
+        return str(target)
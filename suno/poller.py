@@ -0,0 +1,381 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import asyncio
+import collections
+import logging
+import random
+import statistics
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .exceptions import SunoTimeoutError
+from .metrics import Metrics, track_generation
+from .models import Clip
+
+logger = logging.getLogger("SunoAI")
+
+# Clip statuses at which a waiter no longer needs to be polled
+DONE_STATUSES = ("streaming", "complete", "error")
+
+# Keep the `?ids=` query of one feed request below this many characters
+MAX_IDS_LENGTH = 1800
+
+# Seconds until a generation is streaming, assumed for a model until enough waits were observed
+EXPECTED_SECONDS = 30
+
+
+class PollStrategy():
+    """Decides how long a feed poller sleeps between polls and how long a wait may take.
+
+    This base class polls at a random interval within `interval`, like the poller always
+    did. Subclass it, or use `AdaptivePollStrategy`, and pass it as `poll_strategy` to a client.
+    """
+
+    def __init__(self, interval: tuple = (3, 6), timeout: float = 100, max_backoff: float = 60) -> None:
+        self.interval = interval
+        self.default_timeout = timeout
+        self.max_backoff = max_backoff
+
+    def timeout(self, model: Optional[str]) -> float:
+        """Seconds a wait may take when the caller gives no timeout."""
+        return self.default_timeout
+
+    def next_delay(self, elapsed: float, model: Optional[str]) -> float:
+        """Seconds until the next poll for a wait that started `elapsed` seconds ago."""
+        return random.uniform(*self.interval)  # Wait with variation
+
+    def backoff(self, failures: int, error: Exception) -> float:
+        """Seconds to sleep after `failures` consecutive failed polls, honouring `Retry-After`."""
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            return min(float(retry_after), self.max_backoff)
+        delay = min(self.interval[0] * 2 ** failures, self.max_backoff)
+        return random.uniform(delay / 2, delay)
+
+    def record(self, model: Optional[str], seconds: float) -> None:
+        """Learn from a wait on `model` that finished after `seconds`."""
+
+
+class AdaptivePollStrategy(PollStrategy):
+    """Polls rarely while a generation cannot be ready yet and often around its expected finish.
+
+    The finish time of each model is learnt from the last `samples` waits: the poller sleeps
+    half the remaining time until the 10th percentile, polls every `min_interval` seconds up
+    to the 90th percentile, then slowly backs off again. Default timeouts grow with the
+    slowest observed generations, e.g. for 4 minute `chirp-v3-5` tracks.
+    """
+
+    def __init__(self, min_interval: float = 1, max_interval: float = 15, timeout: float = 100,
+                 samples: int = 50, expected: Optional[Dict[str, float]] = None, max_backoff: float = 60) -> None:
+        super().__init__((min_interval, max_interval), timeout, max_backoff)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.expected = expected or {}
+        self._samples: Dict[Optional[str], Deque[float]] = collections.defaultdict(
+            lambda: collections.deque(maxlen=samples))
+        self._lock = threading.Lock()
+
+    def _bounds(self, model: Optional[str]) -> tuple:
+        """Return the 10th and 90th percentile of the seconds until `model` is ready."""
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        if len(samples) < 5:
+            expected = self.expected.get(model, EXPECTED_SECONDS)
+            return expected / 2, expected * 2
+        deciles = statistics.quantiles(samples, n=10)
+        return deciles[0], deciles[-1]
+
+    def timeout(self, model: Optional[str]) -> float:
+        return max(self.default_timeout, self._bounds(model)[1] * 3)
+
+    def next_delay(self, elapsed: float, model: Optional[str]) -> float:
+        low, high = self._bounds(model)
+        if elapsed < low:
+            delay = (low - elapsed) / 2
+        elif elapsed <= high:
+            delay = self.min_interval
+        else:
+            delay = (elapsed - high) / 4
+        delay = min(max(delay, self.min_interval), self.max_interval)
+        return delay * random.uniform(0.9, 1.1)
+
+    def backoff(self, failures: int, error: Exception) -> float:
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            return min(float(retry_after), self.max_backoff)
+        delay = min(self.min_interval * 2 ** failures, self.max_backoff)
+        return random.uniform(delay / 2, delay)
+
+    def record(self, model: Optional[str], seconds: float) -> None:
+        with self._lock:
+            self._samples[model].append(seconds)
+
+
+def chunk_ids(ids: List[str], max_length: int = MAX_IDS_LENGTH) -> List[List[str]]:
+    """Split clip IDs into groups whose comma-joined length stays within `max_length`."""
+    chunks, current, length = [], [], 0
+    for clip_id in ids:
+        extra = len(clip_id) + (1 if current else 0)
+        if current and length + extra > max_length:
+            chunks.append(current)
+            current, length = [], 0
+            extra = len(clip_id)
+        current.append(clip_id)
+        length += extra
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class _Waiter():
+    def __init__(self, ids: List[str], model: Optional[str] = None) -> None:
+        self.ids = list(ids)
+        self.model = model
+        self.started = time.time()
+        self.polls = 0
+        self.first_streaming: Optional[float] = None
+        self.completed: Optional[float] = None
+        self.event = threading.Event()
+        self.future: Optional[asyncio.Future] = None
+        self.result: Optional[List[Clip]] = None
+        # Set for `watch` callers: receives every status change, then None once done
+        self.queue: Optional[asyncio.Queue] = None
+        self.statuses: Dict[str, str] = {}
+
+
+class _PollState():
+    """Bookkeeping shared by the thread and asyncio pollers."""
+
+    def __init__(self, strategy: PollStrategy, metrics: Optional[Metrics] = None) -> None:
+        self.waiters: List[_Waiter] = []
+        self.clips: Dict[str, Clip] = {}
+        self.strategy = strategy
+        self.metrics = metrics
+        self.failures = 0
+
+    def pending_ids(self) -> List[str]:
+        ids = dict.fromkeys(
+            clip_id for waiter in self.waiters for clip_id in waiter.ids)
+        return [clip_id for clip_id in ids if not self.is_done(clip_id)]
+
+    def is_done(self, clip_id: str) -> bool:
+        clip = self.clips.get(clip_id)
+        return clip is not None and clip.status in DONE_STATUSES
+
+    def clips_for(self, waiter: _Waiter) -> List[Clip]:
+        return [self.clips[clip_id] for clip_id in waiter.ids if clip_id in self.clips]
+
+    def update(self, clips: List[Clip]) -> List[_Waiter]:
+        """Store fetched clips and pop the waiters whose clips are all done."""
+        for clip in clips:
+            self.clips[clip.id] = clip
+        now = time.time()
+        for waiter in self.waiters:
+            waiter.polls += 1
+            statuses = [self.clips[clip_id].status for clip_id in waiter.ids if clip_id in self.clips]
+            if waiter.first_streaming is None and any(status in ("streaming", "complete") for status in statuses):
+                waiter.first_streaming = now
+            if waiter.completed is None and len(statuses) == len(waiter.ids) and \
+                    all(status == "complete" for status in statuses):
+                waiter.completed = now
+            if waiter.model is None and waiter.ids[0] in self.clips:
+                waiter.model = self.clips[waiter.ids[0]].model_name
+            if waiter.queue is not None:
+                self._notify(waiter, clips)
+        finished = [waiter for waiter in self.waiters
+                    if all(self.is_done(clip_id) for clip_id in waiter.ids)]
+        for waiter in finished:
+            if all(self.clips[clip_id].status != "error" for clip_id in waiter.ids):
+                self.strategy.record(waiter.model, now - waiter.started)
+            waiter.result = self.clips_for(waiter)
+            self.remove(waiter)
+        return finished
+
+    def next_delay(self, error: Optional[Exception]) -> float:
+        """Seconds until the next tick: backoff after a failed poll, else the soonest any waiter needs."""
+        if error is not None:
+            self.failures += 1
+            return self.strategy.backoff(self.failures, error)
+        self.failures = 0
+        now = time.time()
+        return min(self.strategy.next_delay(now - waiter.started, waiter.model) for waiter in self.waiters)
+
+    def wait_time(self, model: Optional[str], timeout: Optional[float], deadline: Optional[float]) -> float:
+        """Seconds a wait may take given an optional timeout and an optional absolute `time.time()` deadline."""
+        seconds = timeout if timeout is not None else self.strategy.timeout(model)
+        if deadline is not None:
+            seconds = min(seconds, deadline - time.time())
+        return max(seconds, 0)
+
+    def _notify(self, waiter: _Waiter, clips: List[Clip]) -> None:
+        for clip in clips:
+            if clip.id in waiter.ids and waiter.statuses.get(clip.id) != clip.status:
+                waiter.statuses[clip.id] = clip.status
+                waiter.queue.put_nowait(clip)
+
+    def finish(self, waiter: _Waiter) -> List[Clip]:
+        """Return the clips of a waiter that resolved or timed out and stop tracking it."""
+        if waiter.result is None:
+            waiter.result = self.clips_for(waiter)
+            self.remove(waiter)
+        return waiter.result
+
+    def finish_or_raise(self, waiter: _Waiter) -> List[Clip]:
+        """Like `finish`, but raise `SunoTimeoutError` if some clips are still not done."""
+        clips = self.finish(waiter)
+        if len(clips) < len(waiter.ids) or any(clip.status not in DONE_STATUSES for clip in clips):
+            raise SunoTimeoutError(waiter.ids, clips)
+        return clips
+
+    def remove(self, waiter: _Waiter) -> None:
+        if waiter in self.waiters:
+            self.waiters.remove(waiter)
+            track_generation(self.metrics, waiter.started, waiter.polls, waiter.first_streaming, waiter.completed)
+        # Forget clips nobody is waiting for any more
+        watched = {clip_id for w in self.waiters for clip_id in w.ids}
+        for clip_id in [c for c in self.clips if c not in watched]:
+            del self.clips[clip_id]
+
+
+class FeedPoller():
+    """Polls the feed for every clip awaited on one `Suno` client with one batched request per tick.
+
+    A background thread runs while at least one caller is waiting, so the number of
+    upstream feed calls stays constant no matter how many generations are pending.
+    """
+
+    def __init__(self, fetch: Callable[[List[str]], List[Clip]], strategy: Optional[PollStrategy] = None,
+                 metrics: Optional[Metrics] = None) -> None:
+        self.fetch = fetch
+        self._state = _PollState(strategy or AdaptivePollStrategy(), metrics)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def strategy(self) -> PollStrategy:
+        return self._state.strategy
+
+    @strategy.setter
+    def strategy(self, strategy: PollStrategy) -> None:
+        self._state.strategy = strategy
+
+    def wait(self, ids: List[str], timeout: Optional[float] = None, deadline: Optional[float] = None,
+             model: Optional[str] = None) -> List[Clip]:
+        """Block until all `ids` are streaming/complete, raising `SunoTimeoutError` if they are not in time."""
+        waiter = _Waiter(ids, model)
+        with self._lock:
+            self._state.waiters.append(waiter)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="SunoFeedPoller", daemon=True)
+                self._thread.start()
+        try:
+            waiter.event.wait(self._state.wait_time(model, timeout, deadline))
+        finally:
+            # Also on KeyboardInterrupt, so the clips of a gone caller are not polled any more
+            with self._lock:
+                self._state.finish(waiter)
+        return self._state.finish_or_raise(waiter)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                pending = self._state.pending_ids()
+                if not self._state.waiters:
+                    self._thread = None
+                    return
+            fetched, error = [], None
+            for chunk in chunk_ids(pending):
+                try:
+                    fetched.extend(self.fetch(chunk))
+                except Exception as e:
+                    logger.warning(f"Feed poll failed: {e}")
+                    error = e
+            with self._lock:
+                for waiter in self._state.update(fetched):
+                    waiter.event.set()
+                if not self._state.waiters:
+                    self._thread = None
+                    return
+                delay = self._state.next_delay(error)
+            time.sleep(delay)
+
+
+class AsyncFeedPoller():
+    """Asyncio counterpart of `FeedPoller`, used by `AsyncSuno`."""
+
+    def __init__(self, fetch: Callable[[List[str]], Awaitable[List[Clip]]], strategy: Optional[PollStrategy] = None,
+                 metrics: Optional[Metrics] = None) -> None:
+        self.fetch = fetch
+        self._state = _PollState(strategy or AdaptivePollStrategy(), metrics)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def strategy(self) -> PollStrategy:
+        return self._state.strategy
+
+    @strategy.setter
+    def strategy(self, strategy: PollStrategy) -> None:
+        self._state.strategy = strategy
+
+    def _register(self, waiter: _Waiter) -> None:
+        waiter.future = asyncio.get_running_loop().create_future()
+        self._state.waiters.append(waiter)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def wait(self, ids: List[str], timeout: Optional[float] = None, deadline: Optional[float] = None,
+                   model: Optional[str] = None) -> List[Clip]:
+        """Wait until all `ids` are streaming/complete, raising `SunoTimeoutError` if they are not in time."""
+        waiter = _Waiter(ids, model)
+        self._register(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self._state.wait_time(model, timeout, deadline))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Also on cancellation, so the clips of a gone caller are not polled any more
+            self._state.finish(waiter)
+        return self._state.finish_or_raise(waiter)
+
+    async def watch(self, ids: List[str], timeout: float = 100, initial: Optional[List[Clip]] = None) -> AsyncIterator[Clip]:
+        """Yield a clip every time the status of one of `ids` changes, until all are done or `timeout` passes.
+
+        Statuses of the `initial` clips (e.g. the ones returned by `generate`) are not reported again.
+        """
+        waiter = _Waiter(ids)
+        waiter.queue = asyncio.Queue()
+        waiter.statuses = {clip.id: clip.status for clip in initial or []}
+        self._register(waiter)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                try:
+                    clip = await asyncio.wait_for(waiter.queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    return
+                if clip is None:
+                    return
+                yield clip
+        finally:
+            self._state.finish(waiter)
+
+    async def _run(self) -> None:
+        while self._state.waiters:
+            fetched, error = [], None
+            for chunk in chunk_ids(self._state.pending_ids()):
+                try:
+                    fetched.extend(await self.fetch(chunk))
+                except Exception as e:
+                    logger.warning(f"Feed poll failed: {e}")
+                    error = e
+            for waiter in self._state.update(fetched):
+                if not waiter.future.done():
+                    waiter.future.set_result(None)
+                if waiter.queue is not None:
+                    waiter.queue.put_nowait(None)
+            if not self._state.waiters:
+                break
+            await asyncio.sleep(self._state.next_delay(error))
@@ -0,0 +1,477 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from . import batch, library
+from .dedup import GenerationIndex
+from .library import LibraryMirror
+from .exceptions import (SunoAuthError, SunoCircuitOpenError, SunoConnectionError, SunoHTTPError, SunoNoAccountError,
+                         SunoRateLimitError, SunoTimeoutError)
+from .models import CREDITS_PER_GENERATION, BatchItem, Clip, ClipView, CreditsInfo, ModelVersions, RequestParams
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .utils import split_song_ids
+
+logger = logging.getLogger("SunoAI")
+
+# Seconds before cached credits are refreshed from the billing endpoint
+CREDITS_TTL = 300
+
+# Number of clip IDs whose owning account is remembered
+MAX_OWNERS = 100000
+
+# Backoff for accounts whose requests fail: BACKOFF_BASE * 2^failures, capped at BACKOFF_MAX
+BACKOFF_BASE = 5
+BACKOFF_MAX = 600
+
+
+def _account_failed(error: Exception) -> bool:
+    """Whether `error` is a fault of the account or of upstream, rather than of the request itself."""
+    if isinstance(error, (SunoConnectionError, SunoCircuitOpenError, SunoAuthError, SunoRateLimitError)):
+        return True
+    return isinstance(error, SunoHTTPError) and error.status_code >= 500
+
+
+class _Account():
+    """Load-balancing state of one account in a pool."""
+
+    def __init__(self, index: int, client, max_in_flight: Optional[int] = None) -> None:
+        self.index = index
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.credits_left: Optional[int] = None
+        self.credits_fetched_at = 0.0
+        self.in_flight = 0
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def credits_stale(self) -> bool:
+        return self.credits_left is None or time.time() - self.credits_fetched_at > CREDITS_TTL
+
+    def available(self, now: float) -> bool:
+        return now >= self.retry_at and (self.credits_left is None or self.credits_left >= CREDITS_PER_GENERATION)
+
+    def full(self) -> bool:
+        return self.max_in_flight is not None and self.in_flight >= self.max_in_flight
+
+    def record_credits(self, credits: CreditsInfo) -> None:
+        self.credits_left = credits.credits_left
+        self.credits_fetched_at = time.time()
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self, error: Exception) -> None:
+        self.failures += 1
+        delay = min(BACKOFF_BASE * 2 ** (self.failures - 1), BACKOFF_MAX)
+        self.retry_at = time.time() + delay
+        logger.warning(f"Account #{self.index} failed ({error}), out of rotation for {delay}s")
+
+
+class _PoolBase():
+    """Account selection and clip ownership shared by `SunoPool` and `AsyncSunoPool`."""
+
+    def __init__(self, accounts: List[_Account]) -> None:
+        if not accounts:
+            raise ValueError("At least one cookie is required")
+        self.accounts = accounts
+        self._owners: Dict[str, _Account] = {}
+
+    def _pick(self) -> Optional[_Account]:
+        """Return the account with the fewest in-flight jobs, preferring the one with most credits left.
+
+        Returns None when every usable account is at its `max_in_flight` limit.
+        """
+        now = time.time()
+        candidates = [account for account in self.accounts if account.available(now)]
+        if not candidates:
+            backing_off = [account.retry_at - now for account in self.accounts if account.retry_at > now]
+            raise SunoNoAccountError(min(backing_off) if backing_off else None)
+        candidates = [account for account in candidates if not account.full()]
+        if not candidates:
+            return None
+        account = max(candidates, key=lambda a: (-a.in_flight, a.credits_left or 0))
+        account.in_flight += 1
+        if account.credits_left is not None:
+            account.credits_left -= CREDITS_PER_GENERATION  # Spend locally until the next refresh
+        return account
+
+    def _remember(self, account: _Account, clips: List[Clip | ClipView]) -> List[Clip | ClipView]:
+        self._set_owner(account, [clip.id for clip in clips])
+        return clips
+
+    def _set_owner(self, account: _Account, song_ids: List[str]) -> None:
+        for song_id in song_ids:
+            self._owners[song_id] = account
+        while len(self._owners) > MAX_OWNERS:
+            del self._owners[next(iter(self._owners))]  # Forget the oldest clip
+
+    def _owner(self, song_id: str) -> _Account:
+        """Return the account that produced `song_id`, or any healthy account if it is unknown."""
+        account = self._owners.get(song_id)
+        if account is not None:
+            return account
+        now = time.time()
+        return next((a for a in self.accounts if now >= a.retry_at), self.accounts[0])
+
+    def _idempotency_key(self, args: tuple, kwargs: dict) -> Optional[str]:
+        """The `idempotency_key` of a `generate` call, passed by name or by position."""
+        return inspect.signature(self.accounts[0].client.generate).bind(*args, **kwargs).arguments.get("idempotency_key")
+
+    def owner_index(self, song_id: str) -> Optional[int]:
+        """Return the index in `accounts` of the account that created `song_id`, if known."""
+        account = self._owners.get(song_id)
+        return account.index if account is not None else None
+
+    def assign(self, song_ids: List[str], index: int) -> None:
+        """Record that `song_ids` belong to `accounts[index]`, e.g. after a restart."""
+        self._set_owner(self.accounts[index], song_ids)
+
+    def _group(self, song_ids: List[str]) -> Dict[_Account, List[str]]:
+        groups: Dict[_Account, List[str]] = {}
+        for song_id in song_ids:
+            groups.setdefault(self._owner(song_id), []).append(song_id)
+        return groups
+
+    @staticmethod
+    def _total_credits(credits: List[CreditsInfo]) -> CreditsInfo:
+        return CreditsInfo(
+            credits_left=sum(c.credits_left for c in credits),
+            period=None,
+            monthly_limit=sum(c.monthly_limit for c in credits),
+            monthly_usage=sum(c.monthly_usage for c in credits),
+        )
+
+
+class SunoPool(_PoolBase):
+    """Spreads generations over several Suno accounts, one `Suno` client per cookie.
+
+    Each `generate` goes to the account with the fewest in-flight jobs and the most
+    credits left. Credits are cached and decremented locally; accounts that fail are
+    taken out of rotation with exponential backoff. Lookups and downloads of a clip
+    are routed to the account that generated it.
+    """
+
+    def __init__(self, cookies: List[str], model_version: str = ModelVersions.CHIRP_V3_5,
+                 max_in_flight: Optional[int] = None, **kwargs) -> None:
+        """
+        Parameters:
+        - cookies (List[str]): One authentication cookie per Suno account.
+        - model_version (str): Optional. Default model version of every client.
+        - max_in_flight (Optional[int]): Optional. Maximum concurrent generations per account; further calls wait for a free slot.
+        - kwargs: Passed on to each `Suno` client. All clients share one `index` so retries find the account that made the songs.
+          A `library` mirror is kept by the pool itself, with the songs of each account under its own scope.
+          A `transport` is copied for each account, which keeps its own rate limits and circuit breakers.
+        """
+        from .suno import Suno  # Imported here so that AsyncSunoPool does not load requests
+        self.library: LibraryMirror = kwargs.pop("library", None) or LibraryMirror()
+        kwargs.setdefault("index", GenerationIndex())
+        transport = kwargs.pop("transport", None)
+        super().__init__([_Account(index, Suno(cookie, model_version, transport=transport and transport.copy(), **kwargs),
+                                   max_in_flight)
+                          for index, cookie in enumerate(cookies)])
+        self._lock = threading.Lock()
+        self._freed = threading.Condition(self._lock)
+        self._flights = SingleFlight()
+
+    def _refresh_credits(self, account: _Account) -> None:
+        try:
+            account.record_credits(account.client.get_credits())
+        except Exception as e:
+            account.record_failure(e)
+
+    def generate(self, *args, **kwargs) -> List[Clip]:
+        """Generate songs on the least loaded account. Same parameters as `Suno.generate`."""
+        idempotency_key = self._idempotency_key(args, kwargs)
+        if idempotency_key:
+            # Concurrent retries must not land on two accounts before either has recorded its songs
+            return self._flights.do(("generate", idempotency_key), lambda: self._generate(*args, **kwargs))
+        return self._generate(*args, **kwargs)
+
+    def _generate(self, *args, **kwargs) -> List[Clip]:
+        song_ids = self.accounts[0].client.lookup_generation(*args, **kwargs)
+        if song_ids:
+            # Songs of an earlier identical request: attach on the account that made them
+            account = self._owner(song_ids[0])
+            clips = account.client.generate(*args, **kwargs)
+            with self._lock:
+                return self._remember(account, clips)
+        for account in self.accounts:
+            if account.credits_stale() and time.time() >= account.retry_at:
+                self._refresh_credits(account)
+        with self._freed:
+            while (account := self._pick()) is None:
+                self._freed.wait()
+        try:
+            clips = account.client.generate(*args, **kwargs)
+        except SunoTimeoutError as e:
+            with self._lock:
+                self._set_owner(account, e.song_ids)  # Generated fine, only the wait ran out
+            raise
+        except Exception as e:
+            if _account_failed(e):  # Bad requests must not take healthy accounts out of rotation
+                with self._lock:
+                    account.record_failure(e)
+            raise
+        finally:
+            with self._freed:
+                account.in_flight -= 1
+                self._freed.notify()
+        with self._lock:
+            account.record_success()
+            return self._remember(account, clips)
+
+    def lookup_generation(self, *args, **kwargs) -> Optional[List[str]]:
+        """Same as `Suno.lookup_generation`; the generation index is shared by all accounts."""
+        return self.accounts[0].client.lookup_generation(*args, **kwargs)
+
+    def generate_batch(self, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                       timeout: Optional[float] = None) -> List[BatchItem]:
+        """Generate many requests spread over the accounts. Same as `Suno.generate_batch`, checked against the credits of all accounts."""
+        return sorted(self.iter_batch(requests, concurrency, wait_audio, timeout), key=lambda item: item.index)
+
+    def iter_batch(self, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                   timeout: Optional[float] = None) -> Iterator[BatchItem]:
+        """Like `generate_batch`, but yields each item as soon as it finishes."""
+        return batch.iter_batch(self, requests, concurrency, wait_audio, timeout)
+
+    def wait(self, song_ids: List[str], timeout: Optional[float] = None,
+             deadline: Optional[float] = None) -> List[Clip]:
+        """Wait for songs that were generated by a single account. Same as `Suno.wait`."""
+        return self._owner(song_ids[0]).client.wait(song_ids, timeout=timeout, deadline=deadline)
+
+    def get_songs(self, song_ids: List[str] | str = None) -> List[Clip]:
+        """Retrieve songs, asking each owning account for its own clips."""
+        if not song_ids:
+            return [clip for account in self.accounts
+                    for clip in self._remember(account, account.client.get_songs())]
+        song_ids = split_song_ids(song_ids)
+        found = {}
+        for account, ids in self._group(song_ids).items():
+            for clip in self._remember(account, account.client.get_songs(ids)):
+                found[clip.id] = clip
+        return [found[song_id] for song_id in song_ids if song_id in found]
+
+    def get_feed(self, song_ids: List[str] | str = None) -> List[ClipView]:
+        """Fast, unvalidated variant of `get_songs`. Same as `Suno.get_feed`."""
+        if not song_ids:
+            return [view for account in self.accounts
+                    for view in self._remember(account, account.client.get_feed())]
+        song_ids = split_song_ids(song_ids)
+        found = {}
+        for account, ids in self._group(song_ids).items():
+            for view in self._remember(account, account.client.get_feed(ids)):
+                found[view.id] = view
+        return [found[song_id] for song_id in song_ids if song_id in found]
+
+    def get_feed_page(self, page: int = 0, account: int = 0) -> List[ClipView]:
+        """Retrieve one page of the library feed of `accounts[account]`. Same as `Suno.get_feed_page`."""
+        owner = self.accounts[account]
+        return self._remember(owner, owner.client.get_feed_page(page))
+
+    def iter_library(self, **kwargs) -> Iterator[Clip | ClipView]:
+        """Iterate over the libraries of all accounts, one after another. Same options as `Suno.iter_library`."""
+        for account in self.accounts:
+            for song in account.client.iter_library(**kwargs):
+                self._set_owner(account, [song.id])
+                yield song
+
+    def sync_library(self) -> List[str]:
+        """Fetch new and changed songs of every account into the pool's library mirror. Same as `Suno.sync_library`."""
+        song_ids = []
+        for account in self.accounts:
+            synced = library.sync(account.client, self.library, scope=str(account.index))
+            with self._lock:
+                self._set_owner(account, synced)
+            song_ids += synced
+        return song_ids
+
+    def search(self, query: Optional[str] = None, tags: Optional[str] = None, status: Optional[str] = None,
+               model_name: Optional[str] = None, limit: int = 50, offset: int = 0,
+               max_age: float = library.SYNC_INTERVAL) -> List[Clip]:
+        """Search the songs of all accounts in the library mirror. Same parameters as `Suno.search`."""
+        if time.time() - min(self.library.synced_at(str(account.index)) for account in self.accounts) > max_age:
+            self.sync_library()
+        return self.library.search(query, tags, status, model_name, limit, offset)
+
+    def get_song(self, id: str) -> Clip:
+        return self._owner(id).client.get_song(id)
+
+    def set_visibility(self, song_id: str, is_public: bool) -> bool:
+        return self._owner(song_id).client.set_visibility(song_id, is_public)
+
+    def get_credits(self) -> CreditsInfo:
+        """Return the credits of all accounts added together."""
+        credits = []
+        for account in self.accounts:
+            info = account.client.get_credits()
+            account.record_credits(info)
+            credits.append(info)
+        return self._total_credits(credits)
+
+    def download(self, song: str | Clip, path: str = "./downloads", **kwargs) -> str:
+        song_id = song.id if isinstance(song, Clip) else song
+        return self._owner(song_id).client.download(song, path, **kwargs)
+
+
+class AsyncSunoPool(_PoolBase):
+    """Asyncio version of `SunoPool`, with one `AsyncSuno` client per cookie."""
+
+    def __init__(self, cookies: List[str], model_version: str = ModelVersions.CHIRP_V3_5,
+                 max_in_flight: Optional[int] = None, **kwargs) -> None:
+        from .async_suno import AsyncSuno
+        self.library: LibraryMirror = kwargs.pop("library", None) or LibraryMirror()
+        kwargs.setdefault("index", GenerationIndex())
+        transport = kwargs.pop("transport", None)
+        super().__init__([_Account(index, AsyncSuno(cookie, model_version, transport=transport and transport.copy(), **kwargs),
+                                   max_in_flight)
+                          for index, cookie in enumerate(cookies)])
+        self._freed = asyncio.Condition()
+        self._flights = AsyncSingleFlight()
+
+    async def aclose(self) -> None:
+        for account in self.accounts:
+            await account.client.aclose()
+
+    async def _refresh_credits(self, account: _Account) -> None:
+        try:
+            account.record_credits(await account.client.get_credits())
+        except Exception as e:
+            account.record_failure(e)
+
+    async def generate(self, *args, **kwargs) -> List[Clip]:
+        """Generate songs on the least loaded account. Same parameters as `AsyncSuno.generate`."""
+        idempotency_key = self._idempotency_key(args, kwargs)
+        if idempotency_key:
+            # Concurrent retries must not land on two accounts before either has recorded its songs
+            return await self._flights.do(("generate", idempotency_key), lambda: self._generate(*args, **kwargs))
+        return await self._generate(*args, **kwargs)
+
+    async def _generate(self, *args, **kwargs) -> List[Clip]:
+        song_ids = self.accounts[0].client.lookup_generation(*args, **kwargs)
+        if song_ids:
+            # Songs of an earlier identical request: attach on the account that made them
+            account = self._owner(song_ids[0])
+            return self._remember(account, await account.client.generate(*args, **kwargs))
+        stale = [account for account in self.accounts
+                 if account.credits_stale() and time.time() >= account.retry_at]
+        await asyncio.gather(*(self._refresh_credits(account) for account in stale))
+        async with self._freed:
+            while (account := self._pick()) is None:
+                await self._freed.wait()
+        try:
+            clips = await account.client.generate(*args, **kwargs)
+        except SunoTimeoutError as e:
+            self._set_owner(account, e.song_ids)  # Generated fine, only the wait ran out
+            raise
+        except Exception as e:
+            if _account_failed(e):  # Bad requests must not take healthy accounts out of rotation
+                account.record_failure(e)
+            raise
+        finally:
+            account.in_flight -= 1
+            async with self._freed:
+                self._freed.notify()
+        account.record_success()
+        return self._remember(account, clips)
+
+    def lookup_generation(self, *args, **kwargs) -> Optional[List[str]]:
+        """Same as `AsyncSuno.lookup_generation`; the generation index is shared by all accounts."""
+        return self.accounts[0].client.lookup_generation(*args, **kwargs)
+
+    async def generate_batch(self, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                             timeout: Optional[float] = None) -> List[BatchItem]:
+        """Generate many requests spread over the accounts. Same as `Suno.generate_batch`, checked against the credits of all accounts."""
+        items = [item async for item in self.iter_batch(requests, concurrency, wait_audio, timeout)]
+        return sorted(items, key=lambda item: item.index)
+
+    def iter_batch(self, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                   timeout: Optional[float] = None) -> AsyncIterator[BatchItem]:
+        """Like `generate_batch`, but yields each item as soon as it finishes."""
+        return batch.aiter_batch(self, requests, concurrency, wait_audio, timeout)
+
+    def watch(self, song_ids: List[str], timeout: float = 100, initial: Optional[List[Clip]] = None) -> AsyncIterator[Clip]:
+        """Follow status changes of songs that were generated by a single account."""
+        return self._owner(song_ids[0]).client.watch(song_ids, timeout=timeout, initial=initial)
+
+    async def wait(self, song_ids: List[str], timeout: Optional[float] = None,
+                   deadline: Optional[float] = None) -> List[Clip]:
+        """Wait for songs that were generated by a single account. Same as `AsyncSuno.wait`."""
+        return await self._owner(song_ids[0]).client.wait(song_ids, timeout=timeout, deadline=deadline)
+
+    async def get_songs(self, song_ids: List[str] | str = None) -> List[Clip]:
+        """Retrieve songs, asking each owning account for its own clips."""
+        if not song_ids:
+            results = await asyncio.gather(*(account.client.get_songs() for account in self.accounts))
+            return [clip for account, clips in zip(self.accounts, results)
+                    for clip in self._remember(account, clips)]
+        song_ids = split_song_ids(song_ids)
+        groups = self._group(song_ids)
+        results = await asyncio.gather(*(account.client.get_songs(ids) for account, ids in groups.items()))
+        found = {clip.id: clip for account, clips in zip(groups, results)
+                 for clip in self._remember(account, clips)}
+        return [found[song_id] for song_id in song_ids if song_id in found]
+
+    async def get_feed(self, song_ids: List[str] | str = None) -> List[ClipView]:
+        """Fast, unvalidated variant of `get_songs`. Same as `AsyncSuno.get_feed`."""
+        if not song_ids:
+            results = await asyncio.gather(*(account.client.get_feed() for account in self.accounts))
+            return [view for account, views in zip(self.accounts, results)
+                    for view in self._remember(account, views)]
+        song_ids = split_song_ids(song_ids)
+        groups = self._group(song_ids)
+        results = await asyncio.gather(*(account.client.get_feed(ids) for account, ids in groups.items()))
+        found = {view.id: view for account, views in zip(groups, results)
+                 for view in self._remember(account, views)}
+        return [found[song_id] for song_id in song_ids if song_id in found]
+
+    async def get_feed_page(self, page: int = 0, account: int = 0) -> List[ClipView]:
+        """Retrieve one page of the library feed of `accounts[account]`. Same as `AsyncSuno.get_feed_page`."""
+        owner = self.accounts[account]
+        return self._remember(owner, await owner.client.get_feed_page(page))
+
+    async def iter_library(self, **kwargs) -> AsyncIterator[Clip | ClipView]:
+        """Iterate over the libraries of all accounts, one after another. Same options as `AsyncSuno.iter_library`."""
+        for account in self.accounts:
+            async for song in account.client.iter_library(**kwargs):
+                self._set_owner(account, [song.id])
+                yield song
+
+    async def sync_library(self) -> List[str]:
+        """Fetch new and changed songs of every account into the pool's library mirror. Same as `Suno.sync_library`."""
+        results = await asyncio.gather(*(library.async_sync(account.client, self.library, scope=str(account.index))
+                                         for account in self.accounts))
+        for account, synced in zip(self.accounts, results):
+            self._set_owner(account, synced)
+        return [song_id for synced in results for song_id in synced]
+
+    async def search(self, query: Optional[str] = None, tags: Optional[str] = None, status: Optional[str] = None,
+                     model_name: Optional[str] = None, limit: int = 50, offset: int = 0,
+                     max_age: float = library.SYNC_INTERVAL) -> List[Clip]:
+        """Search the songs of all accounts in the library mirror. Same parameters as `Suno.search`."""
+        if time.time() - min(self.library.synced_at(str(account.index)) for account in self.accounts) > max_age:
+            await self.sync_library()
+        return self.library.search(query, tags, status, model_name, limit, offset)
+
+    async def get_song(self, id: str) -> Clip:
+        return await self._owner(id).client.get_song(id)
+
+    async def set_visibility(self, song_id: str, is_public: bool) -> bool:
+        return await self._owner(song_id).client.set_visibility(song_id, is_public)
+
+    async def get_credits(self) -> CreditsInfo:
+        """Return the credits of all accounts added together."""
+        credits = await asyncio.gather(*(account.client.get_credits() for account in self.accounts))
+        for account, info in zip(self.accounts, credits):
+            account.record_credits(info)
+        return self._total_credits(credits)
+
+    async def download(self, song: str | Clip, path: str = "./downloads", **kwargs) -> str:
+        song_id = song.id if isinstance(song, Clip) else song
+        return await self._owner(song_id).client.download(song, path, **kwargs)
@@ -0,0 +1,75 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger("SunoAI")
+
+BASE_URL = 'https://studio-api.suno.ai'
+CLERK_BASE_URL = 'https://clerk.suno.com'
+
+# Fetch the cookie from environment variables; used for authentication
+COOKIE = os.getenv("SUNO_COOKIE", "")
+
+# Renew the JWT this many seconds before its `exp` claim is reached
+TOKEN_REFRESH_MARGIN = 15
+
+# One lock per session file, shared by every store on it (e.g. all accounts of a pool)
+_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def _file_lock(path: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class SessionStore():
+    """Keeps the Clerk session ID and JWT of each cookie in a JSON file across restarts.
+
+    Entries are keyed by a hash of the cookie, so one file can hold several accounts and
+    never contains the cookie itself. The file holds live tokens and is created readable
+    by its owner only.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = _file_lock(path)
+
+    @staticmethod
+    def key(cookie: str) -> str:
+        return hashlib.sha256(cookie.encode()).hexdigest()[:32]
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def load(self, key: str) -> Optional[dict]:
+        """Return the saved `sid`, `jwt` and `expires_at` of a cookie, or None."""
+        with self._lock:
+            entry = self._read().get(key)
+        if isinstance(entry, dict) and entry.get("sid"):
+            return entry
+        return None
+
+    def save(self, key: str, sid: str, jwt: Optional[str], expires_at: float) -> None:
+        with self._lock:
+            data = self._read()
+            data[key] = {"sid": sid, "jwt": jwt, "expires_at": expires_at}
+            temp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f)
+                os.replace(temp, self.path)  # Readers never see a half-written file
+            except OSError as e:
+                logger.warning(f"Could not save the session to {self.path}: {e}")
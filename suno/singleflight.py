@@ -0,0 +1,133 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+
+class _Call():
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def get(self) -> Any:
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight():
+    """Collapses concurrent identical calls from several threads into one.
+
+    While a call for a key is running, other callers with the same key wait for it and
+    get its result (or its exception) instead of starting their own.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Return `fn()`, sharing the call with concurrent callers of the same `key`."""
+        return self.do_many([key], lambda keys: {key: fn()})[key]
+
+    def do_many(self, keys: Iterable[Hashable], fetch: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """Resolve `keys` with one `fetch(missing_keys)` call, sharing keys already being fetched by others.
+
+        `fetch` returns a dict; keys it leaves out resolve to None.
+        """
+        mine: Dict[Hashable, _Call] = {}
+        theirs: Dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is None:
+                    mine[key] = self._calls[key] = _Call()
+                else:
+                    theirs[key] = call
+        if mine:
+            try:
+                found = fetch(list(mine))
+                for key, call in mine.items():
+                    call.result = found.get(key)
+            except BaseException as e:
+                for call in mine.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in mine:
+                        del self._calls[key]
+                for call in mine.values():
+                    call.event.set()
+        results = {key: call.result for key, call in mine.items()}
+        for key, call in theirs.items():
+            results[key] = call.get()
+        return results
+
+
+class AsyncSingleFlight():
+    """Asyncio version of `SingleFlight`.
+
+    `do_many` also merges the keys requested by all callers within one event loop tick
+    (or `window` seconds) into a single `fetch` call, so it should be used with one
+    `fetch` function per instance. A caller that is cancelled does not cancel the shared call.
+    """
+
+    def __init__(self, window: float = 0) -> None:
+        self.window = window
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._pending: Optional[Dict[Hashable, asyncio.Future]] = None
+        self._flushes: Set[asyncio.Task] = set()  # Strong references until each batch is done
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return `await fn()`, sharing the call with concurrent callers of the same `key`."""
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    async def do_many(self, keys: Iterable[Hashable],
+                      fetch: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]) -> Dict[Hashable, Any]:
+        """Resolve `keys` through batched `fetch(keys)` calls shared with concurrent callers."""
+        loop = asyncio.get_running_loop()
+        futures: Dict[Hashable, asyncio.Future] = {}
+        for key in dict.fromkeys(keys):
+            future = self._calls.get(key)
+            if future is None:
+                if self._pending is None:
+                    self._pending = {}
+                    task = loop.create_task(self._flush(fetch))
+                    self._flushes.add(task)
+                    task.add_done_callback(self._flushes.discard)
+                future = self._pending[key] = self._calls[key] = loop.create_future()
+            futures[key] = future
+        values = await asyncio.gather(*(asyncio.shield(future) for future in futures.values()))
+        return dict(zip(futures, values))
+
+    async def _flush(self, fetch: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]) -> None:
+        await asyncio.sleep(self.window)  # Let concurrent callers add their keys
+        batch, self._pending = self._pending, None
+        try:
+            found = await fetch(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+        else:
+            for key, future in batch.items():
+                future.set_result(found.get(key))
+        finally:
+            for key, future in batch.items():
+                self._forget(key, future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
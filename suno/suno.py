@@ -2,36 +2,66 @@
 # Repository: https://github.com/Malith-Rukshan/Suno-API
 
 import os
-import pathlib
-import random
 import time
 import logging
-from typing import List, Optional
+import threading
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
 import requests
 
-from .models import ModelVersions, Clip, CreditsInfo
-from .utils import create_clip_from_data, response_to_clips, generate_fake_useragent
+from .models import ModelVersions, Clip, ClipView, CreditsInfo, RequestParams, BatchItem
+from .cache import ClipCache
+from .metrics import Metrics, default_metrics
+from .exceptions import SunoError, SunoAuthError, SunoNotFoundError
+from .transport import Transport, raise_for_status
+from .downloader import ProgressCallback, copy_tagged, download_file, download_tagged
+from .poller import FeedPoller, PollStrategy, DONE_STATUSES, chunk_ids
+from .dedup import GenerationIndex, generation_hash
+from .media import MediaCache
+from .pipeline import AudioPipeline, Cover
+from . import batch, library
+from .library import LibraryMirror
+from .singleflight import SingleFlight
+from .session import BASE_URL, CLERK_BASE_URL, COOKIE, TOKEN_REFRESH_MARGIN, SessionStore
+from .utils import (response_to_clips, generate_fake_useragent, decode_jwt_exp,
+                    build_generate_payload, credits_from_billing, get_download_path, split_song_ids,
+                    json_loads, response_to_views, parse_created_at)
 
-# Setup basic logging configuration
 logger = logging.getLogger("SunoAI")
-logging.basicConfig(level=logging.INFO)
-
-# Fetch the cookie from environment variables; used for authentication
-COOKIE = os.getenv("SUNO_COOKIE", "")
 
 
 class Suno():
     """Main class for interacting with Suno API."""
-    BASE_URL = 'https://studio-api.suno.ai'
-    CLERK_BASE_URL = 'https://clerk.suno.com'
-
-    def __init__(self, cookie: Optional[str] = None, model_version: str = ModelVersions.CHIRP_V3_5) -> None:
+    BASE_URL = BASE_URL
+    CLERK_BASE_URL = CLERK_BASE_URL
+
+    def __init__(self, cookie: Optional[str] = None, model_version: str = ModelVersions.CHIRP_V3_5,
+                 cache: ClipCache | bool = True, base_url: Optional[str] = None,
+                 clerk_base_url: Optional[str] = None, metrics: Optional[Metrics] = None,
+                 poll_strategy: Optional[PollStrategy] = None, transport: Optional[Transport] = None,
+                 index: Optional[GenerationIndex] = None, media_cache: Optional[MediaCache] = None,
+                 session_file: Optional[str] = None, library: Optional[LibraryMirror] = None,
+                 pipeline: Optional[AudioPipeline] = None) -> None:
         """
         Initialize the Suno client.
 
         Parameters:
         - cookie (Optional[str]): Optional. The authentication cookie for the Suno API. If not provided, it will use the cookie from the environment variable SUNO_COOKIE.
         - model_version (str): Optional. The model version to use for generating audio. Available models: `chirp-v3-5`, `chirp-v3-0`, `chirp-v2-0` default is `chirp-v3-5`.
+        - cache (ClipCache | bool): Optional. Cache for song lookups. True uses an in-memory cache, False disables caching. Default is True.
+        - base_url (Optional[str]): Optional. Suno API base URL, e.g. of a local mock server. Defaults to the SUNO_BASE_URL environment variable or `Suno.BASE_URL`.
+        - clerk_base_url (Optional[str]): Optional. Clerk auth base URL. Defaults to the SUNO_CLERK_BASE_URL environment variable or `Suno.CLERK_BASE_URL`.
+        - metrics (Optional[Metrics]): Optional. Where upstream request metrics are recorded. Defaults to the shared `suno.metrics.default_metrics`.
+        - poll_strategy (Optional[PollStrategy]): Optional. How often to poll while waiting for songs. Defaults to an `AdaptivePollStrategy` that learns how long each model takes.
+        - transport (Optional[Transport]): Optional. Rate limits, timeouts, retries, circuit breaker and connection pools (sizes, keep-alive, DNS cache, compression) of all upstream requests, downloads included. Use one per client.
+        - index (Optional[GenerationIndex]): Optional. Where generated song IDs are remembered for idempotency keys and `reuse_within`. Defaults to an in-memory index.
+        - media_cache (Optional[MediaCache]): Optional. On-disk cache that `download` fills and serves repeated downloads from. Default is no cache.
+        - session_file (Optional[str]): Optional. JSON file where the session ID and token are saved, so a restarted process can reuse a still valid token. Defaults to the SUNO_SESSION_FILE environment variable; not saved if unset.
+        - library (Optional[LibraryMirror]): Optional. Local copy of the account's songs used by `search`. Defaults to an in-memory mirror.
+        - pipeline (Optional[AudioPipeline]): Optional. ID3 tags, cover art and post-processing steps applied by `download`. Default is none, which saves the file as served.
+
+        No network request is made here: the session is set up on the first API call.
         """
         if cookie is None:
             cookie = COOKIE
@@ -43,23 +73,50 @@ class Suno():
             'User-Agent': generate_fake_useragent(),
             'Cookie': cookie
         }
-        self.client = requests.Session()
-        self.client.headers.update(headers)
+        self.transport = transport or Transport()
+        self.client = self.transport.session(headers)
+        # Audio CDN requests get their own pool and never carry the cookie or JWT
+        self.cdn_client = self.transport.session({'User-Agent': headers['User-Agent']}, cdn=True)
         self.current_token = None
+        self.token_expires_at = 0.0
         self.sid = None
+        self._token_lock = threading.Lock()
+        self._refresh_timer: Optional[threading.Timer] = None
         
         if model_version not in ModelVersions.AVAILABLE_MODELS:
             raise ValueError(f"Invalid model version. Available models are: {ModelVersions.AVAILABLE_MODELS}")
 
         self.model_version = model_version
-
-        self._get_session_id()  # Retrieve session ID upon initialization
-        self._keep_alive()      # Keep session alive
+        self.base_url = (base_url or os.getenv("SUNO_BASE_URL") or Suno.BASE_URL).rstrip("/")
+        self.clerk_base_url = (clerk_base_url or os.getenv("SUNO_CLERK_BASE_URL") or Suno.CLERK_BASE_URL).rstrip("/")
+        self.cache: Optional[ClipCache] = ClipCache() if cache is True else (cache or None)
+        self.metrics = metrics or default_metrics
+        if self.cache is not None:
+            self.metrics.register_cache(self.cache)
+        # One poller per client batches the feed calls of all concurrent waits
+        self.poller = FeedPoller(self._fetch_songs, poll_strategy, metrics=self.metrics)
+        # Concurrent lookups of the same songs or credits share one upstream request
+        self._song_flights = SingleFlight()
+        self._flights = SingleFlight()
+        self.index = index or GenerationIndex()
+        self.media_cache = media_cache
+        session_file = session_file or os.getenv("SUNO_SESSION_FILE")
+        self.session_store = SessionStore(session_file) if session_file else None
+        self._session_key = SessionStore.key(cookie)
+        self._sid_restored = False
+        self.library = library or LibraryMirror()
+        self.pipeline = pipeline
+
+    @property
+    def session_key(self) -> str:
+        """Identifies this client's account without revealing its cookie, as used by `SessionStore` and the coordinator."""
+        return self._session_key
 
     def _get_session_id(self) -> None:
         """Retrieve a session ID from the Suno service."""
-        url = f"{Suno.CLERK_BASE_URL}/v1/client?_clerk_js_version=4.72.1"
-        response = self.client.get(url)
+        url = f"{self.clerk_base_url}/v1/client?_clerk_js_version=4.72.1"
+        response = self._send("GET", url)
+        raise_for_status(response)
         if not response.json()['response']:
             raise Exception(
                 "Failed to get session id, you may need to update the SUNO_COOKIE")
@@ -69,34 +126,108 @@ class Suno():
             raise Exception(
                 f"Failed to get Session ID: {response.status_code}")
 
-    def _keep_alive(self, is_wait=False) -> None:
-        """Renew the authentication token periodically to keep the session active."""
-        if not self.sid:
-            raise Exception("Session ID is not set. Cannot renew token.")
+    def _keep_alive(self, force: bool = False) -> None:
+        """Renew the authentication token if it is missing or about to expire.
 
-        renew_url = f"{Suno.CLERK_BASE_URL}/v1/client/sessions/{self.sid}/tokens?_clerk_js_version=4.72.0-snapshot.vc141245"
-        renew_response = self.client.post(renew_url)
+        The first call sets up the session, from the session file if it holds one.
+        """
+        with self._token_lock:
+            if not force and self.current_token and time.time() < self.token_expires_at - TOKEN_REFRESH_MARGIN:
+                return  # Cached token is still valid
+            if not self.sid and self._restore_session() and not force:
+                return  # Token saved by an earlier process is still valid
+            try:
+                self._renew_token()
+            except (SunoAuthError, SunoNotFoundError):
+                if not self._sid_restored:
+                    raise
+                logger.info("Saved session is no longer valid, starting a new one...")
+                self.sid = None
+                self._renew_token()
+            self._sid_restored = False
+
+    def _renew_token(self) -> None:
+        if not self.sid:
+            self._get_session_id()
+        renew_url = f"{self.clerk_base_url}/v1/client/sessions/{self.sid}/tokens?_clerk_js_version=4.72.0-snapshot.vc141245"
+        renew_response = self._send("POST", renew_url, idempotent=True)
+        raise_for_status(renew_response)
         logger.info("Renew Token ♻️")
+        self._set_token(renew_response.json()['jwt'])
+        if self.session_store is not None:
+            self.session_store.save(self._session_key, self.sid, self.current_token, self.token_expires_at)
+
+    def _set_token(self, token: str) -> None:
+        self.current_token = token
+        # Tokens without a readable `exp` claim are renewed on every call
+        self.token_expires_at = decode_jwt_exp(token) or 0.0
+        # Set New Token to Headers
+        self.client.headers['Authorization'] = f"Bearer {token}"
+        self._schedule_refresh()
+
+    def _restore_session(self) -> bool:
+        """Take the session ID saved by an earlier process, and its token if still valid."""
+        saved = self.session_store.load(self._session_key) if self.session_store is not None else None
+        if saved is None:
+            return False
+        self.sid = saved["sid"]
+        self._sid_restored = True
+        if not saved.get("jwt") or time.time() >= (saved.get("expires_at") or 0) - TOKEN_REFRESH_MARGIN:
+            return False
+        logger.info("Reusing saved session token ♻️")
+        self._set_token(saved["jwt"])
+        return True
+
+    def _schedule_refresh(self) -> None:
+        """Schedule a background renewal shortly before the current token expires."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        delay = self.token_expires_at - TOKEN_REFRESH_MARGIN - time.time()
+        if delay <= 0:
+            return
+        self._refresh_timer = threading.Timer(delay, self._background_refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self._keep_alive(force=True)
+        except Exception as e:
+            # The next request will renew the token on demand instead
+            logger.warning(f"Background token renewal failed: {e}")
 
-        if is_wait:
-            # Sleep randomly to mimic human interaction
-            time.sleep(random.uniform(1, 2))
+    def _request(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+        """Send an authenticated request, renewing the token once if it is rejected with 401.
 
-        new_token = renew_response.json()['jwt']
-        self.current_token = new_token
-        # Set New Token to Headers
-        self.client.headers['Authorization'] = f"Bearer {new_token}"
+        Raises a `SunoError` subclass if the request ultimately fails.
+        """
+        self._keep_alive()
+        response = self._send(method, url, idempotent, **kwargs)
+        if response.status_code == 401:
+            logger.info("Token rejected, retrying with a fresh one...")
+            self.metrics.inc("suno_upstream_retries_total", reason="401")
+            self._keep_alive(force=True)
+            response = self._send(method, url, idempotent, **kwargs)
+        raise_for_status(response)
+        return response
+
+    def _send(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+        """Send one HTTP request through the transport, which rate limits, retries and records metrics."""
+        return self.transport.send(self.client, method, url, idempotent, self.metrics, **kwargs)
 
     def _cehck_error(self, response):
+        """Raise the `detail` message of a response that reports an error in its body."""
         try:
             resp = response.json()
-            if resp['detail']:
-                raise Exception(resp['detail'])
-        except:
-            pass
+        except ValueError:
+            return
+        if isinstance(resp, dict) and resp.get('detail'):
+            raise SunoError(resp['detail'])
 
     # Generate Songs
-    def generate(self, prompt, is_custom, tags="", title="", make_instrumental=False, wait_audio=False, model_version: Optional[str] = None) -> List[Clip]:
+    def generate(self, prompt, is_custom, tags="", title="", make_instrumental=False, wait_audio=False, model_version: Optional[str] = None,
+                 idempotency_key: Optional[str] = None, reuse_within: Optional[float] = None) -> List[Clip]:
         """
         Generate songs based on the provided parameters and optionally wait for the audio to be ready.
 
@@ -108,30 +239,70 @@ class Suno():
         - make_instrumental (Optional[bool]): If True, generates an instrumental version of the track. Default is False.
         - wait_audio (bool): If True, waits until the audio URLs are ready and returns them. If False, returns the IDs of the songs being processed, which can be used to fetch the songs later using get_song.
         - model_version (Optional[str]): The model version to use for generating audio. If not provided, defaults to the model_version provided by Initialization (self.model_version).
+        - idempotency_key (Optional[str]): Optional. Later calls with the same key attach to the songs of the first call instead of generating (and paying for) new ones.
+        - reuse_within (Optional[float]): Optional. Return the complete songs of an identical request made within this many seconds instead of generating new ones.
 
         Returns:
         List[Clip]: A list of Clip objects containing either song IDs or complete song data, depending on the 'wait_audio' parameter.
         """
-        self._keep_alive()
         logger.info("Generating Audio...")
-        
+
         if model_version is None:
             model_version = self.model_version
-            
-        payload = {
-            "make_instrumental": make_instrumental,
-            "mv": model_version,
-            "prompt": ""
-        }
-        if is_custom:
-            payload["tags"] = tags
-            payload["title"] = title
-            payload["prompt"] = prompt
-        else:
-            payload["gpt_description_prompt"] = prompt
 
-        response = self.client.post(
-            f"{Suno.BASE_URL}/api/generate/v2/", json=payload)
+        digest = generation_hash(prompt, is_custom, tags, title, make_instrumental, model_version)
+        clips = self._find_generation(digest, idempotency_key, reuse_within)
+        if clips is None:
+            payload = build_generate_payload(
+                prompt, is_custom, tags, title, make_instrumental, model_version)
+            if idempotency_key:
+                # Concurrent retries with the same key share the first submission
+                clips = self._flights.do(("generate", idempotency_key),
+                                          lambda: self._submit_once(payload, digest, idempotency_key))
+            else:
+                clips = self._submit(payload, digest, None)
+
+        if wait_audio and any(clip.status not in DONE_STATUSES for clip in clips):
+            return self._wait_for_audio([clip.id for clip in clips], model_version)
+        logger.info("Generated Audio Successfully ✅")
+        return clips
+
+    def generate_batch(self, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                       timeout: Optional[float] = None) -> List[BatchItem]:
+        """
+        Generate songs for many requests at once.
+
+        Parameters:
+        - requests (List[RequestParams]): The generations to make. Their `wait_audio` is ignored in favour of the batch's.
+        - concurrency (int): Optional. Maximum number of generations submitted at the same time. Default is 4.
+        - wait_audio (bool): Optional. If True, waits until every item's songs are streaming or complete. Default is True.
+        - timeout (Optional[float]): Optional. Seconds after which the whole batch stops waiting. Defaults to the poll strategy's timeout per item.
+
+        Returns:
+        List[BatchItem]: One item per request, in the order of `requests`, with its clips or the `error` that stopped it.
+
+        Raises:
+        SunoInsufficientCreditsError: The batch needs more credits than are left; nothing was submitted.
+        """
+        return sorted(self.iter_batch(requests, concurrency, wait_audio, timeout), key=lambda item: item.index)
+
+    def iter_batch(self, requests: List[RequestParams], concurrency: int = 4, wait_audio: bool = True,
+                   timeout: Optional[float] = None) -> Iterator[BatchItem]:
+        """Like `generate_batch`, but yields each item as soon as it finishes."""
+        return batch.iter_batch(self, requests, concurrency, wait_audio, timeout)
+
+    def _submit_once(self, payload: dict, digest: str, idempotency_key: str) -> List[Clip]:
+        """Submit under the flight of `idempotency_key`, unless a call that just left it already recorded songs."""
+        song_ids = self.index.by_key(idempotency_key, digest)
+        if song_ids:
+            logger.info("Attaching to the songs of an earlier request with the same key ♻️")
+            return self.get_songs(song_ids)
+        return self._submit(payload, digest, idempotency_key)
+
+    def _submit(self, payload: dict, digest: str, idempotency_key: Optional[str]) -> List[Clip]:
+        """Post a generation request and remember its songs in the generation index."""
+        response = self._request(
+            "POST", f"{self.base_url}/api/generate/v2/", json=payload)
         logger.debug(response.text)
 
         self._cehck_error(response)
@@ -140,32 +311,59 @@ class Suno():
             logger.error("Audio Generate Failed ⁉️")
             raise Exception(f"Error response: {response.text}")
 
-        song_ids = [audio['id'] for audio in response.json()['clips']]
-        if wait_audio:
-            return self._wait_for_audio(song_ids)
-        else:
-            self._keep_alive(True)
-            logger.info("Generated Audio Successfully ✅")
-            return response_to_clips(response.json()['clips'])
-
-    def _wait_for_audio(self, song_ids):
-        """Helper method to wait for audio processing to complete."""
-        start_time = time.time()
-        last_clips = []
-        while time.time() - start_time < 100:  # Timeout after 100 seconds
-            try:
+        clips = response_to_clips(response.json()['clips'])
+        self.index.record(digest, idempotency_key, [clip.id for clip in clips])
+        return clips
+
+    def lookup_generation(self, prompt, is_custom, tags="", title="", make_instrumental=False, wait_audio=False,
+                          model_version: Optional[str] = None, idempotency_key: Optional[str] = None,
+                          reuse_within: Optional[float] = None) -> Optional[List[str]]:
+        """Return the song IDs of an earlier generation that the same `generate` call may attach to, if any."""
+        digest = generation_hash(prompt, is_custom, tags, title, make_instrumental, model_version or self.model_version)
+        song_ids = self.index.by_key(idempotency_key, digest) if idempotency_key else None
+        if song_ids is None and reuse_within:
+            song_ids = self.index.by_hash(digest, reuse_within)
+        return song_ids
+
+    def _find_generation(self, digest: str, idempotency_key: Optional[str],
+                         reuse_within: Optional[float]) -> Optional[List[Clip]]:
+        """Return the songs of an earlier generation to attach to instead of generating new ones."""
+        if idempotency_key:
+            song_ids = self.index.by_key(idempotency_key, digest)
+            if song_ids:
+                logger.info("Attaching to the songs of an earlier request with the same key ♻️")
+                return self.get_songs(song_ids)
+        if reuse_within:
+            song_ids = self.index.by_hash(digest, reuse_within)
+            if song_ids:
                 clips = self.get_songs(song_ids)
-                all_completed = all(
-                    audio.status in ['streaming', 'complete'] for audio in clips)
-                if all_completed:
-                    logger.info("Generated Audio Successfully ✅")
+                if len(clips) == len(song_ids) and all(clip.status == "complete" for clip in clips):
+                    logger.info("Reusing the songs of an identical request ♻️")
                     return clips
-                last_clips = clips
-            except:pass
-            time.sleep(random.uniform(3, 6))  # Wait with variation
-            self._keep_alive(True)
+        return None
+
+    def _wait_for_audio(self, song_ids, model_version=None):
+        """Helper method to wait for audio processing to complete."""
+        clips = self.poller.wait(song_ids, model=model_version)  # Timeout chosen by the poll strategy
         logger.info("Generated Audio Successfully ✅")
-        return last_clips
+        return clips
+
+    def wait(self, song_ids: List[str], timeout: Optional[float] = None, deadline: Optional[float] = None) -> List[Clip]:
+        """
+        Wait until songs are streaming or complete, e.g. after `generate(..., wait_audio=False)`.
+
+        Parameters:
+        - song_ids (List[str]): IDs of the songs to wait for.
+        - timeout (Optional[float]): Maximum number of seconds to wait. Defaults to the poll strategy's timeout (at least 100).
+        - deadline (Optional[float]): Absolute `time.time()` after which to stop waiting, e.g. shared by several calls.
+
+        Returns:
+        List[Clip]: The songs, all streaming, complete or failed.
+
+        Raises:
+        SunoTimeoutError: The songs were not ready in time; its `clips` holds their last known state.
+        """
+        return self.poller.wait(song_ids, timeout=timeout, deadline=deadline)
 
     def get_songs(self, song_ids: List[str] | str = None) -> List[Clip]:
         """
@@ -181,19 +379,141 @@ class Suno():
         - To retrieve specific songs: get_songs(song_ids=["123-abcd-456", "456-cdef-789"])
         - To retrieve a list of all songs in the library: get_songs()
         """
-        self._keep_alive()  # Ensure session is active
-        url = f"{Suno.BASE_URL}/api/feed/"
+        if not song_ids:
+            return self._fetch_songs()
+        song_ids = split_song_ids(song_ids)
+        found = {}
+        if self.cache is not None:
+            for song_id in song_ids:
+                clip = self.cache.get(song_id)
+                if clip is not None:
+                    found[song_id] = clip
+        missing = [song_id for song_id in song_ids if song_id not in found]
+        if missing:
+            found.update(self._fetch_shared(missing))
+        return [found[song_id] for song_id in song_ids if song_id in found]
+
+    def _fetch_shared(self, song_ids: List[str]) -> Dict[str, Clip]:
+        """Fetch songs by ID, joining the requests already in flight for any of them."""
+        found = self._song_flights.do_many(song_ids, self._fetch_by_id)
+        return {song_id: clip for song_id, clip in found.items() if clip is not None}
+
+    def _fetch_by_id(self, song_ids: List[str]) -> Dict[str, Clip]:
+        found = {}
+        for chunk in chunk_ids(song_ids):
+            for clip in self._fetch_songs(chunk):
+                found[clip.id] = clip
+        return found
+
+    def _fetch_songs(self, song_ids: Optional[List[str]] = None) -> List[Clip]:
+        """Fetch songs from the feed, bypassing and refreshing the cache."""
+        url = f"{self.base_url}/api/feed/"
         if song_ids:
-            if isinstance(song_ids, list):
-                songIds = ",".join(song_ids)
-            else:
-                songIds = song_ids
-            url += f"?ids={songIds}"
+            url += f"?ids={','.join(song_ids)}"
         logger.info("Getting Songs Info...")
-        response = self.client.get(url)  # Call API
+        response = self._request("GET", url)  # Call API
         logger.debug(response.text)
         self._cehck_error(response)
-        return response_to_clips(response.json())
+        clips = response_to_clips(response.json())
+        if self.cache is not None:
+            for clip in clips:
+                self.cache.put(clip)
+        return clips
+
+    def get_feed(self, song_ids: List[str] | str = None) -> List[ClipView]:
+        """
+        Fast variant of `get_songs` for large feeds: skips the cache and model validation.
+
+        Parameters:
+        - song_ids (str or List[str]): Same as `get_songs`.
+
+        Returns:
+        List[ClipView]: Views over the raw feed entries; use `.raw` for the JSON dict or `.clip` for a validated Clip.
+        """
+        url = f"{self.base_url}/api/feed/"
+        if song_ids:
+            url += f"?ids={','.join(split_song_ids(song_ids))}"
+        logger.info("Getting Songs Info...")
+        return response_to_views(self._get_feed_json(url))
+
+    def get_feed_page(self, page: int = 0) -> List[ClipView]:
+        """Retrieve one page of the library feed (newest first) as `ClipView` objects."""
+        logger.info(f"Getting Library Page {page}...")
+        return response_to_views(self._get_feed_json(f"{self.base_url}/api/feed/?page={page}"))
+
+    def _get_feed_json(self, url: str) -> list:
+        response = self._request("GET", url)  # Call API
+        data = json_loads(response.content)
+        if isinstance(data, dict) and data.get('detail'):
+            raise SunoError(data['detail'])
+        return data
+
+    def iter_library(self, since: Optional[str | datetime.datetime] = None, filter: Optional[Callable] = None,
+                     lazy: bool = False, max_pages: Optional[int] = None) -> Iterator[Clip | ClipView]:
+        """
+        Iterate over the whole library page by page, newest songs first, with flat memory use.
+
+        The next page is fetched while the current one is being consumed.
+
+        Parameters:
+        - since (Optional[str | datetime]): Stop at the first song created at or before this time, for incremental syncs.
+        - filter (Optional[Callable]): Only yield songs for which `filter(song)` is true.
+        - lazy (bool): Yield `ClipView` objects instead of validated `Clip` objects. Default is False.
+        - max_pages (Optional[int]): Stop after this many pages.
+
+        Returns:
+        Iterator[Clip | ClipView]: Songs one at a time.
+        """
+        since = parse_created_at(since) if since else None
+        prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SunoFeedPrefetch")
+        try:
+            page = 0
+            next_page = prefetcher.submit(self.get_feed_page, page)
+            while next_page is not None:
+                views = next_page.result()
+                page += 1
+                next_page = None
+                if views and (max_pages is None or page < max_pages):
+                    next_page = prefetcher.submit(self.get_feed_page, page)
+                for view in views:
+                    if since and parse_created_at(view.created_at) <= since:
+                        return
+                    song = view if lazy else view.clip
+                    if filter is None or filter(song):
+                        yield song
+        finally:
+            prefetcher.shutdown(wait=False, cancel_futures=True)
+
+    def sync_library(self) -> List[str]:
+        """
+        Fetch the songs created since the last sync, and those that were still generating, into the local library mirror.
+
+        Returns:
+        List[str]: IDs of the new or changed songs.
+        """
+        return self._flights.do("sync", lambda: library.sync(self, self.library))
+
+    def search(self, query: Optional[str] = None, tags: Optional[str] = None, status: Optional[str] = None,
+               model_name: Optional[str] = None, limit: int = 50, offset: int = 0,
+               max_age: float = library.SYNC_INTERVAL) -> List[Clip]:
+        """
+        Search the songs of the account in the local library mirror, newest first.
+
+        Parameters:
+        - query (Optional[str]): Words that must all appear in the title, tags or lyrics/prompt; the last word may be a prefix.
+        - tags (Optional[str]): Comma separated tags that must all appear in the song's tags.
+        - status (Optional[str]): Comma separated statuses to include, e.g. "complete".
+        - model_name (Optional[str]): Only songs of this model, e.g. "chirp-v3".
+        - limit (int): Maximum number of songs returned. Default is 50.
+        - offset (int): Number of matching songs to skip, for paging.
+        - max_age (float): Sync the mirror first if its last sync is older than this many seconds. Default is 60.
+
+        Returns:
+        List[Clip]: The matching songs.
+        """
+        if time.time() - self.library.synced_at() > max_age:
+            self.sync_library()
+        return self.library.search(query, tags, status, model_name, limit, offset)
 
     def get_song(self, id: str) -> Clip:
         """
@@ -205,13 +525,15 @@ class Suno():
         Returns:
         Clip: A Clip object containing details about the song, such as the audio URL, song status, and other metadata.
         """
-        self._keep_alive()  # Ensure session is active
+        if self.cache is not None:
+            clip = self.cache.get(id)
+            if clip is not None:
+                return clip
         logger.info("Getting Song Info...")
-        response = self.client.get(
-            f"{Suno.BASE_URL}/api/feed/?ids={id}")  # Call API
-        logger.debug(response.text)
-        self._cehck_error(response)
-        return create_clip_from_data(response.json()[0])
+        clip = (self._fetch_shared([id])).get(id)
+        if clip is None:
+            raise SunoNotFoundError(404, f"Song not found: {id}")
+        return clip
     
     def set_visibility(self, song_id: str, is_public: bool) -> bool:
         """
@@ -224,52 +546,46 @@ class Suno():
         Returns:
         bool: Status of the public visibility of the song. True if the song is public, False if private.
         """
-        self._keep_alive()  # Ensure session is active
         payload = {
             "is_public": is_public
         }
-        response = self.client.post(
-            f"{Suno.BASE_URL}/api/gen/{song_id}/set_visibility/", json=payload)
+        response = self._request(
+            "POST", f"{self.base_url}/api/gen/{song_id}/set_visibility/", idempotent=True, json=payload)
         logger.debug(response.text)
         if response.status_code == 200:
             data = response.json()
+            if self.cache is not None:
+                self.cache.set_visibility(song_id, data["is_public"])
             return data["is_public"]
         else:
             raise Exception(f"Error setting visibility: {response.text}")
 
     def get_credits(self) -> CreditsInfo:
         """Retrieve current billing and credits information."""
-        self._keep_alive()  # Ensure session is active
+        return self._flights.do("credits", self._fetch_credits)
+
+    def _fetch_credits(self) -> CreditsInfo:
         logger.info("Credits Info...")
-        response = self.client.get(
-            f"{Suno.BASE_URL}/api/billing/info/")  # Call API
+        response = self._request(
+            "GET", f"{self.base_url}/api/billing/info/")  # Call API
         logger.debug(response.text)
         self._cehck_error(response)
         if response.status_code == 200:
-            data = response.json()
-            result = {
-                "credits_left": data["total_credits_left"],
-                "period": data["period"],
-                "monthly_limit": data["monthly_limit"],
-                "monthly_usage": data["monthly_usage"],
-            }
-            return CreditsInfo(**result)
+            return credits_from_billing(response.json())
         else:
             raise Exception(f"Error retrieving credits: {response.text}")
 
     def _get_dl_path(self, song: Clip, path: str) -> str:
-        output_dir = pathlib.Path(path)
-        output_dir.mkdir(parents=True, exist_ok=True)
-        song_name = song.title.replace("/", "-")
-        return output_dir / f"{song_name} - {song.id}.mp3"
+        return get_download_path(song, path)
 
-    def download(self, song: str | Clip, path: str = "./downloads",) -> str:
+    def download(self, song: str | Clip, path: str = "./downloads", progress: Optional[ProgressCallback] = None) -> str:
         """
         Downloads a Suno song to a specified location.
 
         Args:
             song (str | Clip): Either the ID of the song or a Clip object representing the song.
             path (str): The directory where the song should be saved. Defaults to "./downloads".
+            progress (Optional[ProgressCallback]): Called as progress(filename, bytes_done, total_bytes) while downloading.
 
         Returns:
             str: The full filepath of the downloaded song.
@@ -278,27 +594,90 @@ class Suno():
             TypeError: If the 'song' argument is not of type str or Clip.
             Exception: If the download fails (e.g., bad URL, HTTP errors).
         """
-        if isinstance(song, Clip):
-            id = song.id
-            url = song.audio_url
-        elif isinstance(song, str):
-            id = song
-            song = self.get_song(id)
-            url = song.audio_url
-        else:
+        if isinstance(song, str):
+            song = self.get_song(song)
+        elif not isinstance(song, Clip):
             raise TypeError
+        target = self._get_dl_path(song, path)
+        if self.pipeline is not None:
+            return self._download_processed(song, target, progress)
+        cached = self.media_cache.get(song.id) if self.media_cache is not None else None
+        if cached is not None:
+            logger.info(f"Copied from media cache: {target}")
+            return self.media_cache.copy_to(cached, target)
+        url = song.audio_url
         logger.info(f"Audio URL : {url}")
-        response = requests.get(url)
-        if not response.ok:
-            raise Exception(
-                f"failed to download from audio url: {response.status_code}"
-            )
-        response = requests.get(url, stream=True)
-        response.raise_for_status()  # Check for HTTP errors
-        filename = self._get_dl_path(song, path)
-        with open(filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:  # Filter out keep-alive chunks
-                    f.write(chunk)
+        with self.metrics.track_request("GET", url) as info:
+            filename = download_file(self.cdn_client, url, target, progress,
+                                     (self.transport.connect_timeout, self.transport.read_timeout))
+            info["status"] = 200
+        if self.media_cache is not None:
+            self.media_cache.put_file(song.id, "audio", filename, "audio/mpeg")
+        logger.info(f"Download complete: {filename}")
+        return filename
+
+    def _download_processed(self, song: Clip, target: str, progress: Optional[ProgressCallback]) -> str:
+        """Write the song tagged by the pipeline in one pass, from the media cache or the CDN, then run its steps."""
+        header = self.pipeline.header(song, self._fetch_cover(song) if self.pipeline.cover else None)
+        cached = self.media_cache.get(song.id) if self.media_cache is not None else None
+        if cached is not None:
+            filename = copy_tagged(cached.path, target, header)
+        else:
+            fill = self.media_cache.filler(song.id, "audio", "audio/mpeg") if self.media_cache is not None else None
+            with self.metrics.track_request("GET", song.audio_url) as info:
+                filename = download_tagged(self.cdn_client, song.audio_url, target, header, fill, progress,
+                                           (self.transport.connect_timeout, self.transport.read_timeout))
+                info["status"] = 200
+        for future in self.pipeline.submit(filename, song):
+            future.result()
         logger.info(f"Download complete: {filename}")
         return filename
+
+    def _fetch_cover(self, song: Clip) -> Optional[Cover]:
+        """Cover image of a song, or None if it has none or it cannot be fetched; the song is saved without it then."""
+        cached = self.media_cache.get(song.id, "image") if self.media_cache is not None else None
+        if cached is not None:
+            return Cover(cached.path.read_bytes(), cached.content_type)
+        url = song.image_large_url or song.image_url
+        if not url:
+            return None
+        try:
+            with self.metrics.track_request("GET", url) as info:
+                response = self.cdn_client.get(url, timeout=(self.transport.connect_timeout, self.transport.read_timeout))
+                info["status"] = response.status_code
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"Could not fetch the cover of {song.id}: {e}")
+            return None
+        cover = Cover(response.content, response.headers.get("Content-Type", "image/jpeg"))
+        if self.media_cache is not None:
+            self.media_cache.put_bytes(song.id, "image", cover.data, cover.content_type)
+        return cover
+
+    def download_many(self, songs: List[str | Clip], path: str = "./downloads", concurrency: int = 8,
+                      progress: Optional[ProgressCallback] = None) -> List[str]:
+        """
+        Downloads several songs in parallel.
+
+        Each file is fetched with a single request into a `.part` file that is resumed with an
+        HTTP Range request if interrupted and renamed into place when complete. Files already
+        present with the remote size are skipped.
+
+        Args:
+            songs (List[str | Clip]): Song IDs or Clip objects to download.
+            path (str): The directory where the songs should be saved. Defaults to "./downloads".
+            concurrency (int): Maximum number of simultaneous downloads. Defaults to 8.
+            progress (Optional[ProgressCallback]): Called as progress(filename, bytes_done, total_bytes) while downloading.
+
+        Returns:
+            List[str]: The filepaths of the downloaded songs, in the order of `songs`.
+        """
+        ids = [song for song in songs if isinstance(song, str)]
+        fetched = {clip.id: clip for clip in self.get_songs(ids)} if ids else {}
+        missing = [song_id for song_id in ids if song_id not in fetched]
+        if missing:
+            raise Exception(f"Songs not found: {', '.join(missing)}")
+        clips = [fetched[song] if isinstance(song, str) else song for song in songs]
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="SunoDownload") as pool:
+            futures = [pool.submit(self.download, clip, path, progress) for clip in clips]
+            return [future.result() for future in futures]
@@ -0,0 +1,455 @@
+# © [2024] Malith-Rukshan. All rights reserved.
+# Repository: https://github.com/Malith-Rukshan/Suno-API
+
+import asyncio
+import email.utils
+import logging
+import importlib.util
+import random
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+from .exceptions import (SunoAuthError, SunoCircuitOpenError, SunoConnectionError, SunoHTTPError,
+                         SunoNotFoundError, SunoRateLimitError, SunoUpstreamError)
+from .metrics import default_metrics
+
+logger = logging.getLogger("SunoAI")
+
+# Methods that can be sent again without side effects
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# Responses worth another attempt: throttled, or a transient upstream failure
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Accept-Encoding of each compression policy, for API and for CDN (media) requests; None keeps the HTTP library's
+COMPRESSION_POLICIES = {
+    "auto": (None, "identity"),  # JSON is compressed; audio and images already are, and stay byte-addressable for Range
+    "always": (None, None),
+    "never": ("identity", "identity"),
+}
+
+
+class TokenBucket():
+    """Allows `rate` requests per second on average with bursts of up to `burst`.
+
+    Callers reserve a token and sleep for the returned delay, so the bucket works for
+    threads and coroutines alike.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait before it may be used."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class CircuitBreaker():
+    """Fails fast after `threshold` consecutive upstream failures.
+
+    Once open, requests are refused for `reset_timeout` seconds; then a single trial
+    request is let through and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def check(self, host: str) -> bool:
+        """Raise `SunoCircuitOpenError` unless a request to `host` may be sent now.
+
+        Returns True if the request is the half-open trial, which must end in `record` or `release`.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self.probing:
+                raise SunoCircuitOpenError(host, max(remaining, 1.0))
+            self.probing = True  # Half-open: this request decides
+            return True
+
+    def release(self) -> None:
+        """Let another request try after the trial request ended without an outcome, e.g. was cancelled."""
+        with self._lock:
+            self.probing = False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            self.probing = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Upstream failing, circuit open for {self.reset_timeout}s 🔌")
+                self.opened_at = time.monotonic()
+
+
+# Host limits are shared by every client in the process, e.g. all accounts of a pool
+_host_buckets: Dict[Tuple[str, float, int], TokenBucket] = {}
+_host_lock = threading.Lock()
+
+
+def _host_bucket(host: str, rate: float, burst: int) -> TokenBucket:
+    with _host_lock:
+        key = (host, rate, burst)
+        if key not in _host_buckets:
+            _host_buckets[key] = TokenBucket(rate, burst)
+        return _host_buckets[key]
+
+
+# Resolved addresses shared by every HTTP library in the process once `enable_dns_cache` was called
+_dns_cache: Dict[tuple, Tuple[float, list]] = {}
+_dns_ttl = 0.0
+_dns_lock = threading.Lock()
+_getaddrinfo = socket.getaddrinfo
+# Lookups kept at most, so a process connecting to many hosts does not grow the cache forever
+MAX_DNS_ENTRIES = 256
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    entry = _dns_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return list(entry[1])
+    result = _getaddrinfo(host, port, family, type, proto, flags)
+    with _dns_lock:
+        _dns_cache.pop(key, None)
+        _dns_cache[key] = (now + _dns_ttl, result)
+        if len(_dns_cache) > MAX_DNS_ENTRIES:
+            for stale in [k for k, (expires, _) in _dns_cache.items() if expires <= now]:
+                del _dns_cache[stale]
+            while len(_dns_cache) > MAX_DNS_ENTRIES:
+                del _dns_cache[next(iter(_dns_cache))]  # Forget the oldest lookup
+    return result
+
+
+def enable_dns_cache(ttl: float) -> None:
+    """Cache successful `socket.getaddrinfo` lookups for `ttl` seconds, process-wide.
+
+    New connections to the API and CDN hosts then skip the resolver, for `requests`
+    and `httpx` alike. The longest `ttl` asked for wins.
+    """
+    global _dns_ttl
+    _dns_ttl = max(_dns_ttl, ttl)
+    socket.getaddrinfo = _cached_getaddrinfo
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _connect_failed(error: Exception) -> bool:
+    """Whether a `requests` error means no connection was opened, i.e. the request was never sent."""
+    import requests
+    from urllib3.exceptions import NewConnectionError  # Also raised for failed name resolution
+
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        # "Connection aborted" after the request went out has another reason, e.g. RemoteDisconnected
+        return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the seconds asked for by a `Retry-After` header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _detail(response) -> str:
+    try:
+        data = response.json()
+    except ValueError:
+        return response.text[:200]
+    if isinstance(data, dict) and data.get("detail"):
+        return str(data["detail"])
+    return response.text[:200]
+
+
+def raise_for_status(response) -> None:
+    """Raise the typed error matching an unsuccessful `requests` or `httpx` response."""
+    status = response.status_code
+    if status < 400:
+        return
+    detail = _detail(response)
+    if status in (401, 403):
+        raise SunoAuthError(status, detail)
+    if status == 404:
+        raise SunoNotFoundError(status, detail)
+    if status == 429:
+        raise SunoRateLimitError(status, detail, parse_retry_after(response.headers.get("Retry-After")))
+    if status >= 500:
+        raise SunoUpstreamError(status, detail)
+    raise SunoHTTPError(status, detail)
+
+
+class Transport():
+    """Rate limiting, timeouts, retries and circuit breaking for the requests of one client.
+
+    Create one per client (i.e. per account): the `rate`/`burst` bucket and the circuit
+    breakers belong to it, while `host_rate`/`host_burst` buckets are shared process-wide.
+    Only idempotent requests are retried after a timeout or failure; any request is retried
+    when no connection could be opened (so nothing was sent) or upstream answered 429, since
+    it was never handled. A connection dropped after sending counts as a failure.
+
+    Set `limiter` to a coroutine function `limiter(host) -> seconds` to take the rate limits
+    from elsewhere, e.g. the coordinator process shared by several API workers.
+
+    It also builds the client's connection pools (`session` for `requests`, `async_client`
+    for `httpx`): up to `pool_size` connections to the API and `cdn_pool_size` to the media
+    hosts are kept open for reuse (per host with `requests`, per client with `httpx`) and
+    `pool_sizes` gives single hosts their own pool. `httpx` closes idle connections after
+    `keepalive_expiry` seconds; `requests` has no idle timeout, so `session` only looks at
+    it to disable keep-alive when it is 0 or less. `http2` multiplexes `httpx` requests
+    over one connection per host if the `h2` package is installed; `requests` only speaks
+    HTTP/1.1. `dns_ttl` opts in to the DNS cache, which patches `socket.getaddrinfo` for
+    the whole process, and `compression` is one of `COMPRESSION_POLICIES`.
+    """
+
+    def __init__(self, rate: Optional[float] = 10, burst: int = 20, host_rate: Optional[float] = 20,
+                 host_burst: int = 40, connect_timeout: float = 5, read_timeout: float = 30, retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 10, max_retry_after: float = 60,
+                 failure_threshold: int = 5, reset_timeout: float = 30, pool_size: int = 20,
+                 cdn_pool_size: int = 32, pool_sizes: Optional[Dict[str, int]] = None,
+                 keepalive_expiry: float = 30, http2: bool = False, dns_ttl: Optional[float] = None,
+                 compression: str = "auto") -> None:
+        if compression not in COMPRESSION_POLICIES:
+            raise ValueError(f"Invalid compression policy. Available policies are: {list(COMPRESSION_POLICIES)}")
+        self._options = {name: value for name, value in locals().items() if name not in ("self", "__class__")}
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.limiter: Optional[Callable[[str], Awaitable[float]]] = None
+        self.pool_size = pool_size
+        self.cdn_pool_size = cdn_pool_size
+        self.pool_sizes = dict(pool_sizes or {})
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.compression = compression
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 needs the h2 package (pip install httpx[http2]), using HTTP/1.1")
+            self.http2 = False
+        if dns_ttl:
+            enable_dns_cache(dns_ttl)
+
+    def copy(self) -> "Transport":
+        """A transport with the same settings and its own rate limit bucket and circuit breakers, e.g. for another account."""
+        return Transport(**self._options)
+
+    def _accept_encoding(self, cdn: bool) -> Optional[str]:
+        return COMPRESSION_POLICIES[self.compression][1 if cdn else 0]
+
+    def session(self, headers: Optional[dict] = None, cdn: bool = False) -> "requests.Session":
+        """A `requests.Session` with this transport's connection pools, for API (or with `cdn`, media) requests."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.headers.update(headers or {})
+        size = self.cdn_pool_size if cdn else self.pool_size
+        for scheme in ("https://", "http://"):
+            session.mount(scheme, HTTPAdapter(pool_maxsize=size))
+        for host, host_size in self.pool_sizes.items():
+            for scheme in ("https://", "http://"):
+                session.mount(f"{scheme}{host}", HTTPAdapter(pool_connections=1, pool_maxsize=host_size))
+        encoding = self._accept_encoding(cdn)
+        if encoding is not None:
+            session.headers["Accept-Encoding"] = encoding
+        if self.keepalive_expiry <= 0:
+            session.headers["Connection"] = "close"
+        return session
+
+    def _limits(self, size: int) -> "httpx.Limits":
+        import httpx
+        # Like `requests`, open more connections under load but only keep `size` of them
+        keepalive = size if self.keepalive_expiry > 0 else 0
+        return httpx.Limits(max_connections=None, max_keepalive_connections=keepalive,
+                            keepalive_expiry=self.keepalive_expiry or None)
+
+    def async_client(self, headers: Optional[dict] = None, cdn: bool = False,
+                     limits: Optional["httpx.Limits"] = None) -> "httpx.AsyncClient":
+        """An `httpx.AsyncClient` with this transport's connection pools and timeouts; `limits` overrides the pool sizes."""
+        import httpx
+
+        headers = dict(headers or {})
+        encoding = self._accept_encoding(cdn)
+        if encoding is not None:
+            headers["Accept-Encoding"] = encoding
+        # httpx limits connections per client, so hosts with their own size get their own pool
+        mounts = {f"all://{host}": httpx.AsyncHTTPTransport(limits=self._limits(host_size), http2=self.http2)
+                  for host, host_size in self.pool_sizes.items()}
+        size = self.cdn_pool_size if cdn else self.pool_size
+        return httpx.AsyncClient(headers=headers, limits=limits or self._limits(size), http2=self.http2,
+                                 timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                                 follow_redirects=True, mounts=mounts)
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers.setdefault(host, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+        return self._breakers[host]
+
+    def _admit(self, host: str) -> Tuple[bool, float]:
+        """Check the circuit of `host`; return whether this is its trial request and the seconds to wait for the rate limits."""
+        probe = self._breaker(host).check(host)
+        return probe, self.reserve(host)
+
+    async def _aadmit(self, host: str) -> Tuple[bool, float]:
+        if self.limiter is None:
+            return self._admit(host)
+        probe = self._breaker(host).check(host)
+        try:
+            return probe, await self.limiter(host)
+        except BaseException:
+            if probe:
+                self._breaker(host).release()
+            raise
+
+    def reserve(self, host: str) -> float:
+        """Take one request from the rate limits of `host` and return the seconds to wait for it."""
+        delay = self.bucket.reserve() if self.bucket else 0.0
+        if self.host_rate:
+            delay = max(delay, _host_bucket(host, self.host_rate, self.host_burst).reserve())
+        return delay
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_base * 2 ** attempt, self.backoff_max)
+        return random.uniform(0, delay)  # Full jitter
+
+    def _retry_delay(self, method: str, idempotent: Optional[bool], attempt: int,
+                     status: Optional[int] = None, retry_after: Optional[str] = None,
+                     connect_failed: bool = False) -> Optional[float]:
+        """Return the seconds to wait before the next attempt, or None to give up."""
+        if attempt >= self.retries:
+            return None
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        if status is not None:
+            if status not in RETRY_STATUSES or (status != 429 and not idempotent):
+                return None
+            asked = parse_retry_after(retry_after)
+            if asked is not None:
+                return asked if asked <= self.max_retry_after else None
+        elif not (idempotent or connect_failed):
+            return None
+        return self._backoff(attempt)
+
+    def _finish(self, host: str, status: int) -> None:
+        self._breaker(host).record(status < 500)
+
+    def send(self, session: "requests.Session", method: str, url: str, idempotent: Optional[bool] = None,
+             metrics=None, **kwargs) -> "requests.Response":
+        """Send a request with a `requests.Session`, retrying as configured. Returns the last response."""
+        import requests  # Only the HTTP library in use is loaded
+        host = urlsplit(url).netloc
+        metrics = metrics if metrics is not None else default_metrics
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        attempt = 0
+        while True:
+            probe, delay = self._admit(host)
+            try:
+                if delay:
+                    time.sleep(delay)
+                with metrics.track_request(method, url) as info:
+                    response = session.request(method, url, **kwargs)
+                    info["status"] = response.status_code
+            except requests.RequestException as e:
+                self._breaker(host).record(False)
+                delay = self._retry_delay(method, idempotent, attempt, connect_failed=_connect_failed(e))
+                if delay is None:
+                    raise SunoConnectionError(f"{method} {url} failed: {e}") from e
+                reason = type(e).__name__
+            except BaseException:
+                if probe:
+                    self._breaker(host).release()  # Interrupted trial: the next request tries again
+                raise
+            else:
+                self._finish(host, response.status_code)
+                delay = self._retry_delay(method, idempotent, attempt, response.status_code,
+                                          response.headers.get("Retry-After"))
+                if delay is None:
+                    return response
+                reason = str(response.status_code)
+            metrics.inc("suno_upstream_retries_total", reason=reason)
+            logger.info(f"Retrying {method} {urlsplit(url).path} in {delay:.1f}s ({reason})")
+            time.sleep(delay)
+            attempt += 1
+
+    async def asend(self, client: "httpx.AsyncClient", method: str, url: str, idempotent: Optional[bool] = None,
+                    metrics=None, **kwargs) -> "httpx.Response":
+        """Asyncio version of `send` for an `httpx.AsyncClient`."""
+        import httpx
+        host = urlsplit(url).netloc
+        metrics = metrics if metrics is not None else default_metrics
+        kwargs.setdefault("timeout", httpx.Timeout(self.read_timeout, connect=self.connect_timeout))
+        attempt = 0
+        while True:
+            probe, delay = await self._aadmit(host)
+            try:
+                if delay:
+                    await asyncio.sleep(delay)
+                with metrics.track_request(method, url) as info:
+                    response = await client.request(method, url, **kwargs)
+                    info["status"] = response.status_code
+            except httpx.TransportError as e:
+                self._breaker(host).record(False)
+                connect_failed = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                delay = self._retry_delay(method, idempotent, attempt, connect_failed=connect_failed)
+                if delay is None:
+                    raise SunoConnectionError(f"{method} {url} failed: {e!r}") from e
+                reason = type(e).__name__
+            except BaseException:
+                if probe:
+                    self._breaker(host).release()  # Cancelled trial, e.g. the client went away
+                raise
+            else:
+                self._finish(host, response.status_code)
+                delay = self._retry_delay(method, idempotent, attempt, response.status_code,
+                                          response.headers.get("Retry-After"))
+                if delay is None:
+                    return response
+                reason = str(response.status_code)
+            metrics.inc("suno_upstream_retries_total", reason=reason)
+            logger.info(f"Retrying {method} {urlsplit(url).path} in {delay:.1f}s ({reason})")
+            await asyncio.sleep(delay)
+            attempt += 1
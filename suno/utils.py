@@ -1,10 +1,19 @@
 # © [2024] Malith-Rukshan. All rights reserved.
 # Repository: https://github.com/Malith-Rukshan/Suno-API
 
-from .models import Clip, ClipMetadata
-from typing import List
+from .models import Clip, ClipView, CreditsInfo
+from typing import List, Optional
+import base64
+import datetime
+import pathlib
+import json
 import random
 
+try:
+    import orjson
+except ImportError:  # Optional speedup, fall back to the standard library
+    orjson = None
+
 os_systems = [
     'Windows NT 10.0; Win64; x64',
     'Windows NT 6.1; WOW64',
@@ -26,12 +35,34 @@ def generate_fake_useragent():
     return f'Mozilla/5.0 ({os_system}) AppleWebKit/537.36 (KHTML, like Gecko) {browser}'
 
 
-def create_clip_from_data(clip_data) -> Clip:
-    metadata = ClipMetadata(**clip_data['metadata'])
-    clip_data['metadata'] = metadata
-    clip_instance = Clip(**clip_data)
+def json_loads(data: bytes | str):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def json_dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
 
-    return clip_instance
+def response_to_views(clips_data) -> List[ClipView]:
+    return [ClipView(clip_data) for clip_data in clips_data]
+
+
+def decode_jwt_exp(token: str) -> Optional[float]:
+    """Return the `exp` claim (unix seconds) of a JWT without verifying it, or None if unreadable."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)  # Restore stripped base64 padding
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def create_clip_from_data(clip_data) -> Clip:
+    # Validates the nested metadata too, without mutating the caller's dict
+    return Clip.model_validate(clip_data)
 
 
 def response_to_clips(clips_data) -> List[Clip]:
@@ -41,3 +72,49 @@ def response_to_clips(clips_data) -> List[Clip]:
         clips.append(clip_instance)
 
     return clips
+
+
+def build_generate_payload(prompt, is_custom, tags, title, make_instrumental, model_version) -> dict:
+    payload = {
+        "make_instrumental": make_instrumental,
+        "mv": model_version,
+        "prompt": ""
+    }
+    if is_custom:
+        payload["tags"] = tags
+        payload["title"] = title
+        payload["prompt"] = prompt
+    else:
+        payload["gpt_description_prompt"] = prompt
+    return payload
+
+
+def credits_from_billing(data) -> CreditsInfo:
+    return CreditsInfo(
+        credits_left=data["total_credits_left"],
+        period=data["period"],
+        monthly_limit=data["monthly_limit"],
+        monthly_usage=data["monthly_usage"],
+    )
+
+
+def get_download_path(song: Clip, path: str) -> pathlib.Path:
+    output_dir = pathlib.Path(path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    song_name = song.title.replace("/", "-")
+    return output_dir / f"{song_name} - {song.id}.mp3"
+
+
+def split_song_ids(song_ids: List[str] | str) -> List[str]:
+    if isinstance(song_ids, str):
+        song_ids = song_ids.split(",")
+    return [song_id.strip() for song_id in song_ids if song_id.strip()]
+
+
+def parse_created_at(value: str | datetime.datetime) -> datetime.datetime:
+    """Parse a clip `created_at` timestamp such as "2024-05-05T11:54:09.356Z" (naive values are taken as UTC)."""
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value